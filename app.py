@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, stream_with_context
 import sys
 import os
 
@@ -8,30 +8,97 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from models.student_model import (
     add_student, get_all_students, get_student_by_id,
     get_student_by_name, update_student, delete_student, get_all_subjects,
-    get_all_exams_for_student, add_exam_score, delete_exam, add_complete_exam
+    get_all_exams_for_student, add_exam_score, delete_exam, add_complete_exam,
+    apply_write_batch, get_students_page
 )
-from core.nlu import parse_command
+from core.nlu import (
+    parse_command, parse_commands, split_commands, validate_command, WRITE_INTENTS, DESTRUCTIVE_INTENTS
+)
+from core.name_index import resolve_student_name
 from core.stats import (
     get_all_stats, get_class_topper, get_subject_averages,
     compare_subject_scores, get_student_rank
 )
+from models.request_cache import get_request_cache_stats
+from core.http_cache import etag_cached, compress_response
+from core.metrics import init_metrics
+from models.sql_trace import init_sql_trace
+from core.profiling import init_profiling
 # Removed heavy import: from core.predict import predict_score
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-change-in-production'  # Change this in production!
 
+app.after_request(compress_response)
+init_metrics(app)
+init_sql_trace(app)
+init_profiling(app)
+
+@app.teardown_request
+def log_query_cache(exc):
+    """Log how many repeated queries the request-scoped cache saved."""
+    hits, misses = get_request_cache_stats()
+    if hits:
+        app.logger.info('%s %s: %d lookups computed, %d repeated lookups served from cache',
+                        request.method, request.path, misses, hits)
+
 @app.route('/')
 def index():
     """Dashboard page."""
     stats = get_all_stats()
     return render_template('index.html', stats=stats)
 
+def student_page_args(args, default_limit=50):
+    """
+    Read pagination, filter and projection query parameters for get_students_page.
+    
+    Supported: limit, cursor, grade, section, gender, min_average, max_average,
+    min_score.<subject>, max_score.<subject> and fields (comma separated).
+    Raises ValueError for malformed values.
+    """
+    page_args = {
+        'limit': int(args.get('limit', default_limit)),
+        'cursor': args.get('cursor') or None,
+        'grade': args.get('grade') or None,
+        'section': args.get('section') or None,
+        'gender': args.get('gender') or None,
+        'min_average': float(args['min_average']) if args.get('min_average') else None,
+        'max_average': float(args['max_average']) if args.get('max_average') else None
+    }
+    
+    for prefix in ('min_score.', 'max_score.'):
+        thresholds = tuple(
+            (key[len(prefix):], float(value))
+            for key, value in args.items() if key.startswith(prefix) and value
+        )
+        page_args[f"{prefix[:3]}_subject_scores"] = thresholds or None
+    
+    if args.get('fields'):
+        page_args['fields'] = tuple(field.strip() for field in args['fields'].split(',') if field.strip())
+    return page_args
+
+def wants_full_history(args):
+    """True when the request asks to include archived academic years (?history=all)."""
+    return args.get('history') == 'all'
+
 @app.route('/students')
 def students():
-    """List all students."""
-    all_students = get_all_students()
+    """List students, one page at a time."""
+    try:
+        page = get_students_page(**student_page_args(request.args))
+    except ValueError:
+        return redirect(url_for('students'))
+    
     subjects = get_all_subjects()
-    return render_template('student_list.html', students=all_students, subjects=subjects)
+    next_url = None
+    if page['next_cursor']:
+        next_url = url_for('students', **{**request.args.to_dict(), 'cursor': page['next_cursor']})
+    first_url = None
+    if request.args.get('cursor'):
+        first_url = url_for('students', **{key: value for key, value in request.args.items() if key != 'cursor'})
+    
+    return render_template('student_list.html', students=page['students'], subjects=subjects,
+                           next_url=next_url, first_url=first_url)
 
 @app.route('/add', methods=['GET', 'POST'])
 def add():
@@ -118,9 +185,8 @@ def stats():
     """Show comprehensive statistics."""
     all_stats = get_all_stats()
     # Get all students sorted by average for top performers
-    all_students = get_all_students()
     # Sort by average descending, handle None values
-    all_students.sort(key=lambda x: x.get('average') or 0, reverse=True)
+    all_students = sorted(get_all_students(), key=lambda x: x.get('average') or 0, reverse=True)
     return render_template('stats.html', stats=all_stats, students=all_students)
 
 @app.route('/command', methods=['GET', 'POST'])
@@ -129,6 +195,11 @@ def command():
     if request.method == 'POST':
         text = request.form.get('command', '').strip()
         
+        if text and request.form.get('batch') == 'on':
+            # Batch results can be large, so render them directly instead of via the session
+            batch_results = execute_batch(split_commands(text))
+            return render_template('command.html', batch_results=batch_results, command_text=text)
+        
         if text:
             try:
                 parsed = parse_command(text)
@@ -161,12 +232,108 @@ def command():
     
     return render_template('command.html', result=result, error=error, command_text=command_text)
 
+def execute_batch(commands):
+    """
+    Parse a list of commands with one LLM request and execute them.
+    
+    Write intents are applied together in a single transaction; read intents
+    run afterwards, so they see the effect of every write in the batch.
+    
+    Returns:
+        list of dicts with 'source', 'intent' and 'result' for each parsed command
+    """
+    if not commands:
+        return []
+    
+    parsed_commands = parse_commands(commands)
+    entries = []
+    writes = []
+    
+    for parsed in parsed_commands:
+        entry = {'source': parsed.get('source', ''), 'intent': parsed.get('intent'), 'result': None}
+        error = validate_command(parsed)
+        note = None
+        
+        if not error and parsed['intent'] in WRITE_INTENTS:
+            # Students added earlier in the batch are not in the name index yet
+            added = {p['name'].lower() for _, p, _ in writes if p['intent'] == 'ADD_STUDENT'}
+            if parsed['intent'] != 'ADD_STUDENT' and parsed['name'].lower() not in added:
+                parsed, note, error = resolve_command_name(parsed)
+        
+        if error:
+            entry['result'] = {'error': error}
+        elif parsed['intent'] in WRITE_INTENTS:
+            writes.append((entry, parsed, note))
+        entries.append((entry, parsed))
+    
+    if writes:
+        try:
+            write_results = apply_write_batch([parsed for _, parsed, _ in writes])
+        except Exception as e:
+            write_results = [{'error': f'Batch write failed and was rolled back: {str(e)}'}] * len(writes)
+        
+        for (entry, _, note), result in zip(writes, write_results):
+            entry['result'] = dict(result, note=note) if note else result
+    
+    for entry, parsed in entries:
+        if entry['result'] is None:
+            try:
+                entry['result'] = execute_command(parsed)
+            except Exception as e:
+                entry['result'] = {'error': f'Error processing command: {str(e)}'}
+    
+    return [entry for entry, _ in entries]
+
+def resolve_command_name(parsed):
+    """
+    Resolve a misspelled or partial student name against the in-memory name index.
+    
+    The index is per process and can lag writes made elsewhere, so a name
+    that exists exactly (ignoring case) is always used as given. Destructive
+    intents never run on a substituted name; they get the suggestions as an
+    error instead.
+    
+    Returns:
+        (parsed, note, error) - parsed with the name to use, a note saying
+        which student was used instead of the given name (or None), and an
+        error message when the command must not run (or None)
+    """
+    name = parsed['name']
+    if get_student_by_name(name):
+        return parsed, None, None
+    
+    resolved, suggestions = resolve_student_name(name)
+    if parsed.get('intent') in DESTRUCTIVE_INTENTS:
+        if resolved:
+            suggestions = [resolved]
+        if suggestions:
+            return parsed, None, (f"Student {name} not found. Did you mean: {', '.join(suggestions)}? "
+                                  f"Use the exact name to update or delete a student.")
+        return parsed, None, None
+    
+    if resolved:
+        return dict(parsed, name=resolved), f"Student {name} not found, used {resolved} instead.", None
+    if suggestions:
+        return parsed, None, f"Student {name} not found. Did you mean: {', '.join(suggestions)}?"
+    return parsed, None, None
+
 def execute_command(parsed):
     """Execute parsed NLU command and return result."""
-    intent = parsed.get('intent')
-    
     if 'error' in parsed:
-        return {'error': parsed['error'], 'intent': intent}
+        return {'error': parsed['error'], 'intent': parsed.get('intent')}
+    
+    note = None
+    if parsed.get('intent') != 'ADD_STUDENT' and parsed.get('name'):
+        parsed, note, error = resolve_command_name(parsed)
+        if error:
+            return {'error': error}
+    
+    result = run_intent(parsed)
+    return dict(result, note=note) if note else result
+
+def run_intent(parsed):
+    """Run a parsed command whose student name is already resolved."""
+    intent = parsed.get('intent')
     
     # ADD_STUDENT (profile only)
     if intent == 'ADD_STUDENT':
@@ -363,7 +530,7 @@ def graph(graph_type):
     elif graph_type == 'student_pie' and student_name:
         img_data = generate_student_pie(student_name)
     elif graph_type == 'student_line' and student_name:
-        img_data = generate_student_line(student_name)
+        img_data = generate_student_line(student_name, include_archive=wants_full_history(request.args))
     elif graph_type == 'student_radar' and student_name:
         img_data = generate_student_radar(student_name)
     elif graph_type == 'subject_average':
@@ -385,29 +552,86 @@ def predict_endpoint(student_name, subject):
     """API endpoint for prediction."""
     # Lazy import to avoid slow startup
     from core.predict import predict_score
-    result = predict_score(student_name, subject)
+    result = predict_score(student_name, subject, include_archive=wants_full_history(request.args))
     return jsonify(result)
 
 @app.route('/api/students', methods=['GET'])
+@etag_cached
 def api_students():
-    """API endpoint to get all students."""
-    students = get_all_students()
-    return jsonify(students)
+    """API endpoint to get students, keyset-paginated and filterable (see student_page_args)."""
+    try:
+        page = get_students_page(**student_page_args(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
+
+@app.route('/api/changes', methods=['GET'])
+def api_changes():
+    """
+    API endpoint to tail the change feed: ?since=<seq>&limit=<n>&table=<students|exams>.
+    Answers 410 Gone when entries after since were compacted away.
+    """
+    from models.change_feed import get_changes, ChangesTruncated, CHANGE_PAGE_SIZE
+    try:
+        page = get_changes(int(request.args.get('since', 0)), int(request.args.get('limit', CHANGE_PAGE_SIZE)),
+                           request.args.get('table') or None)
+    except ChangesTruncated as e:
+        return jsonify({'error': str(e), 'truncated_seq': e.truncated_seq}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
+
+@app.route('/export/<table>.<fmt>')
+def export_table(table, fmt):
+    """Stream a full dump of the students or exams table as CSV, XLSX or Parquet."""
+    from core.export import iter_export, EXPORT_FORMATS
+    try:
+        chunks = iter_export(table, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={table}{extension}'}
+    )
+
+@app.route('/api/commands', methods=['POST'])
+def api_commands():
+    """API endpoint to parse and execute a batch of commands in one request."""
+    payload = request.get_json(silent=True) or {}
+    commands = payload.get('commands')
+    
+    if isinstance(commands, str):
+        commands = split_commands(commands)
+    
+    if not commands or not isinstance(commands, list):
+        return jsonify({'error': 'Provide "commands" as a list of strings or newline separated text'}), 400
+    
+    results = execute_batch([str(command).strip() for command in commands if str(command).strip()])
+    return jsonify({
+        'results': results,
+        'succeeded': sum(1 for entry in results if entry['result'].get('success')),
+        'failed': sum(1 for entry in results if entry['result'].get('error'))
+    })
 
 @app.route('/api/stats', methods=['GET'])
+@etag_cached
 def api_stats():
     """API endpoint to get statistics."""
     stats = get_all_stats()
     return jsonify(stats)
 
 @app.route('/student/<int:student_id>/exams')
+@etag_cached
 def student_exams(student_id):
     """View all exams for a student."""
     student = get_student_by_id(student_id)
     if not student:
         return redirect(url_for('students'))
     
-    exams = get_all_exams_for_student(student_id)
+    exams = get_all_exams_for_student(student_id, include_archive=wants_full_history(request.args))
     return jsonify({'student': student, 'exams': exams})
 
 @app.route('/student/<int:student_id>/stats')
@@ -463,7 +687,7 @@ def delete_exam_route(exam_id):
 
 @app.route('/import', methods=['GET', 'POST'])
 def import_excel():
-    """Import data from Excel file."""
+    """Import data from an Excel, CSV or Parquet file."""
     if request.method == 'POST':
         if 'file' not in request.files:
             return render_template('import_excel.html', error='No file uploaded')
@@ -473,20 +697,45 @@ def import_excel():
         if file.filename == '':
             return render_template('import_excel.html', error='No file selected')
         
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return render_template('import_excel.html', error='Please upload an Excel file (.xlsx or .xls)')
+        from core.excel_import import SUPPORTED_EXTENSIONS
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            return render_template('import_excel.html', error='Please upload an Excel (.xlsx, .xls), CSV or Parquet file')
         
         # Get options
         avoid_duplicates = request.form.get('avoid_duplicates') == 'on'
+        streaming = request.form.get('streaming') == 'on'
         
-        # Import data
-        from core.excel_import import import_excel_from_upload
-        stats = import_excel_from_upload(file, avoid_duplicates)
+        # Queue the import in the background and return straight away
+        from core.import_jobs import submit_import
+        job_id = submit_import(file, avoid_duplicates, streaming)
         
-        return render_template('import_excel.html', stats=stats)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status_url': url_for('import_status', job_id=job_id)}), 202
+        return redirect(url_for('import_excel', job=job_id))
+    
+    job_id = request.args.get('job')
+    if job_id:
+        return render_template('import_excel.html', job_id=job_id)
     
     return render_template('import_excel.html')
 
+@app.route('/import/<job_id>/status')
+def import_status(job_id):
+    """Progress of a background import job."""
+    from core.import_jobs import get_job_status
+    status = get_job_status(job_id)
+    if not status:
+        return jsonify({'error': 'Import job not found'}), 404
+    return jsonify(status)
+
+@app.route('/import/<job_id>/cancel', methods=['POST'])
+def import_cancel(job_id):
+    """Cancel a queued or running import job."""
+    from core.import_jobs import cancel_job, get_job_status
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Import job not found or already finished'}), 404
+    return jsonify(get_job_status(job_id))
+
 # Initialize database on startup
 from models.student_model import init_db
 init_db()
@@ -0,0 +1,266 @@
+"""
+DuckDB analytics backend for core/stats.py.
+Selected with SCORESENSE_ANALYTICS_BACKEND=duckdb and needs the optional
+duckdb package (pip install duckdb). SQLite stays the store every write goes
+to; DuckDB only reads it, from one of two sources (SCORESENSE_DUCKDB_SOURCE):
+
+- 'parquet' (default): queries run on a Parquet copy of the exam_scores,
+  students and subjects tables in SCORESENSE_PARQUET_MIRROR_DIR (default:
+  analytics/ next to the database; needs pyarrow). The copy is rewritten
+  when the data changed, at most once every SCORESENSE_PARQUET_MIRROR_MAX_AGE
+  seconds, so results can lag writes by that long.
+- 'sqlite': the database file is ATTACHed read-only through DuckDB's sqlite
+  extension, so results are always current. The extension has to be
+  installed already (INSTALL sqlite once, with network access); it is
+  only loaded here, never downloaded at runtime.
+
+If the backend cannot start, core.stats logs the error and falls back to
+the snapshot backend.
+
+Each method returns what the snapshot backend returns, with the same tie
+order (lowest student id, then lowest exam id, first). Unrounded averages
+are summed in a different order and can differ in the last bit, so students
+whose averages are equal may swap places in get_ranked_averages.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from models import student_model
+from models.student_model import get_read_connection
+from core.stats import SCORE_RANGES, SCORE_RANGE_EDGES
+
+# Where DuckDB reads the data: 'parquet' (a mirror) or 'sqlite' (the database file)
+DUCKDB_SOURCE = os.getenv('SCORESENSE_DUCKDB_SOURCE', 'parquet').lower()
+
+# Directory of the Parquet mirrors (default: analytics/ next to the database)
+PARQUET_MIRROR_DIR = os.getenv('SCORESENSE_PARQUET_MIRROR_DIR')
+
+# Seconds a Parquet mirror is served after the data changed before it is rewritten
+PARQUET_MIRROR_MAX_AGE = float(os.getenv('SCORESENSE_PARQUET_MIRROR_MAX_AGE', '60'))
+
+# Seconds an outdated mirror is kept for queries (and other processes) still reading it
+MIRROR_RETENTION_SECONDS = 600
+
+# Rows read from SQLite per Parquet row group while writing a mirror
+MIRROR_BATCH_ROWS = 500000
+
+# Tables DuckDB reads, with the columns the queries use and their Parquet types
+MIRROR_TABLES = {
+    'exam_scores': [('id', 'int64'), ('student_id', 'int64'), ('subject_id', 'int64'), ('score', 'float64')],
+    'students': [('id', 'int64'), ('name', 'string')],
+    'subjects': [('id', 'int64'), ('name', 'string')]
+}
+
+def load_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError('The duckdb analytics backend needs duckdb (pip install duckdb)') from None
+    return duckdb
+
+def get_mirror_dir(path):
+    return PARQUET_MIRROR_DIR or os.path.join(os.path.dirname(os.path.abspath(path)), 'analytics')
+
+def read_mirror_position(cursor):
+    """
+    Read a token that changes with every write to the mirrored tables: the
+    latest change feed seq and the last exam and student ids handed out.
+    """
+    cursor.execute("SELECT name, seq FROM sqlite_sequence WHERE name IN ('changes', 'exam_scores', 'students')")
+    counters = dict(cursor.fetchall())
+    return '-'.join(str(counters.get(name, 0)) for name in ('changes', 'exam_scores', 'students'))
+
+def write_parquet_mirror(cursor, directory):
+    """
+    Copy the mirrored tables into one Parquet file each in directory.
+    
+    The files are written to a temporary directory that is renamed into
+    place, so an interrupted run never leaves a partial mirror behind.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('The Parquet mirror needs pyarrow (pip install pyarrow)') from None
+    
+    partial = f'{directory}.{os.getpid()}.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    for table, columns in MIRROR_TABLES.items():
+        schema = pa.schema(columns)
+        cursor.execute(f"SELECT {', '.join(schema.names)} FROM {table}")
+        with pq.ParquetWriter(os.path.join(partial, f'{table}.parquet'), schema) as writer:
+            while True:
+                rows = cursor.fetchmany(MIRROR_BATCH_ROWS)
+                if not rows:
+                    break
+                arrays = [pa.array(values, field.type) for values, field in zip(zip(*rows), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    try:
+        os.rename(partial, directory)
+    except OSError:
+        # Another process wrote the same mirror first
+        shutil.rmtree(partial, ignore_errors=True)
+
+class DuckDBAnalytics:
+    """
+    Analytics backend running the core/stats.py aggregations as SQL in an
+    embedded, in-memory DuckDB database. Queries go through per-call cursors,
+    so one instance serves all request threads.
+    """
+    
+    name = 'duckdb'
+    
+    def __init__(self, path, source=None):
+        duckdb = load_duckdb()
+        self.path = path
+        self.source = source or DUCKDB_SOURCE
+        if self.source not in ('sqlite', 'parquet'):
+            raise ValueError(f"Unknown DuckDB source '{self.source}' (choose sqlite or parquet)")
+        
+        self.db = duckdb.connect()
+        self.mirror_lock = threading.Lock()
+        self.mirror = None
+        self.mirror_checked = 0
+        if self.source == 'sqlite':
+            self.db.execute('LOAD sqlite')
+            quoted = os.path.abspath(path).replace("'", "''")
+            self.db.execute(f"ATTACH '{quoted}' AS scoresense (TYPE sqlite, READ_ONLY)")
+            for table, columns in MIRROR_TABLES.items():
+                names = ', '.join(name for name, _ in columns)
+                self.db.execute(f'CREATE VIEW {table} AS SELECT {names} FROM scoresense.{table}')
+        else:
+            self.refresh_mirror()
+    
+    def close(self):
+        self.db.close()
+    
+    def refresh_mirror(self):
+        """
+        Point the views at an up-to-date Parquet mirror, writing a new one if
+        the data changed and the current one is older than PARQUET_MIRROR_MAX_AGE.
+        """
+        if self.mirror is not None and time.monotonic() - self.mirror_checked < PARQUET_MIRROR_MAX_AGE:
+            return
+        # Another thread is already writing a new mirror; keep serving the current one
+        if not self.mirror_lock.acquire(blocking=self.mirror is None):
+            return
+        try:
+            if self.mirror is not None and time.monotonic() - self.mirror_checked < PARQUET_MIRROR_MAX_AGE:
+                return
+            conn = get_read_connection()
+            try:
+                cursor = conn.cursor()
+                # One read transaction, so the files match the position they are named after
+                cursor.execute('BEGIN')
+                stem = os.path.splitext(os.path.basename(self.path))[0]
+                directory = os.path.join(get_mirror_dir(self.path), f'{stem}-{read_mirror_position(cursor)}')
+                if directory != self.mirror and not os.path.isdir(directory):
+                    write_parquet_mirror(cursor, directory)
+                cursor.execute('COMMIT')
+            finally:
+                conn.close()
+            
+            if directory != self.mirror:
+                self.db.execute('BEGIN')
+                for table in MIRROR_TABLES:
+                    quoted = os.path.join(directory, f'{table}.parquet').replace("'", "''")
+                    self.db.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM read_parquet('{quoted}')")
+                self.db.execute('COMMIT')
+                self.mirror = directory
+            self.mirror_checked = time.monotonic()
+            self.remove_old_mirrors(stem)
+        finally:
+            self.mirror_lock.release()
+    
+    def remove_old_mirrors(self, stem):
+        """
+        Delete the mirrors written before the current one, once it is old
+        enough that every process has switched to it (or a newer one).
+        """
+        written = os.path.getmtime(self.mirror)
+        if time.time() - written < max(MIRROR_RETENTION_SECONDS, 2 * PARQUET_MIRROR_MAX_AGE):
+            return
+        parent = os.path.dirname(self.mirror)
+        pattern = re.compile(re.escape(stem) + r'-\d+-\d+-\d+$')
+        for entry in os.listdir(parent):
+            directory = os.path.join(parent, entry)
+            if pattern.match(entry) and directory != self.mirror and os.path.getmtime(directory) < written:
+                shutil.rmtree(directory, ignore_errors=True)
+    
+    def query(self, sql, params=()):
+        if self.source == 'parquet':
+            self.refresh_mirror()
+        with self.db.cursor() as cursor:
+            return cursor.execute(sql, params).fetchall()
+    
+    # Averages are SUM / COUNT rather than AVG, which rounds differently from the
+    # snapshot backend and would reorder students whose averages tie
+    def class_average(self):
+        result = self.query('SELECT SUM(score) / COUNT(*) FROM exam_scores')[0][0]
+        return round(float(result), 2) if result else 0
+    
+    def subject_averages(self):
+        rows = self.query('''
+            SELECT s.name, SUM(e.score) / COUNT(*) FROM exam_scores e
+            JOIN subjects s ON s.id = e.subject_id
+            GROUP BY s.name
+        ''')
+        return {subject: round(float(average), 2) for subject, average in sorted(rows)}
+    
+    def extreme(self, subject, highest):
+        direction = 'DESC' if highest else 'ASC'
+        if subject:
+            rows = self.query(f'''
+                SELECT st.name, e.score FROM exam_scores e
+                JOIN students st ON st.id = e.student_id
+                WHERE e.subject_id = (SELECT id FROM subjects WHERE name = ?)
+                ORDER BY e.score {direction}, e.student_id, e.id
+                LIMIT 1
+            ''', (subject,))
+            if not rows:
+                return None
+            return {'name': rows[0][0], 'score': round(float(rows[0][1]), 2), 'subject': subject}
+        
+        rows = self.query(f'''
+            SELECT st.name, a.average
+            FROM (SELECT student_id, SUM(score) / COUNT(*) AS average FROM exam_scores GROUP BY student_id) a
+            JOIN students st ON st.id = a.student_id
+            ORDER BY a.average {direction}, a.student_id
+            LIMIT 1
+        ''')
+        if not rows:
+            return None
+        return {'name': rows[0][0], 'average': round(float(rows[0][1]), 2)}
+    
+    def ranked_averages(self):
+        rows = self.query('''
+            SELECT st.name, a.average FROM students st
+            LEFT JOIN (SELECT student_id, SUM(score) / COUNT(*) AS average FROM exam_scores GROUP BY student_id) a
+                ON a.student_id = st.id
+            ORDER BY a.average IS NULL, a.average DESC, st.id
+        ''')
+        return [{'name': name, 'average': float(average) if average is not None else 0} for name, average in rows]
+    
+    def score_distribution(self):
+        # Scores up to each (inclusive) edge and in total; the buckets are the differences
+        filters = ''.join(f'COUNT(*) FILTER (WHERE score <= {int(edge)}), ' for edge in SCORE_RANGE_EDGES)
+        totals = self.query(f'SELECT {filters}COUNT(*) FROM exam_scores')[0]
+        counts = [totals[0]] + [upper - lower for lower, upper in zip(totals, totals[1:])]
+        return {label: int(count) for label, count in zip(SCORE_RANGES, counts)}
+    
+    def subject_scores(self, subject):
+        rows = self.query('''
+            SELECT st.name, a.average
+            FROM (
+                SELECT student_id, SUM(score) / COUNT(*) AS average FROM exam_scores
+                WHERE subject_id = (SELECT id FROM subjects WHERE name = ?)
+                GROUP BY student_id
+            ) a
+            JOIN students st ON st.id = a.student_id
+            ORDER BY a.average DESC, a.student_id
+        ''', (subject,))
+        return [{'name': name, 'score': round(float(average), 2)} for name, average in rows]
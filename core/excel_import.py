@@ -1,19 +1,39 @@
 """
 Excel import functionality with simple structure parsing.
 Expects format: Student Name | Exam | Subject1 | Subject2 | ...
+The same layout is also accepted from CSV and Parquet files.
 """
 
+import os
+import hashlib
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from models.student_model import (
-    get_student_by_name, add_student, get_connection
-)
+from models.student_model import get_read_connection, run_write, notify_student_change, lookup_ids, insert_exams
+from models.request_cache import clear_request_cache
+from core.metrics import timed_section
 
-def parse_excel_structure(df):
+# Values treated as a missing student or exam name
+MISSING_NAMES = ['nan', 'none', '']
+
+def parse_excel_frame(df, default_exam='Imported Exam'):
     """
-    Parse Excel with expected structure:
-    Columns: Student Name, Exam, [Subject columns...]
+    Parse Excel data into records using vectorized pandas operations.
     
-    Returns parsed data structure.
+    The subject columns are reshaped to long format (one entry per cell),
+    converted with pd.to_numeric and range-filtered with masks, so no
+    Python code runs per cell.
+    
+    Args:
+        df: DataFrame in the Student Name | Exam | Subjects... layout
+        default_exam: Exam name used where the Exam cell is blank
+    
+    Returns:
+        (records, rejected) - records as described in parse_excel_structure,
+        rejected a summary of cells and rows that were dropped
     """
     # Expected first two columns: Student Name and Exam
     if len(df.columns) < 3:
@@ -22,55 +42,383 @@ def parse_excel_structure(df):
     # Get column names
     name_col = df.columns[0]  # First column is student name
     exam_col = df.columns[1]  # Second column is exam name
-    subject_cols = df.columns[2:]  # Rest are subjects
+    subject_cols = list(df.columns[2:])  # Rest are subjects
+    
+    names = df[name_col].astype(str).str.strip()
+    exams = df[exam_col].astype(str).str.strip()
+    exams = exams.where(~exams.str.lower().isin(MISSING_NAMES), default_exam)
+    named_rows = ~names.str.lower().isin(MISSING_NAMES)
+    
+    # Wide to long: flatten the score block row-major, so cell k belongs to
+    # spreadsheet row k // n_subjects and subject column k % n_subjects
+    n_subjects = len(subject_cols)
+    row_numbers = np.flatnonzero(named_rows.to_numpy())
+    raw = pd.Series(df[subject_cols].to_numpy()[row_numbers].ravel())
+    
+    values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+    blank = raw.isna().to_numpy()
+    missing = np.isnan(values)
+    non_numeric = missing & ~blank
+    out_of_range = ~missing & ((values < 0) | (values > 100))
+    valid = ~missing & ~out_of_range
     
-    # Parse the data
+    cells = np.flatnonzero(valid)
+    rows = row_numbers[cells // n_subjects]
+    cols = cells % n_subjects
+    
+    subjects = [str(col).strip() for col in subject_cols]
+    
+    # Split the long arrays into one slice per spreadsheet row
     records = []
-    for _, row in df.iterrows():
-        student_name = str(row[name_col]).strip()
-        if not student_name or student_name.lower() in ['nan', 'none', '']:
-            continue
-        
-        exam_name = str(row[exam_col]).strip()
-        if not exam_name or exam_name.lower() in ['nan', 'none', '']:
-            exam_name = 'Imported Exam'
-        
-        # Extract subject scores
-        scores = {}
-        for col in subject_cols:
-            try:
-                score = float(row[col])
-                if 0 <= score <= 100:  # Valid score range
-                    subject = str(col).strip()
-                    scores[subject] = score
-            except:
-                continue
-        
-        if scores:
+    if len(rows):
+        boundaries = np.flatnonzero(np.diff(rows)) + 1
+        starts = np.concatenate(([0], boundaries)).tolist()
+        ends = np.concatenate((boundaries, [len(rows)])).tolist()
+        names_list = names.tolist()
+        exams_list = exams.tolist()
+        cols_list = cols.tolist()
+        scores_list = values[cells].tolist()
+        for start, end in zip(starts, ends):
+            row = rows[start]
             records.append({
-                'student_name': student_name,
-                'exam_name': exam_name,
-                'scores': scores
+                'student_name': names_list[row],
+                'exam_name': exams_list[row],
+                'scores': {subjects[c]: v for c, v in zip(cols_list[start:end], scores_list[start:end])}
             })
     
+    rejected_cols = np.bincount(np.flatnonzero(non_numeric | out_of_range) % n_subjects, minlength=n_subjects)
+    rejected = {
+        'rows_without_name': int((~named_rows).sum()),
+        'rows_without_scores': int(named_rows.sum()) - len(records),
+        'non_numeric_cells': int(non_numeric.sum()),
+        'out_of_range_cells': int(out_of_range.sum()),
+        'by_subject': {
+            subjects[col]: int(count) for col, count in enumerate(rejected_cols) if count
+        }
+    }
+    
+    return records, rejected
+
+def parse_excel_structure(df):
+    """
+    Parse Excel with expected structure:
+    Columns: Student Name, Exam, [Subject columns...]
+    
+    Returns parsed data structure.
+    """
+    records, _ = parse_excel_frame(df)
     return records
 
-def check_duplicate_exam(student_id, exam_name, subject):
-    """Check if an exam entry already exists."""
-    conn = get_connection()
+def fingerprint_record(record):
+    """Hash a parsed record's exam name and scores, independent of column order."""
+    scores = ';'.join(f'{subject}={float(score)!r}' for subject, score in sorted(record['scores'].items()))
+    return hashlib.sha1(f"{record['exam_name']}|{scores}".encode('utf-8')).hexdigest()
+
+def hash_file(file):
+    """SHA-256 of a file's bytes (path or seekable file object)."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        file.seek(0)
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+        file.seek(0)
+    return digest.hexdigest()
+
+def find_imported_file(file_hash):
+    """Look up a previous import of a byte-identical file in the ledger."""
+    conn = get_read_connection()
     cursor = conn.cursor()
+    cursor.execute('SELECT filename, rows, imported_at FROM import_files WHERE file_hash = ?', (file_hash,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    if row:
+        return {'filename': row[0], 'rows': row[1], 'imported_at': row[2]}
+    return None
+
+class ImportLayoutError(Exception):
+    """Raised while importing chunks that lack the Student Name, Exam and subject columns."""
+
+class BulkImporter:
+    """
+    Write parsed records to the database in a single transaction.
     
-    cursor.execute('''
-        SELECT COUNT(*) FROM exams
-        WHERE student_id = ? AND exam_name = ? AND subject = ?
-    ''', (student_id, exam_name, subject))
+    Records are collected until commit() or the end of the with-block and
+    then written as one operation on the writer thread (see run_write);
+    write_all() instead writes a stream of batches in one operation without
+    collecting them. Either way other writes queue up between an import's
+    transactions instead of waiting on the database lock. Student names are resolved from a name -> id map loaded with one query,
+    missing students are created in bulk, duplicates are detected against an
+    in-memory set of (student_id, exam_name, subject) keys and exams are
+    inserted with executemany. Leaving the with-block commits; an exception
+    discards everything written since the last commit.
     
-    count = cursor.fetchone()[0]
-    conn.close()
+    With a ledger ({'file_hash': ..., 'filename': ...}) every record is
+    fingerprinted and checked against the import_rows ledger: unchanged rows
+    are skipped, rows whose scores changed since the last import update the
+    stored scores, and the file hash is recorded on commit so an identical
+    upload can be skipped outright (see find_imported_file). Earlier files
+    whose rows this import takes over lose that record, so re-uploading one
+    (e.g. to undo an edit) re-applies its rows.
+    
+    Usage:
+        with BulkImporter(avoid_duplicates=True) as importer:
+            importer.write_records(records)
+        importer.counts  # students_added, students_updated, exams_added, duplicates_skipped, ...
+    """
+    
+    def __init__(self, avoid_duplicates=True, ledger=None):
+        self.avoid_duplicates = avoid_duplicates
+        self.ledger = ledger
+        self.rows_seen = 0
+        self.pending = []          # records not written yet
+        self.loaded = False
+        self.cursor = None         # the writer's cursor while pending records are written
+        self.student_ids = {}      # lowercase name -> id
+        self.existing_ids = set()  # students that existed before this import
+        self.exam_keys = set()     # (student_id, exam_name, subject) already stored
+        self.loaded_keys_for = set()
+        self.added_students = []
+        self.counts = {
+            'students_added': 0,
+            'students_updated': 0,
+            'exams_added': 0,
+            'duplicates_skipped': 0,
+            'rows_unchanged': 0,
+            'rows_changed': 0,
+            'exams_updated': 0
+        }
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush(finished=True)
+        finally:
+            self.pending = []
+            clear_request_cache()
+        return False
     
-    return count > 0
+    def write_pending(self, cursor, finished):
+        """Write the collected records (runs on the writer thread, inside its transaction)."""
+        self.cursor = cursor
+        try:
+            if not self.loaded:
+                cursor.execute('SELECT id, name FROM students')
+                for student_id, name in cursor.fetchall():
+                    self.student_ids[name.lower()] = student_id
+                self.existing_ids = set(self.student_ids.values())
+                self.loaded = True
+            
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS import_student_ids (id INTEGER PRIMARY KEY)')
+            if self.pending:
+                self.insert_records(self.pending)
+            if finished and self.ledger:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO import_files (file_hash, filename, rows)
+                    VALUES (?, ?, ?)
+                ''', (self.ledger['file_hash'], self.ledger.get('filename'), self.rows_seen))
+        finally:
+            self.cursor = None
+    
+    def flush(self, finished=False):
+        """Write and commit the collected records as one operation on the writer thread."""
+        self.run(self.write_pending, finished)
+    
+    def write_all(self, batches, written=None):
+        """
+        Write batches of records in one operation on the writer thread, so they
+        commit or roll back together while only one batch is held in memory.
+        
+        Args:
+            batches: Iterable of record lists, consumed on the writer thread
+            written: Optional callback called after each batch is written
+        """
+        def write(cursor):
+            for records in batches:
+                self.pending = records
+                self.write_pending(cursor, False)
+                self.pending = []
+                if written:
+                    written()
+        
+        self.run(write)
+    
+    def run(self, operation, *args):
+        """Run a write operation on the writer thread, undoing this importer's bookkeeping if it fails."""
+        counts = dict(self.counts)
+        try:
+            run_write(operation, *args)
+        except Exception:
+            # The operation was rolled back, so its counts and new students never happened
+            self.counts = counts
+            self.added_students = []
+            raise
+        finally:
+            self.pending = []
+        
+        # Committed students can no longer be rolled back, so announce them now
+        for student_id, name in self.added_students:
+            notify_student_change('add', student_id, name)
+        self.added_students = []
+    
+    def commit(self):
+        """Commit what has been written so far."""
+        self.flush()
+    
+    def release_keys(self):
+        """
+        Forget cached duplicate keys to keep memory bounded.
+        
+        Keys are re-read from the database (which includes rows written by
+        this importer) the next time a student shows up.
+        """
+        self.exam_keys.clear()
+        self.loaded_keys_for.clear()
+    
+    def create_missing_students(self, records):
+        """Insert every student in records that does not exist yet, in one batch."""
+        missing = {}
+        for record in records:
+            key = record['student_name'].lower()
+            if key not in self.student_ids and key not in missing:
+                missing[key] = record['student_name']
+        
+        if not missing:
+            return
+        
+        self.cursor.executemany('''
+            INSERT INTO students (name, marks, grade, section, age, gender, email, phone, address)
+            VALUES (?, '{}', '', '', '', '', '', '', '')
+        ''', [(name,) for name in missing.values()])
+        
+        # Fetch the new ids (names are unique, new rows have the highest ids)
+        self.cursor.execute('SELECT id, name FROM students ORDER BY id DESC LIMIT ?', (len(missing),))
+        for student_id, name in self.cursor.fetchall():
+            self.student_ids[name.lower()] = student_id
+            self.added_students.append((student_id, name))
+    
+    def load_exam_keys(self, student_ids):
+        """Load existing (student, exam, subject) keys for students not loaded yet."""
+        pending = [sid for sid in student_ids if sid in self.existing_ids and sid not in self.loaded_keys_for]
+        if not pending:
+            return
+        
+        self.cursor.execute('DELETE FROM import_student_ids')
+        self.cursor.executemany('INSERT INTO import_student_ids (id) VALUES (?)', [(sid,) for sid in pending])
+        self.cursor.execute('''
+            SELECT e.student_id, e.exam_name, e.subject
+            FROM exams e
+            JOIN import_student_ids i ON i.id = e.student_id
+        ''')
+        self.exam_keys.update(self.cursor.fetchall())
+        self.loaded_keys_for.update(pending)
+    
+    def load_row_hashes(self, student_ids):
+        """Get the ledger entries {(student_id, exam_name): (row_hash, file_hash)} for these students."""
+        pending = [sid for sid in student_ids if sid in self.existing_ids]
+        if not pending:
+            return {}
+        
+        self.cursor.execute('DELETE FROM import_student_ids')
+        self.cursor.executemany('INSERT INTO import_student_ids (id) VALUES (?)', [(sid,) for sid in pending])
+        self.cursor.execute('''
+            SELECT r.student_id, r.exam_name, r.row_hash, r.file_hash
+            FROM import_rows r
+            JOIN import_student_ids i ON i.id = r.student_id
+        ''')
+        return {(sid, exam_name): (row_hash, file_hash) for sid, exam_name, row_hash, file_hash in self.cursor.fetchall()}
+    
+    def update_changed_rows(self, changed):
+        """Overwrite stored scores for rows whose fingerprint changed."""
+        subject_ids = lookup_ids(self.cursor, 'subjects', (subject for _, _, scores in changed for subject in scores))
+        session_ids = lookup_ids(self.cursor, 'exam_sessions', (exam_name for _, exam_name, _ in changed))
+        for student_id, exam_name, scores in changed:
+            for subject, score in scores.items():
+                self.cursor.execute('''
+                    UPDATE exam_scores SET score = ?
+                    WHERE student_id = ? AND exam_session_id = ? AND subject_id = ?
+                ''', (score, student_id, session_ids[exam_name], subject_ids[subject]))
+                if self.cursor.rowcount:
+                    self.counts['exams_updated'] += self.cursor.rowcount
+                else:
+                    insert_exams(self.cursor, [(student_id, subject, score, exam_name)])
+                    self.counts['exams_added'] += 1
+                self.exam_keys.add((student_id, exam_name, subject))
+    
+    def write_records(self, records):
+        """Add a batch of parsed records (see parse_excel_structure), written on the next commit."""
+        self.pending.extend(records)
+    
+    def insert_records(self, records):
+        """Insert parsed records through the writer's cursor."""
+        self.create_missing_students(records)
+        
+        record_ids = [self.student_ids[record['student_name'].lower()] for record in records]
+        if self.avoid_duplicates:
+            self.load_exam_keys(set(record_ids))
+        row_hashes = self.load_row_hashes(set(record_ids)) if self.ledger else {}
+        
+        rows = []
+        changed = []
+        ledger_rows = []
+        superseded_files = set()
+        self.rows_seen += len(records)
+        for record, student_id in zip(records, record_ids):
+            # The first record of a newly created student counts as added, later ones as updated
+            if student_id in self.existing_ids:
+                self.counts['students_updated'] += 1
+            else:
+                self.counts['students_added'] += 1
+                self.existing_ids.add(student_id)
+                self.loaded_keys_for.add(student_id)
+            
+            exam_name = record['exam_name']
+            if self.ledger:
+                row_hash = fingerprint_record(record)
+                previous, previous_file = row_hashes.get((student_id, exam_name), (None, None))
+                row_hashes[(student_id, exam_name)] = (row_hash, self.ledger['file_hash'])
+                if previous_file not in (None, self.ledger['file_hash']):
+                    superseded_files.add(previous_file)
+                ledger_rows.append((student_id, exam_name, row_hash, self.ledger['file_hash']))
+                if previous == row_hash:
+                    self.counts['rows_unchanged'] += 1
+                    continue
+                if previous is not None:
+                    self.counts['rows_changed'] += 1
+                    changed.append((student_id, exam_name, record['scores']))
+                    continue
+            
+            for subject, score in record['scores'].items():
+                key = (student_id, exam_name, subject)
+                if self.avoid_duplicates:
+                    if key in self.exam_keys:
+                        self.counts['duplicates_skipped'] += 1
+                        continue
+                    self.exam_keys.add(key)
+                rows.append((student_id, subject, score, exam_name))
+        
+        insert_exams(self.cursor, rows)
+        self.counts['exams_added'] += len(rows)
+        
+        if changed:
+            self.update_changed_rows(changed)
+        if ledger_rows:
+            self.cursor.executemany('''
+                INSERT OR REPLACE INTO import_rows (student_id, exam_name, row_hash, file_hash)
+                VALUES (?, ?, ?, ?)
+            ''', ledger_rows)
+        # Files whose rows now come from this one no longer describe the stored data,
+        # so uploading them again must be diffed row by row instead of skipped
+        self.cursor.executemany('DELETE FROM import_files WHERE file_hash = ?', [(h,) for h in sorted(superseded_files)])
 
-def import_excel_from_upload(file, avoid_duplicates=True):
+def import_excel_from_upload(file, avoid_duplicates=True, ledger=None):
     """
     Import Excel from uploaded file object.
     
@@ -79,30 +427,42 @@ def import_excel_from_upload(file, avoid_duplicates=True):
     Column 2: Exam
     Columns 3+: Subjects (with numeric scores)
     
+    Workbooks with several sheets (one per exam or section) have every
+    sheet parsed, in parallel for large files, and imported together.
+    
     Args:
-        file: Werkzeug FileStorage object
+        file: Werkzeug FileStorage object, file object or path
         avoid_duplicates: Skip duplicate exam entries
+        ledger: Optional {'file_hash', 'filename'} to diff rows against the import ledger
     
     Returns:
         dict with import statistics
     """
     try:
-        # Read directly from file object
-        df = pd.read_excel(file)
-        
-        if df.empty:
-            return {'error': 'Excel file is empty'}
-        
-        if len(df.columns) < 3:
-            return {'error': 'Excel must have at least 3 columns: Student Name, Exam, and subject(s)'}
+        with pd.ExcelFile(file) as workbook:
+            sheet_names = workbook.sheet_names
+            df = workbook.parse(sheet_names[0]) if len(sheet_names) == 1 else None
+        errors = []
         
-        # Parse structure
-        try:
-            records = parse_excel_structure(df)
-        except Exception as e:
-            return {'error': f'Failed to parse Excel: {str(e)}'}
+        if len(sheet_names) > 1:
+            # One sheet per exam or section: parse them in parallel and import together
+            records, rejected, errors = parse_workbook_sheets(file, sheet_names)
+        else:
+            if df.empty:
+                return {'error': 'Excel file is empty'}
+            
+            if len(df.columns) < 3:
+                return {'error': 'Excel must have at least 3 columns: Student Name, Exam, and subject(s)'}
+            
+            # Parse structure
+            try:
+                records, rejected = parse_excel_frame(df)
+            except Exception as e:
+                return {'error': f'Failed to parse Excel: {str(e)}'}
         
         if not records:
+            if errors:
+                return {'error': '; '.join(errors)}
             return {'error': 'No valid data found in Excel file'}
         
         # Import data
@@ -112,46 +472,362 @@ def import_excel_from_upload(file, avoid_duplicates=True):
             'students_updated': 0,
             'exams_added': 0,
             'duplicates_skipped': 0,
-            'errors': []
+            'rejected': rejected,
+            'sheets': len(sheet_names),
+            'errors': errors
         }
         
-        for record in records:
-            try:
-                student_name = record['student_name']
-                exam_name = record['exam_name']
-                scores = record['scores']
-                
-                # Get or create student
-                student = get_student_by_name(student_name)
-                
-                if not student:
-                    student_id = add_student(student_name, '', '', '', '', '', '', '')
-                    stats['students_added'] += 1
-                else:
-                    student_id = student['id']
-                    stats['students_updated'] += 1
-                
-                # Add exam data
-                for subject, score in scores.items():
-                    if avoid_duplicates and check_duplicate_exam(student_id, exam_name, subject):
-                        stats['duplicates_skipped'] += 1
-                        continue
-                    
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT INTO exams (student_id, exam_name, subject, score)
-                        VALUES (?, ?, ?, ?)
-                    ''', (student_id, exam_name, subject, score))
-                    conn.commit()
-                    conn.close()
-                    
-                    stats['exams_added'] += 1
-                
-            except Exception as e:
-                stats['errors'].append(f"Error processing {record.get('student_name', 'unknown')}: {str(e)}")
+        try:
+            with BulkImporter(avoid_duplicates, ledger) as importer:
+                importer.write_records(records)
+        except Exception as e:
+            return {'error': f'Import failed and was rolled back, nothing was imported: {str(e)}'}
         
+        stats.update(importer.counts)
         return stats
         
     except Exception as e:
         return {'error': f'Failed to process Excel file: {str(e)}'}
+
+
+# Rows parsed and written per chunk in streaming mode
+STREAM_CHUNK_ROWS = 5000
+
+# Chunks written per transaction in streaming mode
+STREAM_CHUNKS_PER_COMMIT = 4
+
+# File types accepted by import_file
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+
+# Workbooks smaller than this parse their sheets in-process (a process pool costs more than it saves)
+PARALLEL_SHEETS_MIN_BYTES = 1024 * 1024
+
+def empty_rejected():
+    """Get an empty rejected-cell summary (see parse_excel_frame)."""
+    return {
+        'rows_without_name': 0,
+        'rows_without_scores': 0,
+        'non_numeric_cells': 0,
+        'out_of_range_cells': 0,
+        'by_subject': {}
+    }
+
+def merge_rejected(total, rejected):
+    """Add one rejected-cell summary into another."""
+    for key in ('rows_without_name', 'rows_without_scores', 'non_numeric_cells', 'out_of_range_cells'):
+        total[key] += rejected[key]
+    for subject, count in rejected['by_subject'].items():
+        total['by_subject'][subject] = total['by_subject'].get(subject, 0) + count
+    return total
+
+def spool_to_path(file, suffix):
+    """
+    Get a filesystem path for file, copying file objects to a temp file.
+    
+    Returns:
+        (path, is_temp) - delete path afterwards when is_temp is True
+    """
+    if isinstance(file, (str, os.PathLike)):
+        return os.fspath(file), False
+    
+    handle, path = tempfile.mkstemp(prefix='scoresense_sheets_', suffix=suffix)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    with os.fdopen(handle, 'wb') as spool:
+        shutil.copyfileobj(file, spool)
+    return path, True
+
+def parse_sheet(path, sheet_name, default_exam):
+    """
+    Read and parse one worksheet (runs in a worker process).
+    
+    Returns:
+        (sheet_name, records, rejected, error)
+    """
+    try:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        if df.empty or len(df.columns) < 3:
+            return sheet_name, [], empty_rejected(), f'Sheet {sheet_name} skipped: needs Student Name, Exam and subject columns'
+        records, rejected = parse_excel_frame(df, default_exam)
+        return sheet_name, records, rejected, None
+    except Exception as e:
+        return sheet_name, [], empty_rejected(), f'Sheet {sheet_name} failed to parse: {str(e)}'
+
+def parse_workbook_sheets(file, sheet_names):
+    """
+    Parse every sheet of a workbook, in parallel worker processes for large files.
+    
+    Blank exam names default to the sheet name, for workbooks with one sheet
+    per exam.
+    
+    Returns:
+        (records, rejected, errors) merged over all sheets, in sheet order
+    """
+    path, is_temp = spool_to_path(file, '.xlsx')
+    try:
+        jobs = [(path, name, name) for name in sheet_names]
+        
+        workers = min(len(jobs), os.cpu_count() or 1)
+        if workers < 2 or os.path.getsize(path) < PARALLEL_SHEETS_MIN_BYTES:
+            results = [parse_sheet(*job) for job in jobs]
+        else:
+            # spawn: forking a threaded web process is unsafe
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(parse_sheet, *zip(*jobs)))
+    finally:
+        if is_temp:
+            os.remove(path)
+    
+    records = []
+    rejected = empty_rejected()
+    errors = []
+    for _, sheet_records, sheet_rejected, error in results:
+        records.extend(sheet_records)
+        merge_rejected(rejected, sheet_rejected)
+        if error:
+            errors.append(error)
+    
+    return records, rejected, errors
+
+def iter_sheet_chunks(file, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Read every worksheet in openpyxl read-only mode and yield DataFrames
+    of at most chunk_rows rows, so a whole sheet is never held in memory.
+    
+    The first row of each sheet is used as the header for its chunks. In
+    workbooks with several sheets, chunk.attrs['sheet'] names the sheet a
+    chunk came from (blank exam names default to it, as in
+    import_excel_from_upload).
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        several = len(workbook.worksheets) > 1
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            columns = [col if col is not None else f'Unnamed: {i}' for i, col in enumerate(header)]
+            
+            def make_frame(chunk):
+                frame = pd.DataFrame.from_records(chunk, columns=columns)
+                if several:
+                    frame.attrs['sheet'] = sheet.title
+                return frame
+            
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    yield make_frame(chunk)
+                    chunk = []
+            if chunk:
+                yield make_frame(chunk)
+    finally:
+        workbook.close()
+
+def iter_csv_chunks(file, chunk_rows=STREAM_CHUNK_ROWS):
+    """Read a CSV file with pandas' chunked reader."""
+    with pd.read_csv(file, chunksize=chunk_rows, skipinitialspace=True) as reader:
+        for chunk in reader:
+            yield chunk
+
+def iter_parquet_chunks(file, chunk_rows=STREAM_CHUNK_ROWS):
+    """Read a Parquet file batch by batch with pyarrow's columnar reader."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Parquet import needs pyarrow (pip install pyarrow)')
+    
+    parquet_file = pq.ParquetFile(file)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+def import_chunks(chunks, avoid_duplicates=True, chunks_per_commit=None, progress=None, ledger=None):
+    """
+    Parse and import DataFrame chunks through one BulkImporter.
+    
+    Args:
+        chunks: Iterable of DataFrames in the Student Name | Exam | Subjects... layout
+        avoid_duplicates: Skip duplicate exam entries
+        chunks_per_commit: Commit every this many chunks. None imports
+                           everything in one transaction that rolls back
+                           completely on error.
+        progress: Optional callback called with the stats dict after each chunk
+        ledger: Optional {'file_hash', 'filename'} to diff rows against the import ledger
+    
+    Returns:
+        dict with import statistics
+    """
+    stats = {
+        'total_records': 0,
+        'students_added': 0,
+        'students_updated': 0,
+        'exams_added': 0,
+        'duplicates_skipped': 0,
+        'rows_read': 0,
+        'rows_committed': 0,
+        'chunks': 0,
+        'rejected': empty_rejected(),
+        'errors': []
+    }
+    committed_counts = {}
+    
+    def parsed_chunks():
+        """Parse the chunks, counting them in stats, and yield their records."""
+        for chunk in chunks:
+            sheet = chunk.attrs.get('sheet')
+            if len(chunk.columns) < 3:
+                if sheet is None:
+                    raise ImportLayoutError('File must have at least 3 columns: Student Name, Exam, and subject(s)')
+                # Like the in-memory import, skip that sheet and keep the others
+                error = f'Sheet {sheet} skipped: needs Student Name, Exam and subject columns'
+                if error not in stats['errors']:
+                    stats['errors'].append(error)
+                continue
+            
+            records, rejected = parse_excel_frame(chunk, sheet) if sheet else parse_excel_frame(chunk)
+            stats['chunks'] += 1
+            stats['rows_read'] += len(chunk)
+            stats['total_records'] += len(records)
+            merge_rejected(stats['rejected'], rejected)
+            yield records
+    
+    def chunk_written():
+        stats.update(importer.counts)
+        if progress:
+            progress(stats)
+    
+    try:
+        with BulkImporter(avoid_duplicates, ledger) as importer:
+            if chunks_per_commit:
+                for records in parsed_chunks():
+                    importer.write_records(records)
+                    if stats['chunks'] % chunks_per_commit == 0:
+                        importer.commit()
+                        importer.release_keys()
+                        stats['rows_committed'] = stats['rows_read']
+                        committed_counts = dict(importer.counts)
+                    chunk_written()
+            else:
+                # One transaction, with each chunk written as soon as it is parsed
+                # (on the writer thread), so the whole file is never held in memory
+                importer.write_all(parsed_chunks(), chunk_written)
+        
+        # The last records are written when the with-block exits
+        stats.update(importer.counts)
+        stats['rows_committed'] = stats['rows_read']
+    except ImportLayoutError as e:
+        return {'error': str(e)}
+    except Exception as e:
+        if not chunks_per_commit:
+            return {'error': f'Import failed and was rolled back, nothing was imported: {str(e)}'}
+        # Report only what survived the rollback
+        stats.update({key: 0 for key in BulkImporter().counts})
+        stats.update(committed_counts)
+        stats['errors'].append(f"Import stopped after {stats['rows_committed']} committed rows: {str(e)}")
+        return stats
+    
+    if stats['rows_read'] == 0:
+        return {'error': 'File is empty'}
+    if stats['total_records'] == 0:
+        return {'error': 'No valid data found in file'}
+    
+    return stats
+
+def import_excel_streaming(file, avoid_duplicates=True, chunk_rows=STREAM_CHUNK_ROWS,
+                           chunks_per_commit=STREAM_CHUNKS_PER_COMMIT, progress=None, ledger=None):
+    """
+    Import a large .xlsx file chunk by chunk with bounded memory.
+    Every worksheet is imported, one after the other.
+    
+    Each chunk is parsed with parse_excel_frame and written through the same
+    BulkImporter as import_excel_from_upload. Work is committed every
+    chunks_per_commit chunks, so unlike the in-memory import a failure keeps
+    the batches committed before it (reported as 'rows_committed').
+    
+    Args:
+        file: Path or file object of an .xlsx workbook
+        avoid_duplicates: Skip duplicate exam entries
+        chunk_rows: Spreadsheet rows per chunk
+        chunks_per_commit: Chunks per transaction
+        progress: Optional callback called with the stats dict after each chunk
+        ledger: Optional {'file_hash', 'filename'} to diff rows against the import ledger
+    
+    Returns:
+        dict with import statistics
+    """
+    return import_chunks(iter_sheet_chunks(file, chunk_rows), avoid_duplicates, chunks_per_commit, progress, ledger)
+
+def import_csv(file, avoid_duplicates=True, streaming=False, progress=None, ledger=None):
+    """
+    Import a CSV file (same column layout as the Excel import) in chunks.
+    
+    With streaming the chunks are committed in batches, otherwise the whole
+    file is one transaction.
+    """
+    chunks_per_commit = STREAM_CHUNKS_PER_COMMIT if streaming else None
+    return import_chunks(iter_csv_chunks(file), avoid_duplicates, chunks_per_commit, progress, ledger)
+
+def import_parquet(file, avoid_duplicates=True, streaming=False, progress=None, ledger=None):
+    """
+    Import a Parquet file (same column layout as the Excel import) by record batch.
+    
+    With streaming the batches are committed as they go, otherwise the whole
+    file is one transaction. Needs pyarrow.
+    """
+    chunks_per_commit = STREAM_CHUNKS_PER_COMMIT if streaming else None
+    try:
+        return import_chunks(iter_parquet_chunks(file), avoid_duplicates, chunks_per_commit, progress, ledger)
+    except ValueError as e:
+        return {'error': str(e)}
+
+@timed_section('import')
+def import_file(file, filename, avoid_duplicates=True, streaming=False, progress=None, use_ledger=True):
+    """
+    Import any supported file type, picking the reader from the extension.
+    
+    With use_ledger, a byte-identical file that was imported before is
+    skipped without being read, and for edited files only the rows that are
+    new or changed since the last import are applied.
+    
+    Args:
+        file: Path or file object
+        filename: Original file name (used for the extension)
+        avoid_duplicates: Skip duplicate exam entries
+        streaming: Commit in batches with bounded memory instead of one transaction
+        progress: Optional callback for chunked readers
+        use_ledger: Fingerprint the file and its rows in the import ledger
+    
+    Returns:
+        dict with import statistics
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return {'error': f'Unsupported file type: {extension or filename}'}
+    
+    ledger = None
+    if use_ledger:
+        ledger = {'file_hash': hash_file(file), 'filename': filename}
+        previous = find_imported_file(ledger['file_hash'])
+        if previous:
+            return {
+                'total_records': 0,
+                'students_added': 0,
+                'students_updated': 0,
+                'exams_added': 0,
+                'duplicates_skipped': 0,
+                'skipped_identical_file': True,
+                'message': f"This exact file was already imported on {previous['imported_at']} ({previous['rows']} rows). Nothing to do.",
+                'errors': []
+            }
+    
+    if extension == '.csv':
+        return import_csv(file, avoid_duplicates, streaming, progress, ledger)
+    if extension == '.parquet':
+        return import_parquet(file, avoid_duplicates, streaming, progress, ledger)
+    if extension == '.xlsx' and streaming:
+        return import_excel_streaming(file, avoid_duplicates, progress=progress, ledger=ledger)
+    return import_excel_from_upload(file, avoid_duplicates, ledger)
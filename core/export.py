@@ -0,0 +1,223 @@
+"""
+Streaming bulk export of the students and exams tables.
+Rows are read from a SQLite cursor a batch at a time and written out as
+CSV, XLSX (openpyxl write-only mode) or Parquet, so memory stays flat no
+matter how many rows are exported.
+"""
+
+import csv
+import io
+import os
+import tempfile
+from models.student_model import get_read_connection
+
+# Rows fetched from the cursor (and written) per batch
+EXPORT_BATCH_ROWS = 5000
+
+# Bytes per chunk when streaming a finished file
+EXPORT_READ_BYTES = 256 * 1024
+
+# Exportable tables: name -> (query, column names)
+EXPORT_TABLES = {
+    'students': (
+        '''
+        SELECT id, name, grade, section, age, gender, email, phone, address, created_at
+        FROM students
+        ORDER BY id
+        ''',
+        ['id', 'name', 'grade', 'section', 'age', 'gender', 'email', 'phone', 'address', 'created_at']
+    ),
+    'exams': (
+        '''
+        SELECT e.id, e.student_id, s.name, e.exam_name, e.subject, e.score, e.exam_date
+        FROM exams e
+        JOIN students s ON s.id = e.student_id
+        ORDER BY e.id
+        ''',
+        ['id', 'student_id', 'student_name', 'exam_name', 'subject', 'score', 'exam_date']
+    )
+}
+
+# Export format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+
+def check_export(table, fmt):
+    """Raise ValueError for an unknown table or format."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table: {table} (choose from {', '.join(EXPORT_TABLES)})")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (choose from {', '.join(EXPORT_FORMATS)})")
+    if fmt == 'parquet':
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError('Parquet export needs pyarrow (pip install pyarrow)')
+
+def iter_row_batches(table, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Yield lists of row tuples from a table, batch_rows at a time.
+    
+    SQLite steps the query as rows are fetched, so only the current batch
+    is ever held in memory.
+    """
+    query, _ = EXPORT_TABLES[table]
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def iter_csv(table):
+    """Yield the table as CSV, one encoded chunk per row batch."""
+    _, columns = EXPORT_TABLES[table]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(columns)
+    for rows in iter_row_batches(table):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def write_xlsx(table, path):
+    """Write the table to a workbook in openpyxl write-only mode."""
+    from openpyxl import Workbook
+    
+    _, columns = EXPORT_TABLES[table]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=table)
+    sheet.append(columns)
+    for rows in iter_row_batches(table):
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+class ChunkSink:
+    """Minimal writable file that hands out what was written since the last drain."""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def writable(self):
+        return True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+# Parquet column types; other columns are written as strings (SQLite columns may mix types)
+PARQUET_COLUMN_TYPES = {'id': 'int64', 'student_id': 'int64', 'score': 'float64'}
+
+def iter_parquet(table):
+    """Yield the table as Parquet, one row group per row batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    _, columns = EXPORT_TABLES[table]
+    schema = pa.schema([(column, PARQUET_COLUMN_TYPES.get(column, 'string')) for column in columns])
+    string_columns = [i for i, column in enumerate(columns) if column not in PARQUET_COLUMN_TYPES]
+    
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in iter_row_batches(table):
+        values = [list(column) for column in zip(*rows)]
+        for i in string_columns:
+            values[i] = [None if value is None else str(value) for value in values[i]]
+        writer.write_table(pa.Table.from_arrays(values, schema=schema))
+        yield sink.drain()
+    
+    writer.close()
+    yield sink.drain()
+
+def iter_file(path, remove=False):
+    """Yield a file's bytes in blocks, optionally deleting it afterwards."""
+    try:
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(EXPORT_READ_BYTES), b''):
+                yield block
+    finally:
+        if remove:
+            os.remove(path)
+
+def iter_xlsx(table):
+    """Yield the table as an XLSX workbook (built in a temp file, then streamed)."""
+    handle, path = tempfile.mkstemp(prefix='scoresense_export_', suffix='.xlsx')
+    os.close(handle)
+    try:
+        write_xlsx(table, path)
+    except Exception:
+        os.remove(path)
+        raise
+    yield from iter_file(path, remove=True)
+
+def iter_export(table, fmt):
+    """
+    Stream a table export as bytes chunks, suitable for a generator response.
+    
+    Args:
+        table: 'students' or 'exams'
+        fmt: 'csv', 'xlsx' or 'parquet'
+    
+    Returns:
+        iterator of bytes
+    """
+    check_export(table, fmt)
+    if fmt == 'csv':
+        return iter_csv(table)
+    if fmt == 'xlsx':
+        return iter_xlsx(table)
+    return iter_parquet(table)
+
+def export_to_file(table, fmt, output):
+    """
+    Write a table export to a path or binary file object.
+    
+    Returns:
+        number of bytes written
+    """
+    check_export(table, fmt)
+    if fmt == 'xlsx' and isinstance(output, (str, os.PathLike)):
+        write_xlsx(table, output)
+        return os.path.getsize(output)
+    
+    written = 0
+    handle = open(output, 'wb') if isinstance(output, (str, os.PathLike)) else output
+    try:
+        for chunk in iter_export(table, fmt):
+            handle.write(chunk)
+            written += len(chunk)
+    finally:
+        if handle is not output:
+            handle.close()
+    return written
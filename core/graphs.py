@@ -4,41 +4,29 @@ import matplotlib.pyplot as plt
 import numpy as np
 import io
 import base64
-from models.student_model import get_all_students, get_student_by_name, get_student_by_id
+from models.student_model import get_all_students, get_student_by_name, get_student_by_id, get_all_exams_for_student
 from core.stats import get_subject_averages, get_score_distribution, compare_subject_scores
+from models.exam_snapshot import get_exam_snapshot
+from models.archive import get_full_history
+from core.metrics import timed_section
 
 def get_student_latest_scores(student_name):
     """Get the most recent score for each subject for a student."""
-    import sqlite3
-    from models.student_model import get_connection
-    
     student = get_student_by_name(student_name)
     if not student:
         return {}
     
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get latest score for each subject
-    cursor.execute('''
-        SELECT subject, score
-        FROM exams
-        WHERE student_id = ? AND id IN (
-            SELECT MAX(id)
-            FROM exams
-            WHERE student_id = ?
-            GROUP BY subject
-        )
-        ORDER BY subject
-    ''', (student['id'], student['id']))
-    
-    scores = {}
-    for row in cursor.fetchall():
-        scores[row[0]] = row[1]
-    
-    conn.close()
-    return scores
+    snapshot = get_exam_snapshot()
+    rows = snapshot.student_rows(student['id'])
+    
+    # Rows are in id order, so the last row of each subject is the latest
+    latest = {}
+    for code, score in zip(snapshot.subject_codes[rows].tolist(), snapshot.scores[rows].tolist()):
+        latest[snapshot.subjects[code]] = score
+    
+    return dict(sorted(latest.items()))
 
+@timed_section('matplotlib')
 def generate_student_bar(student_name):
     """
     Generate bar chart for a single student's latest subject scores.
@@ -75,6 +63,7 @@ def generate_student_bar(student_name):
     
     return img_data
 
+@timed_section('matplotlib')
 def generate_subject_average_bar():
     """
     Generate bar chart showing class average for each subject.
@@ -110,6 +99,7 @@ def generate_subject_average_bar():
     
     return img_data
 
+@timed_section('matplotlib')
 def generate_distribution_histogram():
     """
     Generate histogram showing score distribution across ranges.
@@ -141,6 +131,7 @@ def generate_distribution_histogram():
     
     return img_data
 
+@timed_section('matplotlib')
 def generate_comparison_chart(subject):
     """
     Generate bar chart comparing all students' scores in a subject.
@@ -177,6 +168,7 @@ def generate_comparison_chart(subject):
     
     return img_data
 
+@timed_section('matplotlib')
 def generate_student_comparison():
     """
     Generate grouped bar chart comparing all students across all subjects.
@@ -228,24 +220,26 @@ def generate_student_comparison():
     
     return img_data
 
-def generate_trend_chart(student_name, subject):
+@timed_section('matplotlib')
+def generate_trend_chart(student_name, subject, include_archive=False):
     """
-    Generate line chart showing score trend for a student in a subject.
+    Generate line chart showing score trend for a student in a subject
+    (archived academic years included with include_archive).
     Returns base64 encoded image.
     """
-    from models.student_model import get_student_by_name, get_student_history
-    
     student = get_student_by_name(student_name)
     if not student:
         return None
     
-    history = get_student_history(student['id'], subject)
+    if include_archive:
+        scores, _ = get_full_history(student['id'], subject)
+    else:
+        scores, _ = get_exam_snapshot().history(student['id'], subject)
     
-    if len(history) < 2:
+    if len(scores) < 2:
         return None
     
-    dates = [h['date'] for h in history]
-    scores = [h['score'] for h in history]
+    scores = scores.tolist()
     
     plt.figure(figsize=(10, 6))
     plt.plot(range(1, len(scores) + 1), scores, marker='o', linewidth=2, 
@@ -276,6 +270,7 @@ def fig_to_base64():
     img_str = base64.b64encode(img_buffer.read()).decode()
     return img_str
 
+@timed_section('matplotlib')
 def generate_student_pie(student_name):
     """
     Generate pie chart for a student's subject score distribution.
@@ -310,41 +305,38 @@ def generate_student_pie(student_name):
     
     return img_data
 
-def generate_student_line(student_name):
+@timed_section('matplotlib')
+def generate_student_line(student_name, include_archive=False):
     """
-    Generate line chart showing all exam scores for a student.
+    Generate line chart showing all exam scores for a student
+    (archived academic years included with include_archive).
     Returns base64 encoded image.
     """
-    from models.student_model import get_connection
-    
     student = get_student_by_name(student_name)
     if not student:
         return None
     
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get all exams ordered by exam name
-    cursor.execute('''
-        SELECT exam_name, subject, score
-        FROM exams
-        WHERE student_id = ?
-        ORDER BY id
-    ''', (student['id'],))
-    
-    exam_data = cursor.fetchall()
-    conn.close()
-    
-    if not exam_data:
-        return None
+    # All exams in id order
+    if include_archive:
+        exams = sorted((exam['id'], subject, exam['score'])
+                       for subject, subject_exams in get_all_exams_for_student(student['id'], include_archive=True).items()
+                       for exam in subject_exams)
+    else:
+        snapshot = get_exam_snapshot()
+        rows = snapshot.student_rows(student['id'])
+        exams = zip(snapshot.ids[rows].tolist(), (snapshot.subjects[code] for code in snapshot.subject_codes[rows].tolist()),
+                    snapshot.scores[rows].tolist())
     
     # Organize data by subject
     subjects_data = {}
-    for exam_name, subject, score in exam_data:
+    for _, subject, score in exams:
         if subject not in subjects_data:
             subjects_data[subject] = []
         subjects_data[subject].append(score)
     
+    if not subjects_data:
+        return None
+    
     plt.figure(figsize=(12, 6))
     
     for subject, scores in subjects_data.items():
@@ -364,6 +356,7 @@ def generate_student_line(student_name):
     
     return img_data
 
+@timed_section('matplotlib')
 def generate_student_radar(student_name):
     """
     Generate radar/spider chart for a student's subject scores.
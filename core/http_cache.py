@@ -0,0 +1,83 @@
+"""
+HTTP conditional caching and response compression.
+JSON endpoints decorated with etag_cached answer If-None-Match with 304 Not
+Modified while the database is unchanged, without running the view at all.
+compress_response gzip / brotli encodes larger text responses according to
+the client's Accept-Encoding.
+"""
+
+import functools
+import gzip
+from flask import request, make_response
+from models.student_model import get_data_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed (headers would outweigh the savings)
+COMPRESS_MIN_BYTES = 1024
+
+# Text-like mimetypes worth compressing
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/css', 'text/plain', 'application/javascript', 'text/csv')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def etag_cached(view):
+    """
+    Tag a view's response with the database data version and return 304 when
+    the client already holds that version.
+    
+    The ETag is weak because the body may be sent with different content
+    encodings; it changes on any committed write to the database.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = get_data_version()
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Clients may keep the body but must revalidate before reusing it
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+def choose_encoding():
+    """Pick 'br', 'gzip' or None from the request's Accept-Encoding."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """Compress a finished response in place if the client accepts it (use as after_request)."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
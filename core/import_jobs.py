@@ -0,0 +1,167 @@
+"""
+Background import jobs for Excel, CSV and Parquet files.
+Uploads are spooled to a temp file and imported on a small local worker
+pool, so the HTTP request returns immediately with a job id that can be
+polled for progress or cancelled.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from core.excel_import import import_file
+
+# Imports running at the same time (SQLite has a single writer anyway)
+MAX_IMPORT_WORKERS = 2
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 50
+
+executor = ThreadPoolExecutor(max_workers=MAX_IMPORT_WORKERS, thread_name_prefix='import')
+jobs = {}
+jobs_lock = threading.Lock()
+
+class ImportCancelled(Exception):
+    """Raised inside a running import when its job was cancelled."""
+
+def submit_import(file, avoid_duplicates=True, streaming=False):
+    """
+    Spool an uploaded file to disk and queue it for import.
+
+    Args:
+        file: Werkzeug FileStorage object
+        avoid_duplicates: Skip duplicate exam entries
+        streaming: Commit in batches as the file is read (can be cancelled
+                   mid-way) instead of importing in one transaction
+
+    Returns:
+        job id string
+    """
+    suffix = os.path.splitext(file.filename)[1].lower()
+    handle, path = tempfile.mkstemp(prefix='scoresense_import_', suffix=suffix)
+    with os.fdopen(handle, 'wb') as spool:
+        file.save(spool)
+
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'filename': file.filename,
+        'state': 'queued',
+        'created_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'rows_processed': 0,
+        'exams_added': 0,
+        'duplicates_skipped': 0,
+        'errors': [],
+        'stats': None,
+        'cancel_requested': False
+    }
+
+    with jobs_lock:
+        jobs[job_id] = job
+        prune_finished_jobs()
+
+    executor.submit(run_import, job, path, avoid_duplicates, streaming)
+    return job_id
+
+def run_import(job, path, avoid_duplicates, streaming):
+    """Worker body: run the import and record progress on the job."""
+    def progress(stats):
+        job['rows_processed'] = stats['rows_read']
+        job['exams_added'] = stats['exams_added']
+        job['duplicates_skipped'] = stats['duplicates_skipped']
+        if job['cancel_requested']:
+            raise ImportCancelled('Import cancelled')
+
+    try:
+        if job['cancel_requested']:
+            job['state'] = 'cancelled'
+            return
+
+        job['state'] = 'running'
+        job['started_at'] = time.time()
+
+        stats = import_file(path, job['filename'], avoid_duplicates, streaming, progress)
+        if 'rows_read' not in stats:
+            job['rows_processed'] = stats.get('total_records', 0)
+
+        job['stats'] = stats
+        job['exams_added'] = stats.get('exams_added', job['exams_added'])
+        job['duplicates_skipped'] = stats.get('duplicates_skipped', job['duplicates_skipped'])
+        job['errors'] = list(stats.get('errors', []))
+
+        if job['cancel_requested']:
+            job['state'] = 'cancelled'
+        elif 'error' in stats:
+            job['errors'].append(stats['error'])
+            job['state'] = 'failed'
+        else:
+            job['state'] = 'done'
+    except Exception as e:
+        job['errors'].append(f'Import failed: {str(e)}')
+        job['state'] = 'failed'
+    finally:
+        job['finished_at'] = time.time()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def get_job_status(job_id):
+    """
+    Get a JSON-friendly status snapshot of a job.
+
+    Returns:
+        dict, or None if the job id is unknown
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return None
+
+    elapsed = None
+    rows_per_second = None
+    if job['started_at']:
+        elapsed = (job['finished_at'] or time.time()) - job['started_at']
+        if elapsed > 0:
+            rows_per_second = round(job['rows_processed'] / elapsed, 1)
+
+    return {
+        'id': job['id'],
+        'filename': job['filename'],
+        'state': job['state'],
+        'rows_processed': job['rows_processed'],
+        'rows_per_second': rows_per_second,
+        'elapsed_seconds': round(elapsed, 2) if elapsed is not None else None,
+        'exams_added': job['exams_added'],
+        'duplicates_skipped': job['duplicates_skipped'],
+        'errors': job['errors'],
+        'stats': job['stats']
+    }
+
+def cancel_job(job_id):
+    """
+    Request cancellation of a queued or running job.
+
+    A running chunked import (CSV, Parquet, streaming .xlsx) stops after its
+    current chunk; in streaming mode batches already committed are kept,
+    otherwise everything is rolled back. A running .xlsx/.xls import without
+    streaming cannot be interrupted and finishes normally.
+
+    Returns:
+        True if the job exists and was still active
+    """
+    job = jobs.get(job_id)
+    if not job or job['state'] not in ('queued', 'running'):
+        return False
+    job['cancel_requested'] = True
+    return True
+
+def prune_finished_jobs():
+    """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS (call with jobs_lock held)."""
+    finished = [job for job in jobs.values() if job['finished_at']]
+    finished.sort(key=lambda job: job['finished_at'])
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del jobs[job['id']]
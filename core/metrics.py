@@ -0,0 +1,195 @@
+"""
+Request timing and Prometheus metrics.
+Enabled with SCORESENSE_METRICS=1. When enabled, every request records its
+latency, status and database query count/time per route, writes record
+their statements on the writer thread's own counters, and sections
+decorated with timed_section (graph rendering, LLM calls, imports) record
+their duration; everything is served as Prometheus text at /metrics.
+When disabled nothing is registered and timed_section returns the function
+unchanged, so there is no overhead at all.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from flask import g, request, has_request_context, Response
+from models.student_model import on_query, write_queue
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv('SCORESENSE_METRICS', '').lower() in ('1', 'true', 'yes')
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def cumulative(self):
+        """Get (le, cumulative count) pairs including +Inf."""
+        running = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append(('+Inf' if bound == float('inf') else repr(bound), running))
+        return pairs
+
+metrics_lock = threading.Lock()
+request_latency = {}   # (route, method) -> Histogram
+request_counts = {}    # (route, method, status) -> count
+request_errors = {}    # (route, method) -> count of 5xx responses
+db_queries = {}        # route -> statements run
+db_seconds = {}        # route -> seconds spent in statements
+section_latency = {}   # section -> Histogram
+writer_queries = 0     # statements run by the writer thread (all writes, outside any request)
+writer_seconds = 0.0   # seconds the writer thread spent in statements
+
+def timed_section(section):
+    """
+    Record a function's duration under a named section ('matplotlib', 'llm', 'import').
+    
+    Returns the function unchanged when metrics are disabled.
+    """
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with metrics_lock:
+                    section_latency.setdefault(section, Histogram()).observe(elapsed)
+        return wrapper
+    return decorator
+
+def request_route():
+    """Get the route pattern for the current request (bounded label cardinality)."""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+def record_query(sql, seconds):
+    """
+    Query observer: add a statement to the current request's totals, or to
+    the writer totals when it runs on the writer thread (see run_write).
+    """
+    global writer_queries, writer_seconds
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_queries += 1
+        g.metrics_query_seconds += seconds
+    elif threading.current_thread() is write_queue.thread:
+        with metrics_lock:
+            writer_queries += 1
+            writer_seconds += seconds
+
+def start_timer():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+
+def record_request(response):
+    if 'metrics_start' not in g:
+        return response
+    
+    elapsed = time.perf_counter() - g.metrics_start
+    route = request_route()
+    method = request.method
+    with metrics_lock:
+        request_latency.setdefault((route, method), Histogram()).observe(elapsed)
+        key = (route, method, response.status_code)
+        request_counts[key] = request_counts.get(key, 0) + 1
+        if response.status_code >= 500:
+            request_errors[(route, method)] = request_errors.get((route, method), 0) + 1
+        db_queries[route] = db_queries.get(route, 0) + g.metrics_queries
+        db_seconds[route] = db_seconds.get(route, 0.0) + g.metrics_query_seconds
+    return response
+
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(**labels):
+    return '{' + ','.join(f'{name}="{label_value(value)}"' for name, value in labels.items()) + '}'
+
+def render_histogram(lines, name, labels, histogram):
+    for le, count in histogram.cumulative():
+        lines.append(f'{name}_bucket{format_labels(**labels, le=le)} {count}')
+    lines.append(f'{name}_sum{format_labels(**labels)} {histogram.total}')
+    lines.append(f'{name}_count{format_labels(**labels)} {histogram.count}')
+
+def render_metrics():
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = []
+    with metrics_lock:
+        lines.append('# HELP scoresense_request_duration_seconds Request latency by route')
+        lines.append('# TYPE scoresense_request_duration_seconds histogram')
+        for (route, method), histogram in sorted(request_latency.items()):
+            render_histogram(lines, 'scoresense_request_duration_seconds', {'route': route, 'method': method}, histogram)
+        
+        lines.append('# HELP scoresense_requests_total Requests by route and status')
+        lines.append('# TYPE scoresense_requests_total counter')
+        for (route, method, status), count in sorted(request_counts.items()):
+            lines.append(f'scoresense_requests_total{format_labels(route=route, method=method, status=status)} {count}')
+        
+        lines.append('# HELP scoresense_request_errors_total Requests answered with a 5xx status')
+        lines.append('# TYPE scoresense_request_errors_total counter')
+        for (route, method), count in sorted(request_errors.items()):
+            lines.append(f'scoresense_request_errors_total{format_labels(route=route, method=method)} {count}')
+        
+        lines.append('# HELP scoresense_db_queries_total SQL statements run while serving a route (writes are in scoresense_db_writer_*)')
+        lines.append('# TYPE scoresense_db_queries_total counter')
+        for route, count in sorted(db_queries.items()):
+            lines.append(f'scoresense_db_queries_total{format_labels(route=route)} {count}')
+        
+        lines.append('# HELP scoresense_db_query_seconds_total Time spent in SQL statements while serving a route')
+        lines.append('# TYPE scoresense_db_query_seconds_total counter')
+        for route, seconds in sorted(db_seconds.items()):
+            lines.append(f'scoresense_db_query_seconds_total{format_labels(route=route)} {seconds}')
+        
+        lines.append('# HELP scoresense_db_writer_queries_total SQL statements run by the writer thread')
+        lines.append('# TYPE scoresense_db_writer_queries_total counter')
+        lines.append(f'scoresense_db_writer_queries_total {writer_queries}')
+        
+        lines.append('# HELP scoresense_db_writer_query_seconds_total Time the writer thread spent in SQL statements')
+        lines.append('# TYPE scoresense_db_writer_query_seconds_total counter')
+        lines.append(f'scoresense_db_writer_query_seconds_total {writer_seconds}')
+        
+        lines.append('# HELP scoresense_db_writes_total Write operations committed by the writer thread')
+        lines.append('# TYPE scoresense_db_writes_total counter')
+        lines.append(f"scoresense_db_writes_total {write_queue.stats['writes']}")
+        
+        lines.append('# HELP scoresense_db_write_commits_total Transactions committed by the writer thread (writes are group-committed)')
+        lines.append('# TYPE scoresense_db_write_commits_total counter')
+        lines.append(f"scoresense_db_write_commits_total {write_queue.stats['commits']}")
+        
+        lines.append('# HELP scoresense_section_duration_seconds Time spent in graph rendering, LLM calls and imports')
+        lines.append('# TYPE scoresense_section_duration_seconds histogram')
+        for section, histogram in sorted(section_latency.items()):
+            render_histogram(lines, 'scoresense_section_duration_seconds', {'section': section}, histogram)
+    
+    return '\n'.join(lines) + '\n'
+
+def init_metrics(app):
+    """Register the timing hooks and the /metrics endpoint if metrics are enabled."""
+    if not METRICS_ENABLED:
+        return
+    
+    on_query(record_query)
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(render_metrics(), mimetype='text/plain; version=0.0.4'))
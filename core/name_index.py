@@ -0,0 +1,196 @@
+"""
+In-memory fuzzy index over student names.
+Used to resolve misspelled or partial names coming from parsed commands
+without another LLM round trip.
+"""
+
+import heapq
+import threading
+from collections import Counter
+from models.student_model import get_read_connection, on_student_change
+
+# Minimum score for a candidate to be resolved automatically
+AUTO_RESOLVE_SCORE = 0.6
+
+# Required lead of the best candidate over the runner-up to count as unambiguous
+AUTO_RESOLVE_MARGIN = 0.15
+
+# Fraction of the query's trigrams a name must share to be considered at all
+MIN_OVERLAP = 0.4
+
+# Score given to names where every query word is the start of a name word ("sara" -> "Sara Wilson")
+PARTIAL_NAME_SCORE = 0.85
+
+def normalize_name(name):
+    """Lowercase and collapse whitespace."""
+    return ' '.join(str(name).lower().split())
+
+def trigrams(text):
+    """Get the set of padded character trigrams for a normalized name."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """
+    Trigram index over student names.
+
+    Posting lists map each trigram to the ids of names containing it, so a
+    lookup only touches names sharing at least one trigram with the query.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {}        # id -> display name
+        self.normalized = {}   # id -> normalized name
+        self.exact = {}        # normalized name -> id
+        self.gram_counts = {}  # id -> number of trigrams in the name
+        self.postings = {}     # trigram -> set of ids
+        self.loaded = False
+
+    def load(self):
+        """Build the index from the students table."""
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name FROM students')
+        rows = cursor.fetchall()
+        conn.close()
+
+        with self.lock:
+            self.names.clear()
+            self.normalized.clear()
+            self.exact.clear()
+            self.gram_counts.clear()
+            self.postings.clear()
+            for student_id, name in rows:
+                self.add_name(student_id, name)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        """Build the index on first use."""
+        if not self.loaded:
+            self.load()
+
+    def add_name(self, student_id, name):
+        normalized = normalize_name(name)
+        self.names[student_id] = name
+        self.normalized[student_id] = normalized
+        self.exact[normalized] = student_id
+        grams = trigrams(normalized)
+        self.gram_counts[student_id] = len(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(student_id)
+
+    def remove_name(self, student_id):
+        normalized = self.normalized.pop(student_id, None)
+        self.names.pop(student_id, None)
+        self.gram_counts.pop(student_id, None)
+        if normalized is None:
+            return
+        if self.exact.get(normalized) == student_id:
+            del self.exact[normalized]
+        for gram in trigrams(normalized):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(student_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def handle_change(self, event, student_id, name=None):
+        """Keep the index in sync with student add / rename / delete events."""
+        if not self.loaded:
+            return
+        with self.lock:
+            if event in ('rename', 'delete'):
+                self.remove_name(student_id)
+            if event in ('add', 'rename') and name:
+                self.add_name(student_id, name)
+
+    def search(self, query, limit=5):
+        """
+        Rank student names by similarity to the query.
+
+        Returns:
+            list of dicts with 'id', 'name' and 'score' (0-1), best first
+        """
+        self.ensure_loaded()
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        with self.lock:
+            exact_id = self.exact.get(normalized)
+            if exact_id is not None:
+                return [{'id': exact_id, 'name': self.names[exact_id], 'score': 1.0}]
+
+            # Prefix filtering: a name sharing at least min_shared of the query's
+            # trigrams must appear in one of the (len - min_shared + 1) rarest
+            # posting lists, so the common lists are only probed, never scanned
+            query_grams = sorted(trigrams(normalized), key=lambda g: len(self.postings.get(g, ())))
+            min_shared = max(1, int(len(query_grams) * MIN_OVERLAP))
+            split = len(query_grams) - min_shared + 1
+            overlap = Counter()
+            for gram in query_grams[:split]:
+                ids = self.postings.get(gram)
+                if ids:
+                    overlap.update(ids)
+
+            # Partial names: every name word-start " xy" of the query word must be present
+            query_words = normalized.split()
+            word_starts = [self.postings.get(f' {word[:2]}', set()) for word in query_words]
+            partial_ids = set.intersection(*word_starts) if all(word_starts) else set()
+            for student_id in partial_ids:
+                overlap.setdefault(student_id, 0)
+
+            rest = query_grams[split:]
+            candidates = []
+            for student_id, shared in overlap.items():
+                for gram in rest:
+                    if student_id in self.postings.get(gram, ()):
+                        shared += 1
+                # Dice coefficient on trigram sets
+                score = 2 * shared / (len(query_grams) + self.gram_counts[student_id])
+                if student_id in partial_ids:
+                    name_words = self.normalized[student_id].split()
+                    if all(any(word.startswith(q) for word in name_words) for q in query_words):
+                        score = max(score, PARTIAL_NAME_SCORE)
+                candidates.append((score, student_id))
+
+            best = heapq.nlargest(limit, candidates)
+            return [
+                {'id': student_id, 'name': self.names[student_id], 'score': round(score, 3)}
+                for score, student_id in best
+            ]
+
+    def resolve(self, query):
+        """
+        Resolve a name to a single student if the match is unambiguous.
+
+        Returns:
+            (match, candidates) - match is a candidate dict or None
+        """
+        candidates = self.search(query)
+        if not candidates:
+            return None, []
+
+        top = candidates[0]
+        runner_up = candidates[1]['score'] if len(candidates) > 1 else 0
+        if top['score'] >= AUTO_RESOLVE_SCORE and top['score'] - runner_up >= AUTO_RESOLVE_MARGIN:
+            return top, candidates
+        return None, candidates
+
+# Process-wide index, built on first use
+name_index = NameIndex()
+on_student_change(name_index.handle_change)
+
+def resolve_student_name(name):
+    """
+    Resolve a possibly misspelled or partial student name.
+
+    Returns:
+        (resolved_name, suggestions) - resolved_name is None when no single
+        student matches; suggestions lists the closest names
+    """
+    match, candidates = name_index.resolve(name)
+    if match:
+        return match['name'], []
+    return None, [c['name'] for c in candidates if c['score'] >= 0.3]
@@ -2,30 +2,12 @@ import json
 import os
 import requests
 from dotenv import load_dotenv
+from core.metrics import timed_section
 
 # Load environment variables
 load_dotenv()
 
-def parse_command(text):
-    """
-    Parse natural language command using LLM and extract structured data.
-    
-    Returns:
-        dict with 'intent', 'name', 'marks', 'subject', 'error' keys
-    """
-    api_key = os.getenv('HACKCLUB_AI_API_KEY')
-    base_url = os.getenv('HACKCLUB_AI_BASE_URL', 'https://ai.hackclub.com/proxy/v1')
-    model = os.getenv('HACKCLUB_AI_MODEL', 'qwen/qwen3-32b')
-    
-    if not api_key or api_key == 'your_api_key_here':
-        return {
-            'intent': 'error',
-            'error': 'Please set your HACKCLUB_AI_API_KEY in the .env file'
-        }
-    
-    try:
-        # Create structured prompt for the LLM
-        system_prompt = """
+SYSTEM_PROMPT = """
 You are a student management system command parser. Parse natural language commands and return structured JSON.
 
 Supported intents:
@@ -57,50 +39,126 @@ Examples:
 "Add exam for Sarah: Math 95, Physics 88" → {"intent": "ADD_EXAM", "name": "Sarah", "marks": {"math": 95, "physics": 88}}
 "Who is the topper in math?" → {"intent": "SHOW_TOPPER", "subject": "math"}
 """
-        
+
+BATCH_INSTRUCTIONS = """
+You will receive SEVERAL commands at once. Return a JSON array (and nothing else) with one
+object per command, in the order the commands were given. Each object uses the response
+format above plus a "source" key holding the exact text of the command it was parsed from.
+If one line contains several commands (e.g. "for A: math 90; for B: math 82"), return one
+object for each of them and carry shared context (such as the exam name) into every object.
+
+Example:
+"Add exam Midterm for A: math 90; for B: math 82" → [{"intent": "ADD_EXAM", "name": "A", "exam_name": "Midterm", "marks": {"math": 90}, "source": "Add exam Midterm for A: math 90"}, {"intent": "ADD_EXAM", "name": "B", "exam_name": "Midterm", "marks": {"math": 82}, "source": "for B: math 82"}]
+"""
+
+# Required fields for each intent, checked before a parsed command is executed
+REQUIRED_FIELDS = {
+    'ADD_STUDENT': ['name'],
+    'ADD_EXAM': ['name', 'marks'],
+    'UPDATE_STUDENT': ['name'],
+    'DELETE_STUDENT': ['name'],
+    'SHOW_STUDENT': ['name'],
+    'SHOW_TOPPER': [],
+    'SHOW_STATS': [],
+    'PREDICT': ['name', 'subject'],
+    'GET_RANK': ['name'],
+    'COMPARE': ['subject'],
+}
+
+# Fields that must be strings when present
+TEXT_FIELDS = ('name', 'subject', 'exam_name')
+
+# Intents that modify the database
+WRITE_INTENTS = {'ADD_STUDENT', 'ADD_EXAM', 'UPDATE_STUDENT', 'DELETE_STUDENT'}
+
+# Write intents that change or remove an existing student; they only run on an exact name
+DESTRUCTIVE_INTENTS = {'UPDATE_STUDENT', 'DELETE_STUDENT'}
+
+def get_llm_config():
+    """Read LLM connection settings from the environment."""
+    return {
+        'api_key': os.getenv('HACKCLUB_AI_API_KEY'),
+        'base_url': os.getenv('HACKCLUB_AI_BASE_URL', 'https://ai.hackclub.com/proxy/v1'),
+        'model': os.getenv('HACKCLUB_AI_MODEL', 'qwen/qwen3-32b')
+    }
+
+@timed_section('llm')
+def request_completion(config, system_prompt, user_message, max_tokens=500):
+    """
+    Send one chat completion request to the LLM.
+    
+    Returns:
+        (content, error) tuple - exactly one of them is None
+    """
+    response = requests.post(
+        f"{config['base_url']}/chat/completions",
+        headers={
+            'Authorization': f"Bearer {config['api_key']}",
+            'Content-Type': 'application/json'
+        },
+        json={
+            'model': config['model'],
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': user_message}
+            ],
+            'temperature': 0.1,  # Low temperature for consistent parsing
+            'max_tokens': max_tokens
+        },
+        timeout=30
+    )
+    
+    if response.status_code != 200:
+        return None, f'API Error: {response.status_code} - {response.text}'
+    
+    result = response.json()
+    return result['choices'][0]['message']['content'].strip(), None
+
+def extract_json(llm_response, opening='{', closing='}'):
+    """Find the JSON payload in an LLM response (might be wrapped in markdown code blocks)."""
+    if '```json' in llm_response:
+        json_start = llm_response.find('```json') + 7
+        json_end = llm_response.find('```', json_start)
+        json_str = llm_response[json_start:json_end].strip()
+    elif opening in llm_response and closing in llm_response:
+        json_start = llm_response.find(opening)
+        json_end = llm_response.rfind(closing) + 1
+        json_str = llm_response[json_start:json_end]
+    else:
+        json_str = llm_response
+    
+    return json.loads(json_str)
+
+def parse_command(text):
+    """
+    Parse natural language command using LLM and extract structured data.
+    
+    Returns:
+        dict with 'intent', 'name', 'marks', 'subject', 'error' keys
+    """
+    config = get_llm_config()
+    
+    if not config['api_key'] or config['api_key'] == 'your_api_key_here':
+        return {
+            'intent': 'error',
+            'error': 'Please set your HACKCLUB_AI_API_KEY in the .env file'
+        }
+    
+    try:
         # Make API request to Hack Club AI
-        response = requests.post(
-            f"{base_url}/chat/completions",
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model,
-                'messages': [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': f'Parse this command: "{text}"'}
-                ],
-                'temperature': 0.1,  # Low temperature for consistent parsing
-                'max_tokens': 500
-            },
-            timeout=30
+        llm_response, error = request_completion(
+            config, SYSTEM_PROMPT, f'Parse this command: "{text}"'
         )
         
-        if response.status_code != 200:
+        if error:
             return {
                 'intent': 'error',
-                'error': f'API Error: {response.status_code} - {response.text}'
+                'error': error
             }
         
-        result = response.json()
-        llm_response = result['choices'][0]['message']['content'].strip()
-        
         # Try to extract JSON from the response
         try:
-            # Find JSON in the response (might be wrapped in markdown code blocks)
-            if '```json' in llm_response:
-                json_start = llm_response.find('```json') + 7
-                json_end = llm_response.find('```', json_start)
-                json_str = llm_response[json_start:json_end].strip()
-            elif '{' in llm_response and '}' in llm_response:
-                json_start = llm_response.find('{')
-                json_end = llm_response.rfind('}') + 1
-                json_str = llm_response[json_start:json_end]
-            else:
-                json_str = llm_response
-            
-            parsed_command = json.loads(json_str)
+            parsed_command = extract_json(llm_response)
             
             # Validate required fields
             if 'intent' not in parsed_command:
@@ -134,4 +192,113 @@ Examples:
         return {
             'intent': 'error',
             'error': f'Unexpected error: {str(e)}'
-        }
\ No newline at end of file
+        }
+
+def split_commands(text):
+    """Split pasted text into one command per non-empty line."""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+def parse_commands(commands):
+    """
+    Parse several natural language commands with a single LLM request.
+    
+    Args:
+        commands: List of command strings
+    
+    Returns:
+        list of parsed command dicts (same shape as parse_command), each with a
+        'source' key. If the whole request fails, a single-element list holding
+        the error is returned.
+    """
+    config = get_llm_config()
+    
+    if not config['api_key'] or config['api_key'] == 'your_api_key_here':
+        return [{
+            'intent': 'error',
+            'error': 'Please set your HACKCLUB_AI_API_KEY in the .env file'
+        }]
+    
+    numbered = '\n'.join(f'{i}. {command}' for i, command in enumerate(commands, 1))
+    
+    try:
+        # Output grows with the number of commands, so scale the token budget
+        llm_response, error = request_completion(
+            config,
+            SYSTEM_PROMPT + BATCH_INSTRUCTIONS,
+            f'Parse these commands:\n{numbered}',
+            max_tokens=min(200 * len(commands) + 300, 8000)
+        )
+        
+        if error:
+            return [{'intent': 'error', 'error': error}]
+        
+        try:
+            parsed_commands = extract_json(llm_response, '[', ']')
+        except json.JSONDecodeError as e:
+            return [{
+                'intent': 'error',
+                'error': f'Failed to parse LLM response as JSON: {str(e)}. Response: {llm_response}'
+            }]
+        
+        if isinstance(parsed_commands, dict):
+            parsed_commands = [parsed_commands]
+        
+        results = []
+        for parsed in parsed_commands:
+            if not isinstance(parsed, dict) or 'intent' not in parsed:
+                results.append({
+                    'intent': 'error',
+                    'error': 'Invalid command format - no intent found',
+                    'source': parsed.get('source', '') if isinstance(parsed, dict) else ''
+                })
+                continue
+            
+            parsed['intent'] = str(parsed['intent']).upper()
+            parsed.setdefault('source', '')
+            results.append(parsed)
+        
+        return results
+    
+    except requests.exceptions.Timeout:
+        return [{'intent': 'error', 'error': 'Request timeout - please try again'}]
+    except requests.exceptions.RequestException as e:
+        return [{'intent': 'error', 'error': f'Network error: {str(e)}'}]
+    except Exception as e:
+        return [{'intent': 'error', 'error': f'Unexpected error: {str(e)}'}]
+
+def validate_command(parsed):
+    """
+    Check a parsed command before it is executed.
+    
+    Returns:
+        Error message string, or None if the command is valid
+    """
+    intent = parsed.get('intent')
+    
+    if intent == 'ERROR' or intent == 'error' or parsed.get('error'):
+        return parsed.get('error', 'Could not parse command')
+    
+    if intent not in REQUIRED_FIELDS:
+        return f'Unknown intent: {intent}'
+    
+    missing = [field for field in REQUIRED_FIELDS[intent] if not parsed.get(field)]
+    if missing:
+        return f'{intent} is missing: {", ".join(missing)}'
+    
+    # The LLM can return numbers or lists where text belongs
+    for field in TEXT_FIELDS:
+        if parsed.get(field) is not None and not isinstance(parsed[field], str):
+            return f'{field} must be text, got {parsed[field]!r}'
+    
+    if 'marks' in parsed and parsed['marks']:
+        if not isinstance(parsed['marks'], dict):
+            return 'Marks must be a mapping of subject to score'
+        for subject, score in parsed['marks'].items():
+            try:
+                value = float(score)
+            except (TypeError, ValueError):
+                return f'Invalid score for {subject}: {score}'
+            if not 0 <= value <= 100:
+                return f'Score for {subject} must be between 0 and 100'
+    
+    return None
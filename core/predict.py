@@ -1,6 +1,7 @@
-# Removed heavy startup import: from sklearn.linear_model import LinearRegression
 import numpy as np
-from models.student_model import get_student_by_name, get_student_history
+from models.student_model import get_student_by_name
+from models.exam_snapshot import get_exam_snapshot
+from models.archive import get_full_history
 
 def normalize_subject_name(subject, available_subjects):
     """
@@ -48,20 +49,72 @@ def normalize_subject_name(subject, available_subjects):
     # Return original if no match found
     return subject
 
-def predict_score(student_name, subject):
+def fit_trends(scores, starts):
+    """
+    Least-squares line through each group of scores against exam number 1..n,
+    for many groups at once (same fit as sklearn's LinearRegression).
+    
+    Args:
+        scores: Scores of all groups, concatenated, each group in exam order
+        starts: Index of each group's first score, plus len(scores) at the end
+    
+    Returns:
+        (predicted next score, R², slope) arrays, one entry per group
+    """
+    counts = np.diff(starts).astype(float)
+    group = np.repeat(np.arange(len(counts)), np.diff(starts))
+    x = np.arange(len(scores)) - np.repeat(starts[:-1], np.diff(starts)) + 1.0
+    
+    def group_sum(values):
+        return np.bincount(group, weights=values, minlength=len(counts))
+    
+    sum_x, sum_y = group_sum(x), group_sum(scores)
+    sxx = group_sum(x * x) - sum_x * sum_x / counts
+    sxy = group_sum(x * scores) - sum_x * sum_y / counts
+    syy = group_sum(scores * scores) - sum_y * sum_y / counts
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        intercept = (sum_y - slope * sum_x) / counts
+        # A constant history is fitted perfectly
+        r2 = np.where(syy > 1e-12, 1 - (syy - slope * sxy) / syy, 1.0)
+    return intercept + slope * (counts + 1), r2, slope
+
+def regression_result(predicted, r2_score, slope, count):
+    """Build predict_score's answer for a fitted history of count exams."""
+    # Clamp prediction to valid range
+    predicted = max(0, min(100, predicted))
+    
+    # Determine confidence level
+    if r2_score > 0.8:
+        confidence = 'high'
+    elif r2_score > 0.5:
+        confidence = 'medium'
+    else:
+        confidence = 'low'
+    
+    return {
+        'predicted_score': round(predicted, 2),
+        'confidence': confidence,
+        'r2_score': round(r2_score, 3),
+        'method': 'linear_regression',
+        'history_count': count,
+        'trend': 'improving' if slope > 0 else 'declining',
+        'message': f'Based on {count} past exams'
+    }
+
+def predict_score(student_name, subject, include_archive=False):
     """
     Predict next score for a student in a subject using linear regression.
     
     Args:
         student_name: Name of the student
         subject: Subject to predict
+        include_archive: Also fit the exams of archived academic years
     
     Returns:
         dict with 'predicted_score', 'confidence', 'history' or 'error'
     """
-    # Lazy import heavy library only when needed
-    from sklearn.linear_model import LinearRegression
-    
     student = get_student_by_name(student_name)
     
     if not student:
@@ -72,9 +125,12 @@ def predict_score(student_name, subject):
     normalized_subject = normalize_subject_name(subject, available_subjects)
     
     # Get historical scores
-    history = get_student_history(student['id'], normalized_subject)
+    if include_archive:
+        history, _ = get_full_history(student['id'], normalized_subject)
+    else:
+        history, _ = get_exam_snapshot().history(student['id'], normalized_subject)
     
-    if not history:
+    if not len(history):
         # No history, use current score as baseline
         if normalized_subject in student['marks']:
             current_score = student['marks'][normalized_subject]
@@ -90,7 +146,7 @@ def predict_score(student_name, subject):
     
     # If only one data point, use heuristic
     if len(history) == 1:
-        current_score = history[0]['score']
+        current_score = float(history[0])
         class_avg = get_class_average_for_subject(subject)
         
         # Simple heuristic: assume slight improvement toward class average
@@ -104,40 +160,8 @@ def predict_score(student_name, subject):
         }
     
     # Use linear regression for multiple data points
-    scores = [h['score'] for h in history]
-    X = np.array(range(1, len(scores) + 1)).reshape(-1, 1)
-    y = np.array(scores)
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Predict next score
-    next_index = len(scores) + 1
-    predicted = model.predict([[next_index]])[0]
-    
-    # Calculate R² score for confidence
-    r2_score = model.score(X, y)
-    
-    # Clamp prediction to valid range
-    predicted = max(0, min(100, predicted))
-    
-    # Determine confidence level
-    if r2_score > 0.8:
-        confidence = 'high'
-    elif r2_score > 0.5:
-        confidence = 'medium'
-    else:
-        confidence = 'low'
-    
-    return {
-        'predicted_score': round(predicted, 2),
-        'confidence': confidence,
-        'r2_score': round(r2_score, 3),
-        'method': 'linear_regression',
-        'history_count': len(scores),
-        'trend': 'improving' if model.coef_[0] > 0 else 'declining',
-        'message': f'Based on {len(scores)} past exams'
-    }
+    predicted, r2_score, slope = fit_trends(history, np.array([0, len(history)]))
+    return regression_result(float(predicted[0]), float(r2_score[0]), float(slope[0]), len(history))
 
 def predict_heuristic(student_name, subject):
     """
@@ -153,15 +177,15 @@ def predict_heuristic(student_name, subject):
         return {'error': f'No data for {subject}'}
     
     current_score = student['marks'][subject]
-    history = get_student_history(student['id'], subject)
+    history, _ = get_exam_snapshot().history(student['id'], subject)
     
     if len(history) < 2:
         # Use current score
         predicted = current_score
     else:
         # Average of last score and mean of recent scores
-        last_score = history[-1]['score']
-        recent_scores = [h['score'] for h in history[-3:]]  # Last 3
+        last_score = float(history[-1])
+        recent_scores = history[-3:]  # Last 3
         mean_recent = np.mean(recent_scores)
         
         predicted = (last_score + mean_recent) / 2
@@ -230,22 +254,43 @@ def batch_predict(subject):
     """
     Predict scores for all students in a subject.
     Useful for class-wide analysis.
+    
+    Gives the same answers as calling predict_score for every student, but
+    fits all the histories in one vectorized pass over the exam snapshot.
     """
     from models.student_model import get_all_students
     
-    students = get_all_students()
-    predictions = []
+    snapshot = get_exam_snapshot()
+    students = [student for student in get_all_students() if subject in student['marks']]
+    
+    # Each student's history, concatenated in student order
+    normalized_subjects = [normalize_subject_name(subject, list(student['marks'].keys())) for student in students]
+    histories = [snapshot.history(student['id'], normalized_subject)[0]
+                 for student, normalized_subject in zip(students, normalized_subjects)]
+    
+    fitted = [i for i, history in enumerate(histories) if len(history) >= 2]
+    fitted_starts = np.concatenate(([0], np.cumsum([len(histories[i]) for i in fitted]))).astype(np.int64)
+    scores = np.concatenate([histories[i] for i in fitted]) if fitted else np.empty(0)
+    fits = dict(zip(fitted, zip(*fit_trends(scores, fitted_starts)))) if fitted else {}
     
-    for student in students:
-        if subject in student['marks']:
-            result = predict_score(student['name'], subject)
-            
-            if 'error' not in result:
-                predictions.append({
-                    'name': student['name'],
-                    'current': student['marks'][subject],
-                    'predicted': result['predicted_score'],
-                    'trend': result.get('trend', 'stable')
-                })
+    predictions = []
+    for i, student in enumerate(students):
+        history = histories[i]
+        current = student['marks'][subject]
+        if i in fits:
+            predicted, r2_score, slope = fits[i]
+            result = regression_result(float(predicted), float(r2_score), float(slope), len(history))
+        elif len(history) == 1:
+            result = {'predicted_score': round(float(history[0]) * 0.7 + get_class_average_for_subject(subject) * 0.3, 2)}
+        else:
+            # No history: the current score is the prediction
+            result = {'predicted_score': round(student['marks'][normalized_subjects[i]], 2)}
+        
+        predictions.append({
+            'name': student['name'],
+            'current': current,
+            'predicted': result['predicted_score'],
+            'trend': result.get('trend', 'stable')
+        })
     
     return predictions
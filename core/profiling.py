@@ -0,0 +1,199 @@
+"""
+Opt-in request profiling for production.
+Two triggers, both configured through the environment:
+
+- SCORESENSE_PROFILE_SAMPLE_RATE (0-1): that fraction of matching requests
+  runs under cProfile and is saved as a .pstats file
+- SCORESENSE_PROFILE_SLOW_MS: every other matching request is watched by a
+  low-overhead stack sampler, and requests slower than the threshold are
+  saved as collapsed stacks (.folded, readable by flamegraph.pl / speedscope)
+
+Profiles go to SCORESENSE_PROFILE_DIR, capped at PROFILE_MAX_FILES files.
+With SCORESENSE_PROFILE_TOKEN set they can be listed and downloaded from
+/debug/profiles by sending the token in an X-Profile-Token header.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dotenv import load_dotenv
+from flask import g, request, jsonify, abort, send_from_directory
+
+load_dotenv()
+
+PROFILE_SAMPLE_RATE = float(os.getenv('SCORESENSE_PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.getenv('SCORESENSE_PROFILE_SLOW_MS', '0'))
+PROFILE_DIR = os.getenv('SCORESENSE_PROFILE_DIR',
+                        os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles'))
+PROFILE_TOKEN = os.getenv('SCORESENSE_PROFILE_TOKEN', '')
+
+# Route prefixes to profile ('*' for everything); the stats page, graphs and predictions by default
+PROFILE_ROUTES = tuple(prefix.strip() for prefix in
+                       os.getenv('SCORESENSE_PROFILE_ROUTES', '/stats,/graph/,/predict/').split(',') if prefix.strip())
+
+# Oldest profiles are deleted beyond this many files
+PROFILE_MAX_FILES = int(os.getenv('SCORESENSE_PROFILE_MAX_FILES', '50'))
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+PROFILE_FILE_PATTERN = re.compile(r'^[\w.-]+\.(pstats|folded)$')
+
+class StackSampler:
+    """
+    Background thread that samples the stacks of registered request threads.
+    
+    One sampler serves every request; it sleeps while no request is watched.
+    """
+    
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = {}  # thread id -> Counter of collapsed stacks
+        self.wake = threading.Event()
+        self.thread = None
+    
+    def start(self, thread_id):
+        with self.lock:
+            self.active[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='profile-sampler', daemon=True)
+                self.thread.start()
+        self.wake.set()
+    
+    def stop(self, thread_id):
+        """Stop watching a thread and get its stack counts."""
+        with self.lock:
+            return self.active.pop(thread_id, Counter())
+    
+    def run(self):
+        while True:
+            if not self.active:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+            time.sleep(self.interval)
+
+def collapse_stack(frame):
+    """Render a stack root-first as 'func (file:line);func (file:line);...'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+sampler = StackSampler()
+
+def should_profile(path):
+    return '*' in PROFILE_ROUTES or path.startswith(PROFILE_ROUTES)
+
+def profile_filename(extension, elapsed):
+    route = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'root'
+    return f"{time.strftime('%Y%m%d-%H%M%S')}_{route[:60]}_{int(elapsed * 1000)}ms_{os.getpid()}-{random.randrange(16 ** 4):04x}{extension}"
+
+def prune_profiles():
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES."""
+    profiles = list_profiles()
+    for profile in profiles[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, profile['name']))
+        except OSError:
+            pass
+
+def list_profiles():
+    """Get saved profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if PROFILE_FILE_PATTERN.match(name):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            profiles.append({'name': name, 'bytes': stat.st_size, 'created_at': stat.st_mtime})
+    profiles.sort(key=lambda profile: profile['created_at'], reverse=True)
+    return profiles
+
+def start_profile():
+    if not should_profile(request.path):
+        return
+    
+    g.profile_start = time.perf_counter()
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    elif PROFILE_SLOW_MS:
+        g.profile_thread = threading.get_ident()
+        sampler.start(g.profile_thread)
+
+def finish_profile(response):
+    if 'profile_start' not in g:
+        return response
+    
+    elapsed = time.perf_counter() - g.profile_start
+    profiler = g.pop('profiler', None)
+    thread_id = g.pop('profile_thread', None)
+    
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, profile_filename('.pstats', elapsed)))
+        prune_profiles()
+    elif thread_id is not None:
+        stacks = sampler.stop(thread_id)
+        if elapsed * 1000 >= PROFILE_SLOW_MS and stacks:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, profile_filename('.folded', elapsed)), 'w') as handle:
+                for stack, count in stacks.most_common():
+                    handle.write(f'{stack} {count}\n')
+            prune_profiles()
+    return response
+
+def cleanup_profile(exc):
+    """Stop profiling a request that ended without reaching finish_profile."""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    thread_id = g.pop('profile_thread', None)
+    if thread_id is not None:
+        sampler.stop(thread_id)
+
+def require_profile_token():
+    supplied = request.headers.get('X-Profile-Token', '')
+    if not hmac.compare_digest(supplied.encode(), PROFILE_TOKEN.encode()):
+        abort(403)
+
+def profiles_index():
+    """List saved profiles."""
+    require_profile_token()
+    return jsonify({'profiles': list_profiles(), 'max_files': PROFILE_MAX_FILES})
+
+def profile_download(name):
+    """Download one saved profile."""
+    require_profile_token()
+    if not PROFILE_FILE_PATTERN.match(name):
+        abort(404)
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+def init_profiling(app):
+    """Register the profiling hooks and endpoints if profiling is configured."""
+    if not (PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS):
+        return
+    
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(cleanup_profile)
+    if PROFILE_TOKEN:
+        app.add_url_rule('/debug/profiles', 'profiles_index', profiles_index)
+        app.add_url_rule('/debug/profiles/<name>', 'profile_download', profile_download)
@@ -1,145 +1,202 @@
+from models import student_model
 from models.student_model import get_all_students, get_all_subjects
+from models.request_cache import request_memo
+from models.exam_snapshot import get_exam_snapshot
+import numpy as np
 import statistics
-import sqlite3
+import threading
+import logging
 import os
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'db', 'students.db')
+# Score distribution buckets and their upper bounds
+SCORE_RANGES = ['0-40', '41-60', '61-80', '81-100']
+SCORE_RANGE_EDGES = np.array([40, 60, 80])
 
-def get_connection():
-    """Get a database connection with timeout and autocommit."""
-    # Use isolation_level=None for autocommit mode to prevent locks
-    conn = sqlite3.connect(DB_PATH, timeout=30.0, isolation_level=None)
-    return conn
+# Engine behind the aggregations below: 'snapshot' (NumPy over the in-process exam
+# snapshot) or 'duckdb' (see core/analytics_duckdb.py; needs pip install duckdb)
+ANALYTICS_BACKEND = os.getenv('SCORESENSE_ANALYTICS_BACKEND', 'snapshot').lower()
 
-def get_class_average():
-    """Calculate overall class average across all subjects from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT AVG(score) FROM exams')
-    result = cursor.fetchone()[0]
-    conn.close()
-    
-    return round(result, 2) if result else 0
+logger = logging.getLogger('scoresense.stats')
 
-def get_subject_averages():
-    """Calculate average score for each subject from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
+analytics_lock = threading.Lock()
+current_analytics = None
+current_analytics_config = None  # (ANALYTICS_BACKEND, database path) current_analytics was created for
+
+class SnapshotAnalytics:
+    """
+    Default analytics backend: NumPy aggregations over the exam snapshot.
     
-    cursor.execute('''
-        SELECT subject, AVG(score) as avg_score
-        FROM exams
-        GROUP BY subject
-        ORDER BY subject
-    ''')
+    Every backend answers the same methods with the same result shapes:
+    class_average, subject_averages, extreme, ranked_averages,
+    score_distribution and subject_scores.
+    """
     
-    rows = cursor.fetchall()
-    conn.close()
+    name = 'snapshot'
     
-    averages = {}
-    for row in rows:
-        averages[row[0]] = round(row[1], 2)
+    def __init__(self, path):
+        self.path = path
     
-    return averages
-
-def get_class_topper(subject=None):
-    """
-    Get the student with highest score.
-    If subject is specified, get topper for that subject.
-    Otherwise, get overall topper based on average.
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
+    def close(self):
+        pass
+    
+    def class_average(self):
+        snapshot = get_exam_snapshot()
+        
+        result = snapshot.scores.mean() if len(snapshot) else 0
+        return round(float(result), 2) if result else 0
     
-    if subject:
-        # Subject-specific topper from exams table
-        cursor.execute('''
-            SELECT s.name, e.score
-            FROM students s
-            JOIN exams e ON s.id = e.student_id
-            WHERE e.subject = ?
-            ORDER BY e.score DESC
-            LIMIT 1
-        ''', (subject,))
+    def subject_averages(self):
+        snapshot = get_exam_snapshot()
+        
+        counts = np.bincount(snapshot.subject_codes, minlength=len(snapshot.subjects))
+        sums = np.bincount(snapshot.subject_codes, weights=snapshot.scores, minlength=len(snapshot.subjects))
         
-        row = cursor.fetchone()
-        conn.close()
+        averages = {}
+        for code in sorted(np.flatnonzero(counts), key=lambda code: snapshot.subjects[code]):
+            averages[snapshot.subjects[code]] = round(float(sums[code] / counts[code]), 2)
         
-        if row:
+        return averages
+    
+    def extreme(self, subject, highest):
+        snapshot = get_exam_snapshot()
+        
+        if subject:
+            # Subject-specific extreme score among existing students
+            rows = np.flatnonzero(snapshot.subject_mask(subject) & snapshot.known[snapshot.student_index])
+            if not len(rows):
+                return None
+            
+            row = rows[np.argmax(snapshot.scores[rows]) if highest else np.argmin(snapshot.scores[rows])]
             return {
-                'name': row[0],
-                'score': round(row[1], 2),
+                'name': snapshot.names[int(snapshot.student_ids[row])],
+                'score': round(float(snapshot.scores[row]), 2),
                 'subject': subject
             }
-        return None
-    else:
-        # Overall topper based on average from exams table
-        cursor.execute('''
-            SELECT s.name, AVG(e.score) as avg_score
-            FROM students s
-            JOIN exams e ON s.id = e.student_id
-            GROUP BY s.id, s.name
-            ORDER BY avg_score DESC
-            LIMIT 1
-        ''')
         
-        row = cursor.fetchone()
-        conn.close()
+        # Overall extreme based on each student's average
+        student_ids, averages = snapshot.student_averages()
+        if not len(student_ids):
+            return None
         
-        if row:
-            return {
-                'name': row[0],
-                'average': round(row[1], 2)
-            }
-        return None
-
-def get_lowest_scorer(subject=None):
-    """Get the student with lowest score from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
+        position = np.argmax(averages) if highest else np.argmin(averages)
+        return {
+            'name': snapshot.names[int(student_ids[position])],
+            'average': round(float(averages[position]), 2)
+        }
     
-    if subject:
-        # Subject-specific lowest from exams table
-        cursor.execute('''
-            SELECT s.name, e.score
-            FROM students s
-            JOIN exams e ON s.id = e.student_id
-            WHERE e.subject = ?
-            ORDER BY e.score ASC
-            LIMIT 1
-        ''', (subject,))
+    def ranked_averages(self):
+        snapshot = get_exam_snapshot()
+        student_ids, averages = snapshot.student_averages()
         
-        row = cursor.fetchone()
-        conn.close()
+        # Highest average first (ties by id), then students without exams with an average of 0
+        order = np.lexsort((student_ids, -averages))
+        ranked = [{'name': snapshot.names[int(student_id)], 'average': float(average)}
+                  for student_id, average in zip(student_ids[order], averages[order])]
         
-        if row:
-            return {
-                'name': row[0],
-                'score': round(row[1], 2),
-                'subject': subject
-            }
-        return None
-    else:
-        # Overall lowest based on average from exams table
-        cursor.execute('''
-            SELECT s.name, AVG(e.score) as avg_score
-            FROM students s
-            JOIN exams e ON s.id = e.student_id
-            GROUP BY s.id, s.name
-            ORDER BY avg_score ASC
-            LIMIT 1
-        ''')
+        with_exams = set(student_ids.tolist())
+        ranked.extend({'name': name, 'average': 0} for student_id, name in sorted(snapshot.names.items())
+                      if student_id not in with_exams)
         
-        row = cursor.fetchone()
-        conn.close()
+        return ranked
+    
+    def score_distribution(self):
+        scores = get_exam_snapshot().scores
         
-        if row:
-            return {
-                'name': row[0],
-                'average': round(row[1], 2)
-            }
-        return None
+        # Ranges are closed on the right: 40 counts as 0-40, 40.5 as 41-60
+        counts = np.bincount(np.searchsorted(SCORE_RANGE_EDGES, scores, side='left'), minlength=len(SCORE_RANGES))
+        return {label: int(count) for label, count in zip(SCORE_RANGES, counts)}
+    
+    def subject_scores(self, subject):
+        snapshot = get_exam_snapshot()
+        student_ids, averages = snapshot.student_averages(snapshot.subject_mask(subject))
+        
+        order = np.lexsort((student_ids, -averages))
+        return [{'name': snapshot.names[int(student_id)], 'score': round(float(average), 2)}
+                for student_id, average in zip(student_ids[order], averages[order])]
+
+def create_analytics(backend, path):
+    """
+    Create an analytics backend by name.
+    
+    Raises:
+        ValueError for an unknown name; whatever the backend raises if it
+        cannot start (e.g. ImportError without duckdb)
+    """
+    if backend == 'snapshot':
+        return SnapshotAnalytics(path)
+    if backend == 'duckdb':
+        from core.analytics_duckdb import DuckDBAnalytics
+        return DuckDBAnalytics(path)
+    raise ValueError(f"Unknown analytics backend '{backend}' (choose snapshot or duckdb)")
+
+def get_analytics():
+    """
+    Get the configured analytics backend for the current database, creating
+    it on first use (and again after ANALYTICS_BACKEND or the database changed).
+    
+    A backend that fails to start is logged once and replaced by the
+    snapshot backend, so stats keep working.
+    """
+    global current_analytics, current_analytics_config
+    config = (ANALYTICS_BACKEND, student_model.DB_PATH)
+    if current_analytics_config == config:
+        return current_analytics
+    
+    with analytics_lock:
+        if current_analytics_config == config:
+            return current_analytics
+        
+        try:
+            analytics = create_analytics(*config)
+        except Exception:
+            logger.exception("Analytics backend '%s' failed to start; using the snapshot backend", config[0])
+            analytics = SnapshotAnalytics(config[1])
+        
+        if current_analytics is not None:
+            current_analytics.close()
+        current_analytics = analytics
+        current_analytics_config = config
+        return analytics
+
+def close_analytics():
+    """Close the current analytics backend; the next query creates it again."""
+    global current_analytics, current_analytics_config
+    with analytics_lock:
+        if current_analytics is not None:
+            current_analytics.close()
+        current_analytics = None
+        current_analytics_config = None
+
+@request_memo
+def get_class_average():
+    """Calculate overall class average across all subjects."""
+    return get_analytics().class_average()
+
+@request_memo
+def get_subject_averages():
+    """Calculate average score for each subject, ordered by subject name."""
+    return get_analytics().subject_averages()
+
+def find_extreme(subject, highest):
+    """
+    Get the student with the highest (or lowest) score in a subject, or with
+    the highest (or lowest) overall average when subject is None.
+    """
+    return get_analytics().extreme(subject, highest)
+
+@request_memo
+def get_class_topper(subject=None):
+    """
+    Get the student with highest score.
+    If subject is specified, get topper for that subject.
+    Otherwise, get overall topper based on average.
+    """
+    return find_extreme(subject, highest=True)
+
+@request_memo
+def get_lowest_scorer(subject=None):
+    """Get the student with lowest score (or lowest average without a subject)."""
+    return find_extreme(subject, highest=False)
 
 def get_subject_difficulty():
     """
@@ -153,35 +210,18 @@ def get_subject_difficulty():
     
     return difficulty_ranking
 
+@request_memo
+def get_ranked_averages():
+    """Get all students ordered by overall average (computed once per request)."""
+    return get_analytics().ranked_averages()
+
 def get_student_rank(student_name):
     """Get rank of a student based on overall average from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get all students with their averages from exams table
-    cursor.execute('''
-        SELECT s.name, AVG(e.score) as avg_score
-        FROM students s
-        LEFT JOIN exams e ON s.id = e.student_id
-        GROUP BY s.id, s.name
-        ORDER BY avg_score DESC
-    ''')
+    student_averages = get_ranked_averages()
     
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
+    if not student_averages:
         return None
     
-    # Build list of students with averages
-    student_averages = []
-    for row in rows:
-        avg = row[1] if row[1] else 0
-        student_averages.append({
-            'name': row[0],
-            'average': avg
-        })
-    
     # Already sorted by average DESC
     # Find rank
     for rank, student in enumerate(student_averages, 1):
@@ -194,35 +234,12 @@ def get_student_rank(student_name):
     
     return None
 
+@request_memo
 def get_score_distribution():
-    """Get distribution of scores in ranges from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT score FROM exams')
-    rows = cursor.fetchall()
-    conn.close()
-    
-    ranges = {
-        '0-40': 0,
-        '41-60': 0,
-        '61-80': 0,
-        '81-100': 0
-    }
-    
-    for row in rows:
-        score = row[0]
-        if score <= 40:
-            ranges['0-40'] += 1
-        elif score <= 60:
-            ranges['41-60'] += 1
-        elif score <= 80:
-            ranges['61-80'] += 1
-        else:
-            ranges['81-100'] += 1
-    
-    return ranges
+    """Get distribution of scores in ranges."""
+    return get_analytics().score_distribution()
 
+@request_memo
 def get_all_stats():
     """Get comprehensive statistics."""
     students = get_all_students()
@@ -247,28 +264,7 @@ def get_all_stats():
         'score_distribution': get_score_distribution()
     }
 
+@request_memo
 def compare_subject_scores(subject):
-    """Get all students' scores in a specific subject for comparison from exams table."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT s.name, AVG(e.score) as avg_score
-        FROM students s
-        JOIN exams e ON s.id = e.student_id
-        WHERE e.subject = ?
-        GROUP BY s.id, s.name
-        ORDER BY avg_score DESC
-    ''', (subject,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    comparisons = []
-    for row in rows:
-        comparisons.append({
-            'name': row[0],
-            'score': round(row[1], 2)
-        })
-    
-    return comparisons
+    """Get all students' average scores in a specific subject, highest first."""
+    return get_analytics().subject_scores(subject)
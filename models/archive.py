@@ -0,0 +1,270 @@
+"""
+Archiving of past academic years.
+Exams of a closed academic year (or all exams before a cutoff date) are moved
+out of the main database into one SQLite file per academic year, e.g.
+db/archive/exams_2023.db for the year starting in June 2023. Each archive
+file holds the same exam_scores, subjects and exam_sessions tables and the
+exams view, so it can also be opened on its own.
+
+Everything the app shows by default reads only the main database, so stats,
+charts and the exam snapshot stop paying for old years. Queries that ask
+for the full history (include_archive=True, or ?history=all in the routes)
+use query_all_exams(), which ATTACHes the archive files and runs the query
+on the all_exams view over the main database and the archives together.
+SQLite attaches at most 10 databases per connection, so with more archived
+years the query runs once per batch of archives.
+"""
+
+import os
+import re
+import sqlite3
+import datetime
+import numpy as np
+from models import student_model
+from models.student_model import get_read_connection, run_write, create_exam_tables, EXAMS_VIEW_SQL, EXAMS_INDEX_SQL
+from models.exam_snapshot import get_exam_snapshot, parse_dates
+
+# Directory of the archive files (default: archive/ next to the database)
+ARCHIVE_DIR = os.getenv('SCORESENSE_ARCHIVE_DIR')
+
+# Month in which an academic year starts; the year is named after its starting calendar year
+ACADEMIC_YEAR_START_MONTH = int(os.getenv('SCORESENSE_ACADEMIC_YEAR_START_MONTH', '6'))
+
+# Exams moved per write operation, so other writes are not held up for long
+ARCHIVE_BATCH_ROWS = 20000
+
+# Archive files attached to one connection (SQLite's default SQLITE_MAX_ATTACHED)
+MAX_ATTACHED_ARCHIVES = 10
+
+ARCHIVE_FILE_PATTERN = re.compile(r'^exams_(\d{4})\.db$')
+
+ARCHIVE_COLUMNS = 'id, student_id, subject_id, score, exam_session_id, exam_date'
+
+def get_archive_dir():
+    return ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(student_model.DB_PATH)), 'archive')
+
+def archive_path(year):
+    return os.path.join(get_archive_dir(), f'exams_{year}.db')
+
+def academic_year_range(year):
+    """First day of an academic year and of the next one, as 'YYYY-MM-DD' strings."""
+    return (f'{year:04d}-{ACADEMIC_YEAR_START_MONTH:02d}-01',
+            f'{year + 1:04d}-{ACADEMIC_YEAR_START_MONTH:02d}-01')
+
+def academic_year_of(exam_date):
+    """Academic year of an exam_date string ('YYYY-MM-DD...')."""
+    return int(exam_date[:4]) - (int(exam_date[5:7]) < ACADEMIC_YEAR_START_MONTH)
+
+def list_archives():
+    """
+    Get the archive files, oldest year first.
+    
+    Returns:
+        List of (academic year, path) tuples
+    """
+    directory = get_archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for filename in os.listdir(directory):
+        match = ARCHIVE_FILE_PATTERN.match(filename)
+        if match:
+            archives.append((int(match.group(1)), os.path.join(directory, filename)))
+    return sorted(archives)
+
+def open_archive(year):
+    """Open (creating if needed) the archive file of an academic year for writing."""
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    conn = sqlite3.connect(archive_path(year), timeout=30.0, isolation_level=None)
+    cursor = conn.cursor()
+    create_exam_tables(cursor)
+    cursor.execute(EXAMS_VIEW_SQL)
+    cursor.execute(EXAMS_INDEX_SQL)
+    return conn
+
+def write_archive(year, rows, subjects, exam_sessions):
+    """Store exam_scores rows and the lookup entries they use in a year's archive file."""
+    conn = open_archive(year)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany('INSERT OR IGNORE INTO subjects (id, name) VALUES (?, ?)', subjects)
+        cursor.executemany('INSERT OR IGNORE INTO exam_sessions (id, name) VALUES (?, ?)', exam_sessions)
+        # OR REPLACE: rows already copied by an interrupted earlier run are overwritten, not duplicated
+        cursor.executemany(f'INSERT OR REPLACE INTO exam_scores ({ARCHIVE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)', rows)
+        cursor.execute('COMMIT')
+    finally:
+        conn.close()
+
+def lookup_rows(cursor, table, ids):
+    ids = sorted(ids)
+    cursor.execute(f"SELECT id, name FROM {table} WHERE id IN ({','.join('?' * len(ids))})", ids)
+    return cursor.fetchall()
+
+def archive_exams(before=None, academic_year=None, batch_rows=ARCHIVE_BATCH_ROWS):
+    """
+    Move exams out of the main database into the archive files of their academic years.
+    
+    Args:
+        before: Archive every exam dated before this date ('YYYY-MM-DD')
+        academic_year: Archive one academic year (named by its starting calendar
+            year); it must have ended
+        batch_rows: Exams moved per write operation
+    
+    Returns:
+        dict academic year -> number of exams moved
+    """
+    if (before is None) == (academic_year is None):
+        raise ValueError('Pass either before or academic_year')
+    if academic_year is not None:
+        start, end = academic_year_range(academic_year)
+        if end > datetime.date.today().isoformat():
+            raise ValueError(f'Academic year {academic_year} is not over until {end}')
+    else:
+        start, end = '', datetime.date.fromisoformat(before).isoformat()
+    
+    def move_batch(cursor, after_id):
+        # Walk exam_scores in id order; exams without a date are never archived
+        cursor.execute(f'''
+            SELECT {ARCHIVE_COLUMNS} FROM exam_scores
+            WHERE id > ? AND exam_date >= ? AND exam_date < ?
+            ORDER BY id LIMIT ?
+        ''', (after_id, start, end, batch_rows))
+        rows = cursor.fetchall()
+        if not rows:
+            return {}, None
+        
+        by_year = {}
+        for row in rows:
+            by_year.setdefault(academic_year_of(row[5]), []).append(row)
+        subjects = lookup_rows(cursor, 'subjects', {row[2] for row in rows})
+        exam_sessions = lookup_rows(cursor, 'exam_sessions', {row[4] for row in rows})
+        
+        # The archive is committed before the rows leave the main database; if the
+        # main commit fails, both hold the rows and get_archive_connection prefers the main copy
+        for year, year_rows in by_year.items():
+            write_archive(year, year_rows, subjects, exam_sessions)
+        cursor.executemany('DELETE FROM exam_scores WHERE id = ?', [(row[0],) for row in rows])
+        return {year: len(year_rows) for year, year_rows in by_year.items()}, rows[-1][0]
+    
+    moved = {}
+    after_id = 0
+    while after_id is not None:
+        counts, after_id = run_write(move_batch, after_id)
+        for year, count in counts.items():
+            moved[year] = moved.get(year, 0) + count
+    return dict(sorted(moved.items()))
+
+def delete_archived_exams(student_ids):
+    """Delete the archived exams of deleted students from every archive file."""
+    if not student_ids:
+        return
+    placeholders = ','.join('?' * len(student_ids))
+    for _, path in list_archives():
+        conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        try:
+            conn.execute(f'DELETE FROM exam_scores WHERE student_id IN ({placeholders})', list(student_ids))
+        finally:
+            conn.close()
+
+def archive_batches():
+    """Split the archive files into groups small enough to attach to one connection."""
+    archives = list_archives()
+    return [archives[i:i + MAX_ATTACHED_ARCHIVES] for i in range(0, len(archives), MAX_ATTACHED_ARCHIVES)]
+
+def get_archive_connection(archives, include_main=True):
+    """
+    Open a read-only connection to the main database with archive files
+    attached (as archive_<year>) and the temporary all_exams view: the exams
+    view's columns over those archives, and the main database with include_main.
+    
+    Args:
+        archives: (year, path) tuples, at most MAX_ATTACHED_ARCHIVES of them
+        include_main: Include the exams of the main database
+    """
+    conn = get_read_connection()
+    parts = ['SELECT id, student_id, subject, score, exam_name, exam_date FROM main.exams'] if include_main else []
+    if not parts and not archives:
+        conn.close()
+        raise ValueError('all_exams needs the main database or at least one archive')
+    try:
+        for year, path in archives:
+            conn.execute(f'ATTACH DATABASE ? AS archive_{year}', (path,))
+            # Exams of deleted students are left out, in case removing them from the archive failed
+            parts.append(f'''
+                SELECT id, student_id, subject, score, exam_name, exam_date FROM archive_{year}.exams a
+                WHERE NOT EXISTS (SELECT 1 FROM main.exam_scores e WHERE e.id = a.id)
+                AND a.student_id IN (SELECT id FROM main.students)
+            ''')
+        # query_only covers the temp schema too, so lift it just for the view
+        sqlite3.Connection.execute(conn, 'PRAGMA query_only = OFF')
+        conn.execute(f"CREATE TEMP VIEW all_exams AS {' UNION ALL '.join(parts)}")
+        sqlite3.Connection.execute(conn, 'PRAGMA query_only = ON')
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def query_all_exams(sql, params=()):
+    """
+    Run a query on the all_exams view over the main database and every archive.
+    
+    With more than MAX_ATTACHED_ARCHIVES archives the query runs once per
+    batch of archives and the rows are concatenated, so ORDER BY (and any
+    aggregate) only holds within a batch; callers sort the rows themselves.
+    
+    Returns:
+        List of result rows
+    """
+    rows = []
+    for number, archives in enumerate(archive_batches() or [[]]):
+        conn = get_archive_connection(archives, include_main=number == 0)
+        try:
+            rows.extend(conn.execute(sql, params).fetchall())
+        finally:
+            conn.close()
+    return rows
+
+def get_archived_history(student_id, subject):
+    """
+    Get one student's archived scores in one subject (exams still in the main
+    database are left out), ordered by exam date.
+    
+    Returns:
+        (scores, dates): float64 and datetime64[s] arrays
+    """
+    rows = []
+    for archives in archive_batches():
+        conn = get_archive_connection(archives, include_main=False)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT score, exam_date, id FROM all_exams
+                WHERE student_id = ? AND subject = ?
+            ''', (student_id, subject))
+            rows.extend(cursor.fetchall())
+        finally:
+            conn.close()
+    # Archived exams always have a date
+    rows.sort(key=lambda row: (row[1], row[2]))
+    
+    scores = np.array([row[0] for row in rows], np.float64)
+    return scores, parse_dates([row[1] for row in rows])
+
+def get_full_history(student_id, subject):
+    """
+    Scores of one student in one subject over the archives and the main
+    database, ordered by exam date like ExamSnapshot.history.
+    
+    Returns:
+        (scores, dates) arrays
+    """
+    scores, dates = get_exam_snapshot().history(student_id, subject)
+    archived_scores, archived_dates = get_archived_history(student_id, subject)
+    if not len(archived_scores):
+        return scores, dates
+    scores = np.concatenate((archived_scores, scores))
+    dates = np.concatenate((archived_dates, dates))
+    # Stable sort: archived exams stay ahead of main ones dated the same
+    order = np.argsort(dates.view(np.int64), kind='stable')
+    return scores[order], dates[order]
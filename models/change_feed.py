@@ -0,0 +1,175 @@
+"""
+Change-data feed over the students and exams tables.
+Triggers (see init_db) append an entry to the changes table for every
+insert, update and delete of a student or exam row, numbered by a
+monotonically increasing sequence number. A consumer remembers the last seq
+it processed and asks for what came after it:
+
+    for change in iter_changes(since=last_seq):
+        ...  # change = {'seq': 42, 'table': 'exams', 'op': 'update', 'id': 1234}
+
+Entries carry no row data: consumers re-read the current row by id (a
+missing row means it was deleted since).
+
+compact_changes() keeps the log small in two ways. Entries superseded by a
+newer entry for the same row are dropped, which every consumer tolerates as
+long as it treats 'insert' and 'update' alike. Optionally the log is also
+truncated to its newest entries; a consumer whose position is older than
+that gets ChangesTruncated and has to re-read the tables, then continue
+from get_latest_seq().
+"""
+
+import time
+from models.student_model import get_read_connection, run_write, CHANGE_FEED_TABLES
+
+# Entries returned per call of get_changes unless a limit is given
+CHANGE_PAGE_SIZE = 1000
+
+# Largest page a caller may ask for
+MAX_CHANGE_PAGE_SIZE = 10000
+
+# Seconds between polls while iter_changes follows the log
+POLL_SECONDS = 1.0
+
+class ChangesTruncated(LookupError):
+    """Entries after the requested sequence number were removed by compaction."""
+    
+    def __init__(self, since, truncated_seq):
+        super().__init__(f'Changes up to seq {truncated_seq} were compacted away (requested since={since}); '
+                         f're-read the tables and continue from the latest seq')
+        self.since = since
+        self.truncated_seq = truncated_seq
+
+def read_feed_position(cursor):
+    """
+    Read the position of the change log.
+    
+    Returns:
+        (latest seq, truncated seq): entries up to the truncated seq may be missing
+    """
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'")
+    row = cursor.fetchone()
+    latest = row[0] if row else 0
+    cursor.execute('SELECT truncated_seq FROM change_feed_state')
+    row = cursor.fetchone()
+    return latest, row[0] if row else 0
+
+def get_latest_seq():
+    """Get the sequence number of the newest change (0 if nothing changed yet)."""
+    conn = get_read_connection()
+    try:
+        return read_feed_position(conn.cursor())[0]
+    finally:
+        conn.close()
+
+def get_changes(since=0, limit=CHANGE_PAGE_SIZE, table=None):
+    """
+    Get the changes after a sequence number, oldest first.
+    
+    Args:
+        since: Last seq the consumer processed (0 for the start of the log)
+        limit: Most entries to return (1 - MAX_CHANGE_PAGE_SIZE)
+        table: Only changes of this table ('students' or 'exams')
+    
+    Returns:
+        dict with 'changes' (list of {'seq', 'table', 'op', 'id'}), 'next_since'
+        (pass as since to continue), 'latest_seq' and 'has_more'
+    
+    Raises:
+        ValueError for a bad limit or table, ChangesTruncated if entries after
+        since were compacted away
+    """
+    if not 1 <= limit <= MAX_CHANGE_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_CHANGE_PAGE_SIZE}')
+    if table is not None and table not in CHANGE_FEED_TABLES:
+        raise ValueError(f"Unknown table '{table}' (choose from {', '.join(CHANGE_FEED_TABLES)})")
+    
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        # One read transaction, so the position and the entries agree
+        cursor.execute('BEGIN')
+        latest, truncated = read_feed_position(cursor)
+        if since < truncated:
+            raise ChangesTruncated(since, truncated)
+        
+        query = 'SELECT seq, table_name, op, row_id FROM changes WHERE seq > ?'
+        params = [since]
+        if table is not None:
+            query += ' AND table_name = ?'
+            params.append(table)
+        cursor.execute(query + ' ORDER BY seq LIMIT ?', params + [limit + 1])
+        rows = cursor.fetchall()
+        cursor.execute('COMMIT')
+    finally:
+        conn.close()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [{'seq': seq, 'table': table_name, 'op': op, 'id': row_id} for seq, table_name, op, row_id in rows]
+    return {
+        'changes': changes,
+        # With nothing (more) to return, the consumer is caught up to latest
+        'next_since': changes[-1]['seq'] if has_more else max(since, latest),
+        'latest_seq': latest,
+        'has_more': has_more
+    }
+
+def iter_changes(since=0, follow=False, table=None, batch_size=CHANGE_PAGE_SIZE, poll_seconds=POLL_SECONDS):
+    """
+    Iterate over the changes after since, oldest first.
+    
+    Args:
+        since: Last seq already processed
+        follow: Keep polling for new changes instead of stopping at the end of the log
+        table: Only changes of this table
+        batch_size: Entries read per query
+        poll_seconds: Wait between polls while following
+    
+    Yields:
+        Change dicts as in get_changes (raises ChangesTruncated like get_changes)
+    """
+    while True:
+        page = get_changes(since, batch_size, table)
+        yield from page['changes']
+        since = page['next_since']
+        if page['has_more']:
+            continue
+        if not follow:
+            return
+        time.sleep(poll_seconds)
+
+def compact_changes(keep=None):
+    """
+    Compact the change log.
+    
+    Entries superseded by a newer entry for the same row are always removed.
+    With keep, only the newest keep entries remain after that, and consumers
+    behind them get ChangesTruncated.
+    
+    Returns:
+        dict with 'superseded' and 'truncated' entry counts and 'truncated_seq'
+    """
+    if keep is not None and keep < 0:
+        raise ValueError('keep must not be negative')
+    
+    def write(cursor):
+        cursor.execute('''
+            DELETE FROM changes
+            WHERE seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY table_name, row_id)
+        ''')
+        superseded = cursor.rowcount
+        
+        truncated = 0
+        if keep is not None:
+            cursor.execute('SELECT seq FROM changes ORDER BY seq DESC LIMIT 1 OFFSET ?', (keep,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute('DELETE FROM changes WHERE seq <= ?', (row[0],))
+                truncated = cursor.rowcount
+                cursor.execute('UPDATE change_feed_state SET truncated_seq = MAX(truncated_seq, ?)', (row[0],))
+        
+        cursor.execute('SELECT truncated_seq FROM change_feed_state')
+        return {'superseded': superseded, 'truncated': truncated, 'truncated_seq': cursor.fetchone()[0]}
+    
+    return run_write(write)
@@ -0,0 +1,270 @@
+"""
+Process-wide columnar snapshot of the exams table.
+The exams are held as NumPy arrays (id, student_id, subject code, exam code,
+score, date) sorted by (student_id, id), plus the id -> name map of the
+students. Subject and exam codes are the ids of the subjects and
+exam_sessions lookup tables. Analytics in
+core/stats.py, core/predict.py and core/graphs.py run on these arrays
+instead of re-reading rows through SQL.
+
+The snapshot is built once and then patched: when PRAGMA data_version shows
+a commit, rows with ids above the last one seen are added and rows updated
+or deleted since the last change sequence number (see models/change_feed.py)
+are re-read. Each refresh produces a new immutable
+ExamSnapshot, so readers holding the previous one are never disturbed.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from models import student_model
+from models.change_feed import read_feed_position
+
+# Rows fetched from SQLite per batch while loading
+FETCH_ROWS = 100000
+
+# Re-read everything instead of patching when more rows than this fraction changed
+REBUILD_FRACTION = 0.25
+
+# Most ids per IN (...) list (SQLite's default variable limit is 999 on old builds)
+MAX_IN_IDS = 900
+
+# Composite (student_id, id) sort keys: ids stay far below 2 ** 40
+ID_BITS = 40
+
+EXAM_COLUMNS = 'id, student_id, subject_id, score, exam_session_id, exam_date'
+
+snapshot_lock = threading.Lock()
+current_snapshot = None
+
+class ExamSnapshot:
+    """
+    Immutable columnar view of the exams table at one change sequence number.
+    
+    Attributes:
+        ids, student_ids: int64 arrays, sorted by (student_id, id)
+        subject_codes, exam_codes: int32 codes into subjects / exam_names
+        scores: float64 array
+        dates: datetime64[s] array (NaT where exam_date is empty)
+        subjects, exam_names: lists of the lookup table names by id (None for unused ids)
+        names: dict student id -> name for every student (with or without exams)
+        student_list: int64 array of the distinct student ids with exams, ascending
+        student_index: int32 array, each row's position in student_list
+        starts: int64 array, first row of each student_list entry (plus len(ids) at the end)
+    """
+    
+    def __init__(self, path, version, seq, columns, subjects, exam_names, names, max_student_id):
+        self.path = path
+        self.version = version
+        self.seq = seq
+        self.ids, self.student_ids, self.subject_codes, self.exam_codes, self.scores, self.dates = columns
+        self.subjects = subjects
+        self.exam_names = exam_names
+        self.subject_index = {subject: code for code, subject in enumerate(subjects) if subject is not None}
+        self.names = names
+        self.max_student_id = max_student_id
+        self.max_exam_id = int(self.ids.max()) if len(self.ids) else 0
+        
+        boundaries = np.flatnonzero(np.diff(self.student_ids)) + 1
+        self.starts = np.concatenate(([0], boundaries, [len(self.ids)])).astype(np.int64) if len(self.ids) else np.zeros(1, np.int64)
+        self.student_list = self.student_ids[self.starts[:-1]]
+        self.student_index = np.repeat(np.arange(len(self.student_list), dtype=np.int32), np.diff(self.starts))
+        
+        # Exams of deleted students are excluded wherever results are joined to names
+        self.known = np.fromiter((int(sid) in names for sid in self.student_list), bool, len(self.student_list))
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def subject_mask(self, subject):
+        """Boolean row mask for one subject (all False for an unknown subject)."""
+        code = self.subject_index.get(subject)
+        if code is None:
+            return np.zeros(len(self.ids), bool)
+        return self.subject_codes == code
+    
+    def student_rows(self, student_id):
+        """Slice of the rows of one student, in id order."""
+        lo = np.searchsorted(self.student_ids, student_id, 'left')
+        hi = np.searchsorted(self.student_ids, student_id, 'right')
+        return slice(int(lo), int(hi))
+    
+    def student_averages(self, mask=None):
+        """
+        Average score per student, over all rows or the rows in mask.
+        
+        Returns:
+            (student ids, averages) for students that exist and have matching rows
+        """
+        index = self.student_index if mask is None else self.student_index[mask]
+        scores = self.scores if mask is None else self.scores[mask]
+        counts = np.bincount(index, minlength=len(self.student_list))
+        sums = np.bincount(index, weights=scores, minlength=len(self.student_list))
+        present = (counts > 0) & self.known
+        return self.student_list[present], sums[present] / counts[present]
+    
+    def history(self, student_id, subject):
+        """Scores of one student in one subject ordered by exam date (empty dates first), like get_student_history."""
+        rows = self.student_rows(student_id)
+        code = self.subject_index.get(subject)
+        if code is None:
+            return np.empty(0), np.empty(0, 'datetime64[s]')
+        selected = np.flatnonzero(self.subject_codes[rows] == code) + rows.start
+        order = np.lexsort((self.ids[selected], self.dates[selected].view(np.int64)))
+        selected = selected[order]
+        return self.scores[selected], self.dates[selected]
+
+def load_labels(cursor, table):
+    """Read a lookup table into a list indexed by id."""
+    cursor.execute(f'SELECT id, name FROM {table}')
+    rows = cursor.fetchall()
+    labels = [None] * (max((row[0] for row in rows), default=-1) + 1)
+    for code, name in rows:
+        labels[code] = name
+    return labels
+
+def parse_dates(values):
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except ValueError:
+        return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed').to_numpy('datetime64[s]')
+
+def empty_columns():
+    return (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int32),
+            np.empty(0, np.int32), np.empty(0, np.float64), np.empty(0, 'datetime64[s]'))
+
+def fetch_exams(cursor, where='', params=()):
+    """Read exam_scores rows in batches into column arrays."""
+    cursor.execute(f'SELECT {EXAM_COLUMNS} FROM exam_scores {where}', params)
+    batches = []
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        ids, student_ids, subject_ids, scores, session_ids, dates = zip(*rows)
+        batches.append((
+            np.array(ids, np.int64),
+            np.array(student_ids, np.int64),
+            np.array(subject_ids, np.int32),
+            np.array(session_ids, np.int32),
+            np.array(scores, np.float64),
+            parse_dates(dates)
+        ))
+    if not batches:
+        return empty_columns()
+    return tuple(np.concatenate(parts) for parts in zip(*batches))
+
+def fetch_exams_by_id(cursor, exam_ids):
+    parts = [fetch_exams(cursor, f"WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+             for chunk in (exam_ids[i:i + MAX_IN_IDS] for i in range(0, len(exam_ids), MAX_IN_IDS))]
+    if not parts:
+        return empty_columns()
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+def sort_keys(student_ids, ids):
+    return (student_ids << ID_BITS) | ids
+
+def build_snapshot(cursor, path, version, seq):
+    """Read the whole exams table and every student name."""
+    columns = fetch_exams(cursor)
+    order = np.argsort(sort_keys(columns[1], columns[0]), kind='stable')
+    columns = tuple(column[order] for column in columns)
+    
+    cursor.execute('SELECT id, name FROM students')
+    names = dict(cursor.fetchall())
+    return ExamSnapshot(path, version, seq, columns, load_labels(cursor, 'subjects'),
+                        load_labels(cursor, 'exam_sessions'), names, max(names, default=0))
+
+def patch_snapshot(cursor, snapshot, version, seq):
+    """
+    Apply the changes since snapshot.seq.
+    
+    Returns:
+        The patched ExamSnapshot, or None when a full rebuild is cheaper
+    """
+    # Inserted rows are found by id instead
+    cursor.execute("SELECT table_name, row_id FROM changes WHERE seq > ? AND op != 'insert'", (snapshot.seq,))
+    changed = {'students': set(), 'exams': set()}
+    for table_name, row_id in cursor.fetchall():
+        changed[table_name].add(row_id)
+    if len(changed['exams']) > REBUILD_FRACTION * max(len(snapshot), 1):
+        return None
+    
+    added = fetch_exams(cursor, 'WHERE id > ?', (snapshot.max_exam_id,))
+    # Rows inserted since the snapshot are in added, even if they were updated since
+    reread = fetch_exams_by_id(cursor, sorted(row_id for row_id in changed['exams'] if row_id <= snapshot.max_exam_id))
+    
+    columns = (snapshot.ids, snapshot.student_ids, snapshot.subject_codes,
+               snapshot.exam_codes, snapshot.scores, snapshot.dates)
+    if changed['exams']:
+        keep = ~np.isin(snapshot.ids, np.fromiter(changed['exams'], np.int64))
+        columns = tuple(column[keep] for column in columns)
+    
+    new = tuple(np.concatenate(parts) for parts in zip(added, reread))
+    if len(new[0]):
+        new_keys = sort_keys(new[1], new[0])
+        order = np.argsort(new_keys, kind='stable')
+        new = tuple(column[order] for column in new)
+        positions = np.searchsorted(sort_keys(columns[1], columns[0]), new_keys[order])
+        columns = tuple(np.insert(column, positions, values) for column, values in zip(columns, new))
+    
+    names = snapshot.names
+    max_student_id = snapshot.max_student_id
+    cursor.execute('SELECT id, name FROM students WHERE id > ?', (max_student_id,))
+    new_students = cursor.fetchall()
+    if new_students or changed['students']:
+        names = dict(names)
+        names.update(new_students)
+        max_student_id = max([max_student_id] + [row[0] for row in new_students])
+        student_ids = sorted(changed['students'])
+        for i in range(0, len(student_ids), MAX_IN_IDS):
+            chunk = student_ids[i:i + MAX_IN_IDS]
+            for student_id in chunk:
+                names.pop(student_id, None)
+            cursor.execute(f"SELECT id, name FROM students WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            names.update(cursor.fetchall())
+    
+    return ExamSnapshot(snapshot.path, version, seq, columns, load_labels(cursor, 'subjects'),
+                        load_labels(cursor, 'exam_sessions'), names, max_student_id)
+
+def get_exam_snapshot():
+    """
+    Get the snapshot of the current database, refreshed if anything was committed since.
+    
+    Returns:
+        ExamSnapshot (treat its arrays as read-only)
+    """
+    global current_snapshot
+    path = student_model.DB_PATH
+    version = student_model.get_data_version()
+    snapshot = current_snapshot
+    if snapshot is not None and snapshot.path == path and snapshot.version == version:
+        return snapshot
+    
+    with snapshot_lock:
+        snapshot = current_snapshot
+        if snapshot is not None and snapshot.path == path and snapshot.version == version:
+            return snapshot
+        
+        conn = student_model.get_read_connection()
+        try:
+            cursor = conn.cursor()
+            # One read transaction, so the rows and the change sequence agree
+            cursor.execute('BEGIN')
+            seq, truncated = read_feed_position(cursor)
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'exam_scores'")
+            row = cursor.fetchone()
+            last_exam_id = row[0] if row else 0
+            
+            patched = None
+            if (snapshot is not None and snapshot.path == path
+                    # Ids and sequence numbers never go back unless the database was replaced
+                    and last_exam_id >= snapshot.max_exam_id and seq >= snapshot.seq
+                    # and every change since the snapshot must still be in the log
+                    and snapshot.seq >= truncated):
+                patched = patch_snapshot(cursor, snapshot, version, seq)
+            current_snapshot = patched or build_snapshot(cursor, path, version, seq)
+            cursor.execute('COMMIT')
+        finally:
+            conn.close()
+        return current_snapshot
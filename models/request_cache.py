@@ -0,0 +1,80 @@
+"""
+Request-scoped memoization for read queries.
+Within one Flask request, repeated calls to a memoized read function with the
+same arguments are computed once. Outside a request (scripts, CLI) the
+functions run normally.
+
+Callers share one cached result: lists and dicts are handed out as shallow
+copies, so sorting or extending them is safe, but the objects inside (e.g.
+each student dict) are shared and must be treated as read-only.
+"""
+
+import functools
+from flask import g, has_request_context
+
+def get_request_cache():
+    """Get the cache dict for the current request, or None outside a request."""
+    if not has_request_context():
+        return None
+    if 'query_cache' not in g:
+        g.query_cache = {}
+        g.query_cache_hits = 0
+        g.query_cache_misses = 0
+    return g.query_cache
+
+def shallow_copy(result):
+    """Copy a cached list or dict so callers cannot reorder or resize the cached one."""
+    if isinstance(result, (list, dict)):
+        return result.copy()
+    return result
+
+def request_memo(func):
+    """
+    Cache a read function's result for the rest of the current request.
+
+    Returns a shallow copy of a cached list or dict; treat the items as read-only.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = get_request_cache()
+        if cache is None:
+            return func(*args, **kwargs)
+
+        key = (func.__module__, func.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        if key in cache:
+            g.query_cache_hits += 1
+            return shallow_copy(cache[key])
+
+        g.query_cache_misses += 1
+        result = func(*args, **kwargs)
+        cache[key] = result
+        return shallow_copy(result)
+    return wrapper
+
+def clear_request_cache():
+    """Drop cached results so reads after a write see fresh data."""
+    cache = get_request_cache()
+    if cache is not None:
+        cache.clear()
+
+def invalidates_request_cache(func):
+    """Clear the request cache before and after a write function runs."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        clear_request_cache()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            clear_request_cache()
+    return wrapper
+
+def get_request_cache_stats():
+    """Get (hits, misses) for the current request."""
+    if not has_request_context() or 'query_cache' not in g:
+        return 0, 0
+    return g.query_cache_hits, g.query_cache_misses
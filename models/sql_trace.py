@@ -0,0 +1,173 @@
+"""
+SQL tracing and N+1 detection for the model layer.
+With SCORESENSE_SQL_TRACE=1 every statement run while serving a request is
+recorded with its normalized shape, duration and calling function. At the
+end of the request, shapes repeated at least N_PLUS_ONE_THRESHOLD times are
+logged as likely N+1 patterns, and statements slower than SLOW_QUERY_MS are
+logged as they happen. count_queries / assert_max_queries work without the
+environment switch, for tests.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from flask import g, has_request_context, request
+from models import student_model
+from models.student_model import on_query
+
+load_dotenv()
+
+SQL_TRACE_ENABLED = os.getenv('SCORESENSE_SQL_TRACE', '').lower() in ('1', 'true', 'yes')
+
+# Statements slower than this are logged
+SLOW_QUERY_MS = float(os.getenv('SCORESENSE_SLOW_QUERY_MS', '100'))
+
+# A query shape repeated this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv('SCORESENSE_N_PLUS_ONE_THRESHOLD', '5'))
+
+logger = logging.getLogger('scoresense.sql')
+
+# Frames in these files (the tracer, and the observed cursor methods) are skipped when looking for the caller
+TRACE_FILE = os.path.abspath(__file__)
+MODEL_FILE = os.path.abspath(student_model.__file__)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+local = threading.local()
+observer_registered = False
+observer_lock = threading.Lock()
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals become ? and IN lists collapse."""
+    shape = STRING_LITERAL.sub('?', sql)
+    shape = NUMBER_LITERAL.sub('?', shape)
+    shape = PARAMETER_LIST.sub('(?+)', shape)
+    return WHITESPACE.sub(' ', shape).strip()
+
+def calling_function():
+    """Get 'module.function:line' of the nearest caller outside the DB access path."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.abspath(code.co_filename)
+        internal = filename == TRACE_FILE or (filename == MODEL_FILE and code.co_name in ('execute', 'executemany'))
+        if not internal:
+            return f"{frame.f_globals.get('__name__', '?')}.{code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return '?'
+
+def active_collectors():
+    if not hasattr(local, 'collectors'):
+        local.collectors = []
+    return local.collectors
+
+def trace_query(sql, seconds):
+    """Query observer: record the statement for the request and any active collectors."""
+    collectors = active_collectors()
+    tracing = SQL_TRACE_ENABLED and has_request_context() and 'sql_trace' in g
+    if not collectors and not tracing:
+        return
+    
+    entry = {
+        'sql': sql,
+        'shape': normalize_sql(sql),
+        'ms': round(seconds * 1000, 3),
+        'caller': calling_function()
+    }
+    for collector in collectors:
+        collector.append(entry)
+    if tracing:
+        g.sql_trace.append(entry)
+        if entry['ms'] >= SLOW_QUERY_MS:
+            logger.warning('Slow query (%.1f ms) in %s %s from %s: %s',
+                           entry['ms'], request.method, request.path, entry['caller'], entry['shape'])
+
+def ensure_observer():
+    """Register trace_query with the model layer once."""
+    global observer_registered
+    with observer_lock:
+        if not observer_registered:
+            on_query(trace_query)
+            observer_registered = True
+
+def find_repeated_shapes(entries, threshold=N_PLUS_ONE_THRESHOLD):
+    """
+    Find query shapes run at least threshold times.
+    
+    Returns:
+        list of dicts with 'shape', 'count', 'total_ms' and 'callers', most frequent first
+    """
+    counts = Counter(entry['shape'] for entry in entries)
+    repeated = []
+    for shape, count in counts.most_common():
+        if count < threshold:
+            break
+        matching = [entry for entry in entries if entry['shape'] == shape]
+        repeated.append({
+            'shape': shape,
+            'count': count,
+            'total_ms': round(sum(entry['ms'] for entry in matching), 3),
+            'callers': sorted({entry['caller'] for entry in matching})
+        })
+    return repeated
+
+@contextmanager
+def count_queries():
+    """
+    Collect every statement run in this thread inside the block.
+    
+    Usage:
+        with count_queries() as queries:
+            client.get('/api/stats')
+        len(queries)  # statements run
+    """
+    ensure_observer()
+    entries = []
+    collectors = active_collectors()
+    collectors.append(entries)
+    try:
+        yield entries
+    finally:
+        collectors.remove(entries)
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail with the offending statements if the block runs more than limit statements."""
+    with count_queries() as entries:
+        yield entries
+    if len(entries) > limit:
+        repeated = find_repeated_shapes(entries, threshold=2)
+        details = '; '.join(f"{item['count']}x {item['shape']} ({', '.join(item['callers'])})" for item in repeated)
+        raise AssertionError(f'Expected at most {limit} queries, ran {len(entries)}. Repeated: {details or "none"}')
+
+def start_trace():
+    g.sql_trace = []
+
+def finish_trace(response):
+    entries = g.get('sql_trace')
+    if entries is None:
+        return response
+    
+    response.headers['X-SQL-Query-Count'] = str(len(entries))
+    for item in find_repeated_shapes(entries):
+        logger.warning('Possible N+1 in %s %s: %d x %s (%.1f ms total) from %s',
+                       request.method, request.path, item['count'], item['shape'],
+                       item['total_ms'], ', '.join(item['callers']))
+    return response
+
+def init_sql_trace(app):
+    """Trace every request's SQL if SCORESENSE_SQL_TRACE is set."""
+    if not SQL_TRACE_ENABLED:
+        return
+    
+    ensure_observer()
+    app.before_request(start_trace)
+    app.after_request(finish_trace)
@@ -1,15 +1,118 @@
 import sqlite3
 import os
 import json
+import base64
+import threading
+import time
+import uuid
+from models.request_cache import request_memo, invalidates_request_cache
+from models.write_queue import WriteQueue
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'db', 'students.db')
 
+# Callbacks notified when student names change: callback(event, student_id, name)
+# with event one of 'add', 'rename', 'delete'
+student_change_listeners = []
+
+def on_student_change(callback):
+    """Register a callback for student add / rename / delete events."""
+    student_change_listeners.append(callback)
+    return callback
+
+def notify_student_change(event, student_id, name=None):
+    """Notify registered listeners that a student was added, renamed or deleted."""
+    for callback in student_change_listeners:
+        callback(event, student_id, name)
+
+# Lookup tables of the dictionary-encoded exam columns (subject, exam_name)
+LOOKUP_TABLES = ('subjects', 'exam_sessions')
+
+# Exams are stored with subjects and exam names dictionary-encoded into lookup tables;
+# the exams view restores the original (subject, exam_name) columns
+EXAMS_VIEW_SQL = '''
+    CREATE VIEW IF NOT EXISTS exams AS
+    SELECT e.id, e.student_id, s.name AS subject, e.score, x.name AS exam_name, e.exam_date
+    FROM exam_scores e
+    JOIN subjects s ON s.id = e.subject_id
+    JOIN exam_sessions x ON x.id = e.exam_session_id
+'''
+
+EXAMS_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_exams_student_subject_score ON exam_scores (student_id, subject_id, score)'
+
+def create_exam_tables(cursor):
+    """Create the lookup tables and exam_scores (the schema shared with archive files)."""
+    for table in LOOKUP_TABLES:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exam_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            exam_session_id INTEGER NOT NULL,
+            exam_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students (id),
+            FOREIGN KEY (subject_id) REFERENCES subjects (id),
+            FOREIGN KEY (exam_session_id) REFERENCES exam_sessions (id)
+        )
+    ''')
+
+def migrate_exams_table(cursor):
+    """
+    Move the rows of a pre-lookup exams table (subject and exam_name stored as
+    text on every row) into exam_scores, keeping ids, then drop it.
+    
+    The freed pages stay in the file until the database is vacuumed.
+    """
+    cursor.execute('INSERT OR IGNORE INTO subjects (name) SELECT DISTINCT subject FROM exams')
+    cursor.execute("INSERT OR IGNORE INTO exam_sessions (name) SELECT DISTINCT COALESCE(exam_name, 'General') FROM exams")
+    cursor.execute('''
+        INSERT INTO exam_scores (id, student_id, subject_id, score, exam_session_id, exam_date)
+        SELECT e.id, e.student_id, s.id, e.score, x.id, e.exam_date
+        FROM exams e
+        JOIN subjects s ON s.name = e.subject
+        JOIN exam_sessions x ON x.name = COALESCE(e.exam_name, 'General')
+        ORDER BY e.id
+    ''')
+    
+    # Carry the AUTOINCREMENT counter over, so ids of deleted exams are never handed out again
+    cursor.execute("SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('exams', 'exam_scores')")
+    seq = cursor.fetchone()[0]
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'exam_scores'")
+    if seq is not None:
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('exam_scores', ?)", (seq,))
+    
+    cursor.execute('DROP TABLE exams')
+
+# Tables in the change feed: name recorded in changes.table_name -> table the rows live in
+CHANGE_FEED_TABLES = {'students': 'students', 'exams': 'exam_scores'}
+
+def create_change_triggers(cursor):
+    """Create the triggers that log inserts, updates and deletes to the changes table."""
+    for table, source in CHANGE_FEED_TABLES.items():
+        for op, row in (('INSERT', 'NEW'), ('UPDATE', 'OLD'), ('DELETE', 'OLD')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS log_{table}_{op.lower()} AFTER {op} ON {source}
+                BEGIN
+                    INSERT INTO changes (table_name, op, row_id) VALUES ('{table}', '{op.lower()}', {row}.id);
+                END
+            ''')
+
 def init_db():
     """Initialize the database with required tables."""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    # WAL lets readers keep going while the writer thread commits (the setting is stored in the file)
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS students (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,27 +129,209 @@ def init_db():
         )
     ''')
     
+    create_exam_tables(cursor)
+    
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'exams'")
+    row = cursor.fetchone()
+    if row and row[0] == 'table':
+        migrate_exams_table(cursor)
+    
+    cursor.execute(EXAMS_VIEW_SQL)
+    
+    # Writes through the view keep working for ad-hoc scripts; the app itself writes exam_scores
+    # (see insert_exams), since rowcount does not see changes made by INSTEAD OF triggers
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS exams (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TRIGGER IF NOT EXISTS exams_insert INSTEAD OF INSERT ON exams
+        BEGIN
+            INSERT OR IGNORE INTO subjects (name) VALUES (NEW.subject);
+            INSERT OR IGNORE INTO exam_sessions (name) VALUES (COALESCE(NEW.exam_name, 'General'));
+            INSERT INTO exam_scores (id, student_id, subject_id, score, exam_session_id, exam_date)
+            VALUES (NEW.id, NEW.student_id, (SELECT id FROM subjects WHERE name = NEW.subject), NEW.score,
+                    (SELECT id FROM exam_sessions WHERE name = COALESCE(NEW.exam_name, 'General')),
+                    COALESCE(NEW.exam_date, CURRENT_TIMESTAMP));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS exams_update INSTEAD OF UPDATE ON exams
+        BEGIN
+            INSERT OR IGNORE INTO subjects (name) VALUES (NEW.subject);
+            INSERT OR IGNORE INTO exam_sessions (name) VALUES (COALESCE(NEW.exam_name, 'General'));
+            UPDATE exam_scores SET
+                student_id = NEW.student_id,
+                subject_id = (SELECT id FROM subjects WHERE name = NEW.subject),
+                score = NEW.score,
+                exam_session_id = (SELECT id FROM exam_sessions WHERE name = COALESCE(NEW.exam_name, 'General')),
+                exam_date = NEW.exam_date
+            WHERE id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS exams_delete INSTEAD OF DELETE ON exams
+        BEGIN
+            DELETE FROM exam_scores WHERE id = OLD.id;
+        END
+    ''')
+    
+    # Import ledger: fingerprints of imported files and rows, used to make re-imports idempotent
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_files (
+            file_hash TEXT PRIMARY KEY,
+            filename TEXT,
+            rows INTEGER,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_rows (
             student_id INTEGER NOT NULL,
-            subject TEXT NOT NULL,
-            score REAL NOT NULL,
-            exam_name TEXT DEFAULT 'General',
-            exam_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students (id)
+            exam_name TEXT NOT NULL,
+            row_hash TEXT NOT NULL,
+            file_hash TEXT,
+            PRIMARY KEY (student_id, exam_name)
         )
     ''')
     
+    # Change feed: every insert, update or delete of a student or exam row appends an entry
+    # here, numbered by seq (see models/change_feed.py). change_feed_state records up to which
+    # seq entries were truncated by compaction.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE TABLE IF NOT EXISTS change_feed_state (truncated_seq INTEGER NOT NULL)')
+    cursor.execute('INSERT INTO change_feed_state (truncated_seq) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM change_feed_state)')
+    create_change_triggers(cursor)
+    
+    # Keyset pagination walks students in (name, id) order, optionally within one grade / section / gender;
+    # per-student averages are answered from the covering exams index
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_grade_name ON students (grade, name, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_section_name ON students (section, name, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_gender_name ON students (gender, name, id)')
+    cursor.execute(EXAMS_INDEX_SQL)
+    
     conn.commit()
     conn.close()
 
-def get_connection():
-    """Get a database connection with timeout and autocommit."""
+# Callbacks notified after every SQL statement: callback(sql, seconds).
+# While none are registered, connections are plain sqlite3 connections.
+query_observers = []
+
+def on_query(callback):
+    """Register a callback timing every statement run through connect()."""
+    query_observers.append(callback)
+    return callback
+
+class ObservedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement and its duration to query_observers."""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            for callback in query_observers:
+                callback(sql, elapsed)
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            for callback in query_observers:
+                callback(sql, elapsed)
+
+class ObservedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are ObservedCursors."""
+    
+    def cursor(self, factory=ObservedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connect(path, readonly=False):
+    """
+    Open an autocommit connection to path (the shared access path for every module).
+    
+    Read-only connections refuse writes; the app writes only through run_write.
+    """
     # Use isolation_level=None for autocommit mode to prevent locks
-    conn = sqlite3.connect(DB_PATH, timeout=30.0, isolation_level=None)
+    factory = ObservedConnection if query_observers else sqlite3.Connection
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, factory=factory)
+    if readonly:
+        # Set on the base class so query observers only see the caller's own statements
+        sqlite3.Connection.execute(conn, 'PRAGMA query_only = ON')
     return conn
 
+def get_connection():
+    """Get a database connection with timeout and autocommit (for scripts and maintenance)."""
+    return connect(DB_PATH)
+
+def get_read_connection():
+    """Get a read-only connection to the database."""
+    return connect(DB_PATH, readonly=True)
+
+# The writer thread owning the only write connection of the app
+write_queue = WriteQueue(connect)
+
+# Seconds run_write waits for its commit before raising TimeoutError (unset: no limit)
+WRITE_TIMEOUT = float(os.getenv('SCORESENSE_WRITE_TIMEOUT')) if os.getenv('SCORESENSE_WRITE_TIMEOUT') else None
+
+def submit_write(func, *args, **kwargs):
+    """
+    Queue func(cursor, *args, **kwargs) for the writer thread.
+    
+    Writes queued together are committed in one transaction; each runs in
+    its own savepoint, so an exception only rolls back that write.
+    
+    Returns:
+        Future with func's return value, resolved after the commit
+    """
+    return write_queue.submit(DB_PATH, func, *args, **kwargs)
+
+def run_write(func, *args, **kwargs):
+    """
+    Run func(cursor, *args, **kwargs) on the writer thread and wait for the commit
+    (at most SCORESENSE_WRITE_TIMEOUT seconds when that is set).
+    """
+    return write_queue.wait(submit_write(func, *args, **kwargs), WRITE_TIMEOUT)
+
+# Read-only connection kept open for PRAGMA data_version, which changes whenever
+# any other connection (in any process) commits to the database
+data_version_conn = None
+data_version_path = None
+data_version_token = None
+data_version_lock = threading.Lock()
+
+def get_data_version():
+    """
+    Get a token that changes whenever the database contents change.
+    
+    The token combines SQLite's data_version counter with a random id for the
+    connection it is read from, since the counter restarts on reconnect.
+    """
+    global data_version_conn, data_version_path, data_version_token
+    with data_version_lock:
+        if data_version_conn is None or data_version_path != DB_PATH:
+            if data_version_conn is not None:
+                data_version_conn.close()
+            data_version_conn = sqlite3.connect(DB_PATH, timeout=30.0, isolation_level=None, check_same_thread=False)
+            data_version_path = DB_PATH
+            data_version_token = uuid.uuid4().hex[:8]
+        version = data_version_conn.execute('PRAGMA data_version').fetchone()[0]
+    return f'{data_version_token}-{version}'
+
+@invalidates_request_cache
 def add_student(name, grade=None, section=None, age=None, gender=None, email=None, phone=None, address=None):
     """
     Add a new student with personal details only.
@@ -62,11 +347,7 @@ def add_student(name, grade=None, section=None, age=None, gender=None, email=Non
     Returns:
         Student ID if successful, None if student exists
     """
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
+    def write(cursor):
         # Initialize with empty marks
         marks_json = json.dumps({})
         
@@ -74,21 +355,23 @@ def add_student(name, grade=None, section=None, age=None, gender=None, email=Non
             INSERT INTO students (name, marks, grade, section, age, gender, email, phone, address) 
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (name, marks_json, grade, section, age, gender, email, phone, address))
-        
-        student_id = cursor.lastrowid
-        return student_id
+        return cursor.lastrowid
+    
+    try:
+        student_id = run_write(write)
     except sqlite3.IntegrityError:
         return None
-    finally:
-        if conn:
-            conn.close()
+    
+    notify_student_change('add', student_id, name)
+    return student_id
 
+@request_memo
 def get_student_average(student_id):
     """Calculate average score for a student from all exams."""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT AVG(score) FROM exams WHERE student_id = ?', (student_id,))
+    cursor.execute('SELECT AVG(score) FROM exam_scores WHERE student_id = ?', (student_id,))
     result = cursor.fetchone()
     conn.close()
     
@@ -96,36 +379,43 @@ def get_student_average(student_id):
         return round(result[0], 1)
     return None
 
+@request_memo
 def get_all_students():
     """Get all students with their marks and details."""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     cursor.execute('SELECT id, name, marks, grade, section, age, gender, email, phone, address FROM students ORDER BY name')
     rows = cursor.fetchall()
     
+    # Load every student's averages in two grouped queries instead of two queries per student
+    # (grouped on subject ids, names are joined to the much smaller result)
+    cursor.execute('''
+        SELECT a.student_id, s.name, a.avg_score
+        FROM (
+            SELECT student_id, subject_id, AVG(score) as avg_score
+            FROM exam_scores
+            GROUP BY student_id, subject_id
+        ) a
+        JOIN subjects s ON s.id = a.subject_id
+        ORDER BY a.student_id, s.name
+    ''')
+    subject_averages_by_student = {}
+    for student_id, subject, avg_score in cursor.fetchall():
+        subject_averages_by_student.setdefault(student_id, {})[subject] = round(avg_score, 1)
+    
+    cursor.execute('SELECT student_id, AVG(score) FROM exam_scores GROUP BY student_id')
+    overall_averages = {row[0]: round(row[1], 1) for row in cursor.fetchall()}
+    
     students = []
     for row in rows:
         student_id = row[0]
         
-        # Get subject averages from exams table
-        cursor.execute('''
-            SELECT subject, AVG(score) as avg_score
-            FROM exams
-            WHERE student_id = ?
-            GROUP BY subject
-        ''', (student_id,))
-        subject_results = cursor.fetchall()
-        
-        subject_averages = {}
-        for subj_row in subject_results:
-            subject_averages[subj_row[0]] = round(subj_row[1], 1)
-        
         students.append({
             'id': student_id,
             'name': row[1],
             'marks': json.loads(row[2]),
-            'subject_averages': subject_averages,
+            'subject_averages': subject_averages_by_student.get(student_id, {}),
             'grade': row[3],
             'section': row[4],
             'age': row[5],
@@ -133,67 +423,189 @@ def get_all_students():
             'email': row[7],
             'phone': row[8],
             'address': row[9],
-            'average': get_student_average(student_id)
+            'average': overall_averages.get(student_id)
         })
     
     conn.close()
     return students
 
+# Fields a students page can be projected to; id and name are always included
+STUDENT_PAGE_FIELDS = ('id', 'name', 'marks', 'grade', 'section', 'age', 'gender', 'email', 'phone', 'address', 'average', 'subject_averages')
+
+# Upper bound for the page size
+MAX_STUDENT_PAGE_SIZE = 500
+
+# Correlated subqueries answered from idx_exams_student_subject_score
+STUDENT_AVERAGE_SQL = '(SELECT AVG(score) FROM exam_scores WHERE student_id = s.id)'
+SUBJECT_AVERAGE_SQL = '''(SELECT AVG(score) FROM exam_scores
+    WHERE student_id = s.id AND subject_id = (SELECT id FROM subjects WHERE name = ?))'''
+
+def encode_page_cursor(name, student_id):
+    """Encode the (name, id) position after the last student of a page."""
+    return base64.urlsafe_b64encode(json.dumps([name, student_id]).encode('utf-8')).decode('ascii')
+
+def decode_page_cursor(cursor):
+    """Decode a cursor from encode_page_cursor, raising ValueError if it is malformed."""
+    try:
+        name, student_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(name), int(student_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+@request_memo
+def get_students_page(limit=50, cursor=None, grade=None, section=None, gender=None,
+                      min_average=None, max_average=None, min_subject_scores=None,
+                      max_subject_scores=None, fields=None):
+    """
+    Get one page of students in name order, filtered in SQL.
+    
+    Pages are keyset-paginated on (name, id): the cursor marks where the
+    previous page ended, so fetching any page costs the same regardless of
+    how many students come before it.
+    
+    Args:
+        limit: Page size (capped at MAX_STUDENT_PAGE_SIZE)
+        cursor: next_cursor from the previous page, or None for the first page
+        grade, section, gender: Exact-match filters
+        min_average, max_average: Range on the student's overall average
+        min_subject_scores, max_subject_scores: Tuples of (subject, score)
+            thresholds on the student's average in that subject
+        fields: Tuple of STUDENT_PAGE_FIELDS to return (default: all)
+    
+    Returns:
+        dict with 'students' and 'next_cursor' (None on the last page)
+    """
+    fields = tuple(fields) if fields else STUDENT_PAGE_FIELDS
+    unknown = [field for field in fields if field not in STUDENT_PAGE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(int(limit), MAX_STUDENT_PAGE_SIZE))
+    
+    # (SQL expression, result key) pairs
+    columns = [('s.id', 'id'), ('s.name', 'name')]
+    columns += [(f's.{field}', field) for field in fields if field not in ('id', 'name', 'average', 'subject_averages')]
+    if 'average' in fields:
+        columns.append((STUDENT_AVERAGE_SQL, 'average'))
+    
+    conditions = []
+    params = []
+    if cursor:
+        conditions.append('(s.name, s.id) > (?, ?)')
+        params.extend(decode_page_cursor(cursor))
+    for column, value in (('grade', grade), ('section', section), ('gender', gender)):
+        if value is not None:
+            conditions.append(f's.{column} = ?')
+            params.append(value)
+    if min_average is not None:
+        conditions.append(f'{STUDENT_AVERAGE_SQL} >= ?')
+        params.append(float(min_average))
+    if max_average is not None:
+        conditions.append(f'{STUDENT_AVERAGE_SQL} <= ?')
+        params.append(float(max_average))
+    for thresholds, operator in ((min_subject_scores, '>='), (max_subject_scores, '<=')):
+        for subject, score in thresholds or ():
+            conditions.append(f'{SUBJECT_AVERAGE_SQL} {operator} ?')
+            params.extend([subject, float(score)])
+    
+    query = f"SELECT {', '.join(sql for sql, _ in columns)} FROM students s"
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY s.name, s.id LIMIT ?'
+    params.append(limit + 1)
+    
+    conn = get_read_connection()
+    db_cursor = conn.cursor()
+    db_cursor.execute(query, params)
+    rows = db_cursor.fetchall()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    students = []
+    for row in rows:
+        student = dict(zip((key for _, key in columns), row))
+        if 'marks' in student:
+            student['marks'] = json.loads(student['marks'])
+        if student.get('average') is not None:
+            student['average'] = round(student['average'], 1)
+        students.append(student)
+    
+    if 'subject_averages' in fields and students:
+        by_id = {student['id']: student for student in students}
+        for student in students:
+            student['subject_averages'] = {}
+        placeholders = ', '.join('?' * len(by_id))
+        db_cursor.execute(f'''
+            SELECT a.student_id, s.name, a.avg_score
+            FROM (
+                SELECT student_id, subject_id, AVG(score) as avg_score
+                FROM exam_scores
+                WHERE student_id IN ({placeholders})
+                GROUP BY student_id, subject_id
+            ) a
+            JOIN subjects s ON s.id = a.subject_id
+            ORDER BY a.student_id, s.name
+        ''', list(by_id))
+        for student_id, subject, avg_score in db_cursor.fetchall():
+            by_id[student_id]['subject_averages'][subject] = round(avg_score, 1)
+    
+    conn.close()
+    
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_page_cursor(rows[-1][1], rows[-1][0])
+    
+    return {
+        'students': students,
+        'next_cursor': next_cursor
+    }
+
+# Columns of a student profile, in the order student_from_row expects
+STUDENT_COLUMNS = 'id, name, marks, grade, section, age, gender, email, phone, address'
+
+def student_from_row(row):
+    """Build a student dict from a row of STUDENT_COLUMNS."""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'marks': json.loads(row[2]),
+        'grade': row[3],
+        'section': row[4],
+        'age': row[5],
+        'gender': row[6],
+        'email': row[7],
+        'phone': row[8],
+        'address': row[9]
+    }
+
 def get_student_by_id(student_id):
     """Get a specific student by ID."""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT id, name, marks, grade, section, age, gender, email, phone, address FROM students WHERE id = ?', (student_id,))
+    cursor.execute(f'SELECT {STUDENT_COLUMNS} FROM students WHERE id = ?', (student_id,))
     row = cursor.fetchone()
     
     conn.close()
     
-    if row:
-        return {
-            'id': row[0],
-            'name': row[1],
-            'marks': json.loads(row[2]),
-            'grade': row[3],
-            'section': row[4],
-            'age': row[5],
-            'gender': row[6],
-            'email': row[7],
-            'phone': row[8],
-            'address': row[9]
-        }
-    return None
+    return student_from_row(row) if row else None
 
+@request_memo
 def get_student_by_name(name):
     """Get a specific student by name."""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT id, name, marks, grade, section, age, gender, email, phone, address FROM students WHERE LOWER(name) = LOWER(?)', (name,))
+    cursor.execute(f'SELECT {STUDENT_COLUMNS} FROM students WHERE LOWER(name) = LOWER(?)', (name,))
     row = cursor.fetchone()
     
     conn.close()
     
-    if row:
-        return {
-            'id': row[0],
-            'name': row[1],
-            'marks': json.loads(row[2]),
-            'grade': row[3],
-            'section': row[4],
-            'age': row[5],
-            'gender': row[6],
-            'email': row[7],
-            'phone': row[8],
-            'address': row[9]
-        }
-    return None
+    return student_from_row(row) if row else None
 
+@invalidates_request_cache
 def update_student(student_id, name=None, grade=None, section=None, age=None, gender=None, email=None, phone=None, address=None, marks_dict=None, exam_name='Update'):
     """Update student information and optionally add new exam scores."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     # Update personal details
     update_fields = []
     update_values = []
@@ -223,66 +635,100 @@ def update_student(student_id, name=None, grade=None, section=None, age=None, ge
         update_fields.append('address = ?')
         update_values.append(address)
     
-    if update_fields:
-        update_values.append(student_id)
-        cursor.execute(f'UPDATE students SET {", ".join(update_fields)} WHERE id = ?', update_values)
-    
-    # Add new exam records if marks provided
-    if marks_dict:
-        marks_json = json.dumps(marks_dict)
-        cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (marks_json, student_id))
+    def write(cursor):
+        if update_fields:
+            update_values.append(student_id)
+            cursor.execute(f'UPDATE students SET {", ".join(update_fields)} WHERE id = ?', update_values)
         
-        for subject, score in marks_dict.items():
-            cursor.execute('INSERT INTO exams (student_id, subject, score, exam_name) VALUES (?, ?, ?, ?)',
-                         (student_id, subject, float(score), exam_name))
+        # Add new exam records if marks provided
+        if marks_dict:
+            marks_json = json.dumps(marks_dict)
+            cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (marks_json, student_id))
+            
+            insert_exams(cursor, [(student_id, subject, score, exam_name) for subject, score in marks_dict.items()])
     
-    conn.commit()
-    conn.close()
+    run_write(write)
+    
+    if name is not None:
+        notify_student_change('rename', student_id, name)
     return True
 
+def forget_imports(cursor, student_id, exam_name=None):
+    """
+    Drop import ledger entries after data was deleted, so re-importing the
+    same file or rows restores it instead of being skipped as unchanged.
+    
+    Only the files the forgotten rows were last imported from lose their
+    entry; other files can still be skipped as already imported.
+    """
+    if exam_name is None:
+        where, params = 'student_id = ?', (student_id,)
+    else:
+        where, params = 'student_id = ? AND exam_name = ?', (student_id, exam_name)
+    cursor.execute(f'SELECT DISTINCT file_hash FROM import_rows WHERE {where} AND file_hash IS NOT NULL', params)
+    file_hashes = cursor.fetchall()
+    cursor.execute(f'DELETE FROM import_rows WHERE {where}', params)
+    cursor.executemany('DELETE FROM import_files WHERE file_hash = ?', file_hashes)
+
+@invalidates_request_cache
 def delete_student(student_id):
-    """Delete a student and their exam records."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """Delete a student and their exam records, archived years included."""
+    def write(cursor):
+        cursor.execute('DELETE FROM exam_scores WHERE student_id = ?', (student_id,))
+        cursor.execute('DELETE FROM students WHERE id = ?', (student_id,))
+        forget_imports(cursor, student_id)
     
-    cursor.execute('DELETE FROM exams WHERE student_id = ?', (student_id,))
-    cursor.execute('DELETE FROM students WHERE id = ?', (student_id,))
+    run_write(write)
     
-    conn.commit()
-    conn.close()
+    from models.archive import delete_archived_exams
+    delete_archived_exams([student_id])
+    notify_student_change('delete', student_id)
     return True
 
-def get_student_history(student_id, subject):
-    """Get historical scores for a student in a specific subject."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def read_exam_rows(sql, params, include_archive=False):
+    """
+    Run an exam query; {exams} in sql names the exams view of the main
+    database, or all_exams to include the archived academic years.
     
-    cursor.execute('''
+    With include_archive the rows come from several queries (see
+    models.archive.query_all_exams), so ORDER BY does not hold across them.
+    """
+    if include_archive:
+        from models.archive import query_all_exams
+        return query_all_exams(sql.format(exams='all_exams'), params)
+    conn = get_read_connection()
+    try:
+        return conn.execute(sql.format(exams='exams'), params).fetchall()
+    finally:
+        conn.close()
+
+@request_memo
+def get_student_history(student_id, subject, include_archive=False):
+    """Get historical scores for a student in a specific subject (archived years too with include_archive)."""
+    rows = read_exam_rows('''
         SELECT score, exam_date, exam_name 
-        FROM exams 
+        FROM {exams} 
         WHERE student_id = ? AND subject = ?
         ORDER BY exam_date
-    ''', (student_id, subject))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    ''', (student_id, subject), include_archive)
+    if include_archive:
+        # Empty dates first, like SQLite's NULLs
+        rows.sort(key=lambda row: row[1] or '')
     
     return [{'score': row[0], 'date': row[1], 'exam_name': row[2]} for row in rows]
 
-def get_all_exams_for_student(student_id):
-    """Get all exams for a student grouped by subject."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+@request_memo
+def get_all_exams_for_student(student_id, include_archive=False):
+    """Get all exams for a student grouped by subject (archived years too with include_archive)."""
+    rows = read_exam_rows('''
         SELECT id, subject, score, exam_name, exam_date 
-        FROM exams 
+        FROM {exams} 
         WHERE student_id = ?
         ORDER BY subject, exam_date DESC
-    ''', (student_id,))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    ''', (student_id,), include_archive)
+    if include_archive:
+        rows.sort(key=lambda row: row[4] or '', reverse=True)
+        rows.sort(key=lambda row: row[1])
     
     exams_by_subject = {}
     for row in rows:
@@ -298,9 +744,10 @@ def get_all_exams_for_student(student_id):
     
     return exams_by_subject
 
+@request_memo
 def get_exams_grouped_by_name(student_id):
     """Get all exams for a student grouped by exam name."""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -329,34 +776,75 @@ def get_exams_grouped_by_name(student_id):
     
     return exams_by_name
 
-def add_complete_exam(student_id, exam_name, marks_dict):
-    """Add a complete exam with multiple subjects at once."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def update_current_marks(cursor, student_id, marks_dict):
+    """Merge scores into a student's current marks (the legacy marks JSON)."""
+    cursor.execute('SELECT marks FROM students WHERE id = ?', (student_id,))
+    row = cursor.fetchone()
+    if row:
+        marks = json.loads(row[0]) if row[0] else {}
+        marks.update(marks_dict)
+        cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (json.dumps(marks), student_id))
+
+def lookup_ids(cursor, table, names):
+    """
+    Get the ids of names in a lookup table (see LOOKUP_TABLES), adding the missing ones.
     
-    for subject, score in marks_dict.items():
-        cursor.execute('INSERT INTO exams (student_id, subject, score, exam_name) VALUES (?, ?, ?, ?)',
-                     (student_id, subject, float(score), exam_name))
+    Returns:
+        dict name -> id
+    """
+    if table not in LOOKUP_TABLES:
+        raise ValueError(f'Unknown lookup table: {table}')
     
-    # Update the student's current marks with latest scores
-    student = get_student_by_id(student_id)
-    if student:
-        student['marks'].update(marks_dict)
-        marks_json = json.dumps(student['marks'])
-        cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (marks_json, student_id))
+    ids = {}
+    for name in dict.fromkeys(names):
+        cursor.execute(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', (name,))
+        cursor.execute(f'SELECT id FROM {table} WHERE name = ?', (name,))
+        ids[name] = cursor.fetchone()[0]
+    return ids
+
+def insert_exams(cursor, rows):
+    """
+    Insert exam rows given as (student_id, subject, score, exam_name) tuples
+    through a writer cursor.
+    """
+    rows = list(rows)
+    subject_ids = lookup_ids(cursor, 'subjects', (row[1] for row in rows))
+    session_ids = lookup_ids(cursor, 'exam_sessions', (row[3] for row in rows))
+    cursor.executemany(
+        'INSERT INTO exam_scores (student_id, subject_id, score, exam_session_id) VALUES (?, ?, ?, ?)',
+        [(student_id, subject_ids[subject], float(score), session_ids[exam_name])
+         for student_id, subject, score, exam_name in rows]
+    )
+
+@invalidates_request_cache
+def add_complete_exam(student_id, exam_name, marks_dict):
+    """Add a complete exam with multiple subjects at once."""
+    def write(cursor):
+        insert_exams(cursor, [(student_id, subject, score, exam_name) for subject, score in marks_dict.items()])
+        
+        # Update the student's current marks with latest scores
+        update_current_marks(cursor, student_id, marks_dict)
     
-    conn.commit()
-    conn.close()
+    run_write(write)
     return True
 
+@request_memo
 def get_student_detailed_stats(student_id):
-    """Get comprehensive statistics for a specific student."""
+    """
+    Get comprehensive statistics for a specific student.
+    
+    Two queries on one connection: the profile, then the student's exams
+    ordered by subject and newest first. The exams are grouped by subject
+    in Python, the per-subject and overall figures computed from those
+    groups, and the rows re-sorted once to group them by exam name.
+    """
     def get_trend(scores):
-        """Calculate simple trend from scores."""
+        """Calculate simple trend from scores (newest first): recent half vs older half."""
         if len(scores) < 2:
             return 'stable'
-        recent = sum(scores[:len(scores)//2]) / (len(scores)//2) if len(scores) >= 2 else scores[0]
-        older = sum(scores[len(scores)//2:]) / (len(scores) - len(scores)//2)
+        half = len(scores) // 2
+        recent = sum(scores[:half]) / half
+        older = sum(scores[half:]) / (len(scores) - half)
         diff = recent - older
         if diff > 5:
             return 'improving'
@@ -364,34 +852,62 @@ def get_student_detailed_stats(student_id):
             return 'declining'
         return 'stable'
     
-    student = get_student_by_id(student_id)
-    if not student:
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f'SELECT {STUDENT_COLUMNS} FROM students WHERE id = ?', (student_id,))
+    student_row = cursor.fetchone()
+    rows = []
+    if student_row:
+        # Newest first within each subject; exams recorded at the same time by insertion order
+        cursor.execute('''
+            SELECT e.id, s.name, e.score, x.name, e.exam_date
+            FROM exam_scores e
+            JOIN subjects s ON s.id = e.subject_id
+            JOIN exam_sessions x ON x.id = e.exam_session_id
+            WHERE e.student_id = ?
+            ORDER BY s.name, e.exam_date DESC, e.id DESC
+        ''', (student_id,))
+        rows = cursor.fetchall()
+    conn.close()
+    
+    if not student_row:
         return None
     
-    exams_by_subject = get_all_exams_for_student(student_id)
-    exams_by_name = get_exams_grouped_by_name(student_id)
+    exams_by_subject = {}
+    subject_scores = {}
+    for exam_id, subject, score, exam_name, exam_date in rows:
+        if subject not in exams_by_subject:
+            exams_by_subject[subject] = []
+            subject_scores[subject] = []
+        exams_by_subject[subject].append({'id': exam_id, 'score': score, 'exam_name': exam_name, 'date': exam_date})
+        subject_scores[subject].append(score)
     
     # Calculate stats per subject
     subject_stats = {}
-    for subject, exams in exams_by_subject.items():
-        scores = [exam['score'] for exam in exams]
-        if scores:
-            subject_stats[subject] = {
-                'average': sum(scores) / len(scores),
-                'highest': max(scores),
-                'lowest': min(scores),
-                'trend': get_trend(scores),
-                'exam_count': len(scores),
-                'latest': scores[0] if scores else 0
-            }
+    for subject, scores in subject_scores.items():
+        subject_stats[subject] = {
+            'average': sum(scores) / len(scores),
+            'highest': max(scores),
+            'lowest': min(scores),
+            'trend': get_trend(scores),
+            'exam_count': len(scores),
+            'latest': scores[0]
+        }
     
-    # Overall stats
-    all_scores = []
-    for subject_exams in exams_by_subject.values():
-        all_scores.extend([exam['score'] for exam in subject_exams])
+    # Exam sessions newest first, then by name; subjects by name within a session
+    by_name_order = sorted(rows, key=lambda row: (row[3], row[1]))
+    by_name_order.sort(key=lambda row: (row[4] is not None, row[4] or ''), reverse=True)
+    exams_by_name = {}
+    for exam_id, subject, score, exam_name, exam_date in by_name_order:
+        if exam_name not in exams_by_name:
+            exams_by_name[exam_name] = {'date': exam_date, 'subjects': []}
+        exams_by_name[exam_name]['subjects'].append({'id': exam_id, 'subject': subject, 'score': score})
     
+    # Overall stats
     overall_stats = {}
-    if all_scores:
+    if rows:
+        all_scores = [row[2] for row in rows]
         overall_stats = {
             'average': sum(all_scores) / len(all_scores),
             'highest': max(all_scores),
@@ -401,43 +917,146 @@ def get_student_detailed_stats(student_id):
         }
     
     return {
-        'student': student,
+        'student': student_from_row(student_row),
         'exams_by_subject': exams_by_subject,
         'exams_by_name': exams_by_name,
         'subject_stats': subject_stats,
         'overall_stats': overall_stats
     }
 
+@invalidates_request_cache
 def add_exam_score(student_id, subject, score, exam_name='Test'):
     """Add a new exam score for a student."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('INSERT INTO exams (student_id, subject, score, exam_name) VALUES (?, ?, ?, ?)',
-                 (student_id, subject, float(score), exam_name))
-    
-    # Update the student's current marks
-    student = get_student_by_id(student_id)
-    if student:
-        student['marks'][subject] = float(score)
-        marks_json = json.dumps(student['marks'])
-        cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (marks_json, student_id))
+    def write(cursor):
+        insert_exams(cursor, [(student_id, subject, score, exam_name)])
+        
+        # Update the student's current marks
+        update_current_marks(cursor, student_id, {subject: float(score)})
     
-    conn.commit()
-    conn.close()
+    run_write(write)
     return True
 
+@invalidates_request_cache
 def delete_exam(exam_id):
     """Delete a specific exam record."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    def write(cursor):
+        cursor.execute('SELECT student_id, exam_name FROM exams WHERE id = ?', (exam_id,))
+        row = cursor.fetchone()
+        cursor.execute('DELETE FROM exam_scores WHERE id = ?', (exam_id,))
+        if row:
+            forget_imports(cursor, row[0], row[1])
     
-    cursor.execute('DELETE FROM exams WHERE id = ?', (exam_id,))
-    
-    conn.commit()
-    conn.close()
+    run_write(write)
     return True
 
+@invalidates_request_cache
+def apply_write_batch(commands):
+    """
+    Apply several parsed write commands inside a single transaction.
+    
+    Each command runs in its own savepoint, so a failing command is rolled
+    back and reported without discarding the others. Students added earlier
+    in the batch are visible to later commands.
+    
+    Args:
+        commands: List of parsed command dicts (ADD_STUDENT, ADD_EXAM,
+                  UPDATE_STUDENT, DELETE_STUDENT)
+    
+    Returns:
+        List of result dicts ('success'/'message' or 'error'), one per command
+    """
+    profile_fields = ['grade', 'section', 'age', 'gender', 'email', 'phone', 'address']
+    
+    results = []
+    events = []
+    
+    def write(cursor):
+        def find_student(name):
+            cursor.execute('SELECT id, name, marks FROM students WHERE LOWER(name) = LOWER(?)', (name,))
+            return cursor.fetchone()
+        
+        def insert_exam(row, exam_name, marks):
+            insert_exams(cursor, [(row[0], subject, score, exam_name) for subject, score in marks.items()])
+            current_marks = json.loads(row[2])
+            current_marks.update(marks)
+            cursor.execute('UPDATE students SET marks = ? WHERE id = ?', (json.dumps(current_marks), row[0]))
+        
+        for parsed in commands:
+            intent = parsed.get('intent')
+            name = parsed.get('name')
+            cursor.execute('SAVEPOINT batch_command')
+            command_events = []
+            
+            try:
+                if intent == 'ADD_STUDENT':
+                    cursor.execute('''
+                        INSERT INTO students (name, marks, grade, section, age, gender, email, phone, address)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (name, json.dumps({}), *[parsed.get(field, '') for field in profile_fields]))
+                    command_events = [('add', cursor.lastrowid, name)]
+                    result = {'success': True, 'message': f'Added student {name}'}
+                
+                elif intent == 'ADD_EXAM':
+                    row = find_student(name)
+                    if not row:
+                        result = {'error': f'Student {name} not found. Please add the student first.'}
+                    else:
+                        exam_name = parsed.get('exam_name') or 'General'
+                        insert_exam(row, exam_name, parsed['marks'])
+                        result = {'success': True, 'message': f'Added {exam_name} for {row[1]} with marks: {parsed["marks"]}'}
+                
+                elif intent == 'UPDATE_STUDENT':
+                    row = find_student(name)
+                    updates = {field: parsed[field] for field in profile_fields if parsed.get(field)}
+                    if not row:
+                        result = {'error': f'Student {name} not found'}
+                    elif updates:
+                        assignments = ', '.join(f'{field} = ?' for field in updates)
+                        cursor.execute(f'UPDATE students SET {assignments} WHERE id = ?', (*updates.values(), row[0]))
+                        result = {'success': True, 'message': f"Updated {row[1]}'s profile: {updates}"}
+                    elif parsed.get('marks'):
+                        insert_exam(row, 'Voice Update', parsed['marks'])
+                        result = {'success': True, 'message': f'Added new exam for {row[1]} with marks: {parsed["marks"]}'}
+                    else:
+                        result = {'error': 'No update information provided'}
+                
+                elif intent == 'DELETE_STUDENT':
+                    row = find_student(name)
+                    if not row:
+                        result = {'error': f'Student {name} not found'}
+                    else:
+                        cursor.execute('DELETE FROM exam_scores WHERE student_id = ?', (row[0],))
+                        cursor.execute('DELETE FROM students WHERE id = ?', (row[0],))
+                        forget_imports(cursor, row[0])
+                        command_events = [('delete', row[0], None)]
+                        result = {'success': True, 'message': f'Deleted student {row[1]}'}
+                
+                else:
+                    result = {'error': f'{intent} is not a write command'}
+                
+                cursor.execute('RELEASE batch_command')
+                events.extend(command_events)
+            except sqlite3.IntegrityError:
+                cursor.execute('ROLLBACK TO batch_command')
+                cursor.execute('RELEASE batch_command')
+                result = {'error': f'Student {name} already exists'}
+            except (sqlite3.Error, ValueError, TypeError) as e:
+                cursor.execute('ROLLBACK TO batch_command')
+                cursor.execute('RELEASE batch_command')
+                result = {'error': f'Failed to apply {intent}: {str(e)}'}
+            
+            results.append(result)
+    
+    run_write(write)
+    
+    from models.archive import delete_archived_exams
+    delete_archived_exams([student_id for event, student_id, _ in events if event == 'delete'])
+    for event in events:
+        notify_student_change(*event)
+    
+    return results
+
+@request_memo
 def get_all_subjects():
     """Get list of all unique subjects."""
     students = get_all_students()
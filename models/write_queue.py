@@ -0,0 +1,169 @@
+"""
+Single-writer queue for the database.
+One background thread owns the only write connection. Write operations are
+queued as functions of a cursor and run on that thread; whatever is queued
+when the writer wakes up is group-committed in a single transaction, each
+operation inside its own savepoint so a failing one is rolled back without
+affecting the others. Callers get a Future that resolves after the commit.
+
+Since only one connection ever writes, concurrent writers wait in the queue
+instead of retrying on SQLITE_BUSY, and with WAL journaling readers on
+their own connections are never blocked.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+# Most operations committed together in one transaction
+MAX_GROUP_SIZE = 100
+
+# Seconds between checks that the writer thread is still alive while waiting for a write
+LIVENESS_CHECK_SECONDS = 1.0
+
+class WriteQueue:
+    """
+    Queue of write operations served by one writer thread.
+
+    Usage:
+        writes = WriteQueue(connect)
+        future = writes.submit(path, lambda cursor: cursor.execute(...).lastrowid)
+        writes.wait(future)  # raises the operation's exception if it failed
+    """
+
+    def __init__(self, connect, max_group_size=MAX_GROUP_SIZE):
+        self.connect = connect
+        self.max_group_size = max_group_size
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.conn = None
+        self.path = None
+        self.cursor = None  # set while a group is being written
+        self.held = None    # first operation of the next group (it targets another database)
+        self.stats = {'writes': 0, 'commits': 0}
+
+    def submit(self, path, func, *args, **kwargs):
+        """
+        Queue func(cursor, *args, **kwargs) against the database at path.
+
+        Returns:
+            Future with func's return value, set once the transaction committed
+        """
+        future = Future()
+        if threading.current_thread() is self.thread:
+            # An operation that writes more: run it inline, inside the current transaction
+            self.run_operation(self.cursor, func, args, kwargs, future)
+            return future
+
+        self.queue.put((path, func, args, kwargs, future))
+        self.ensure_thread()
+        return future
+
+    def ensure_thread(self):
+        """Start the writer thread if it is not running (or died)."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='db-writer', daemon=True)
+                self.thread.start()
+
+    def wait(self, future, timeout=None):
+        """
+        Wait for a submitted operation and return its result.
+
+        The writer thread is checked while waiting and restarted if it died,
+        so queued writes never hang on a dead thread.
+
+        Raises:
+            The operation's exception, or TimeoutError after timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = LIVENESS_CHECK_SECONDS if deadline is None else min(LIVENESS_CHECK_SECONDS, deadline - time.monotonic())
+            try:
+                return future.result(timeout=max(remaining, 0))
+            except FutureTimeout:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f'Write not committed within {timeout} seconds') from None
+                self.ensure_thread()
+
+    def run_operation(self, cursor, func, args, kwargs, future):
+        cursor.execute('SAVEPOINT write_operation')
+        try:
+            result = func(cursor, *args, **kwargs)
+        except BaseException as e:
+            cursor.execute('ROLLBACK TO write_operation')
+            cursor.execute('RELEASE write_operation')
+            future.set_exception(e)
+            return False
+        cursor.execute('RELEASE write_operation')
+        future.set_result(result)
+        return True
+
+    def next_group(self):
+        """Block for the next operation, then take whatever else is queued for the same database."""
+        group = [self.held or self.queue.get()]
+        self.held = None
+        while len(group) < self.max_group_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] != group[0][0]:
+                self.held = item
+                break
+            group.append(item)
+        return group
+
+    def run(self):
+        while True:
+            group = self.next_group()
+            try:
+                self.write_group(group)
+            except BaseException as e:
+                # Nothing may stop the writer: fail the group and start over on a new connection
+                for *_, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                self.reset_connection()
+
+    def reset_connection(self):
+        conn, self.conn, self.path = self.conn, None, None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def write_group(self, group):
+        """Run a group of operations in one transaction and resolve their futures after the commit."""
+        path = group[0][0]
+        if self.conn is None or self.path != path:
+            self.reset_connection()
+            self.conn = self.connect(path)
+            self.path = path
+
+        # Results are only handed out after the commit, so every caller sees durable data
+        pending = [(item, Future()) for item in group]
+        self.cursor = self.conn.cursor()
+        try:
+            self.cursor.execute('BEGIN IMMEDIATE')
+            for (_, func, args, kwargs, _), result in pending:
+                self.run_operation(self.cursor, func, args, kwargs, result)
+            self.cursor.execute('COMMIT')
+        except BaseException:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            raise
+        finally:
+            self.cursor = None
+
+        self.stats['writes'] += len(group)
+        self.stats['commits'] += 1
+        for (*_, future), result in pending:
+            if result.exception() is not None:
+                future.set_exception(result.exception())
+            else:
+                future.set_result(result.result())
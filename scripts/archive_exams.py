@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Archive Script for ScoreSense
+Moves exams of past academic years out of the main database into one
+SQLite file per academic year (see models/archive.py).
+
+Usage:
+    python scripts/archive_exams.py --year 2023
+    python scripts/archive_exams.py --before 2024-06-01
+    python scripts/archive_exams.py --list
+"""
+
+import sys
+import os
+import time
+import sqlite3
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+from models.archive import archive_exams, list_archives, ACADEMIC_YEAR_START_MONTH
+
+
+def print_archives():
+    archives = list_archives()
+    if not archives:
+        print("📭 No archived academic years")
+        return
+    print(f"📚 Archived academic years (starting in month {ACADEMIC_YEAR_START_MONTH}):")
+    for year, path in archives:
+        conn = sqlite3.connect(path)
+        count = conn.execute('SELECT COUNT(*) FROM exam_scores').fetchone()[0]
+        conn.close()
+        print(f"  {year}-{(year + 1) % 100:02d}  {count:>12,} exams  {os.path.getsize(path) / 1e6:8.1f} MB  {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive exams of past academic years')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--year', type=int, help='Archive this (finished) academic year, named by its first calendar year')
+    action.add_argument('--before', help='Archive every exam dated before this date (YYYY-MM-DD)')
+    action.add_argument('--list', action='store_true', help='Show the archive files')
+    parser.add_argument('--db', help='Database file (defaults to the app database)')
+    args = parser.parse_args()
+
+    if args.db:
+        student_model.DB_PATH = args.db
+    student_model.init_db()
+
+    if args.list:
+        print_archives()
+        return
+
+    start = time.perf_counter()
+    try:
+        moved = archive_exams(before=args.before, academic_year=args.year)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    if not moved:
+        print("📭 No exams to archive")
+        return
+    for year, count in moved.items():
+        print(f"📦 {year}-{(year + 1) % 100:02d}: moved {count:,} exams")
+    print(f"✅ Archived {sum(moved.values()):,} exams in {elapsed:.2f}s")
+    print()
+    print_archives()
+
+
+if __name__ == '__main__':
+    main()
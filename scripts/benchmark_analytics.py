@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Analytics Backend Benchmark for ScoreSense
+Runs the core/stats.py functions once per analytics backend - the in-process
+exam snapshot, DuckDB reading the SQLite file, DuckDB reading a Parquet
+mirror - and reports the cold time (first query, including loading the
+snapshot or writing the mirror), the warm median per function and whether
+every backend returned the same results as the snapshot.
+
+Usage:
+    python scripts/benchmark_analytics.py [--scales small,medium] [--repeat 5] [--output analytics.json]
+    python scripts/benchmark_analytics.py --database db/students.db --backends snapshot,duckdb-parquet
+
+The DuckDB backends need the optional duckdb package (pip install duckdb)
+and are skipped without it.
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+import models.exam_snapshot as exam_snapshot
+import core.stats as stats_module
+import core.analytics_duckdb as analytics_duckdb
+from scripts.benchmark_suite import SCALES, use_database, dataset_path, time_benchmark, git_commit
+
+# Backend name -> (SCORESENSE_ANALYTICS_BACKEND, SCORESENSE_DUCKDB_SOURCE)
+BACKENDS = {
+    'snapshot': ('snapshot', None),
+    'duckdb-sqlite': ('duckdb', 'sqlite'),
+    'duckdb-parquet': ('duckdb', 'parquet'),
+}
+
+
+def build_queries():
+    """Get the stats functions as (name, callable) pairs; the first subject is used where one is needed."""
+    student = student_model.get_student_by_id(1)
+    name = student['name'] if student else ''
+    subjects = student_model.get_all_subjects()
+    subject = subjects[0] if subjects else ''
+
+    return [
+        ('get_class_average', stats_module.get_class_average),
+        ('get_subject_averages', stats_module.get_subject_averages),
+        ('get_class_topper', stats_module.get_class_topper),
+        ('get_class_topper(subject)', lambda: stats_module.get_class_topper(subject)),
+        ('get_lowest_scorer', stats_module.get_lowest_scorer),
+        ('get_lowest_scorer(subject)', lambda: stats_module.get_lowest_scorer(subject)),
+        ('get_ranked_averages', stats_module.get_ranked_averages),
+        ('get_student_rank', lambda: stats_module.get_student_rank(name)),
+        ('get_score_distribution', stats_module.get_score_distribution),
+        ('compare_subject_scores', lambda: stats_module.compare_subject_scores(subject)),
+        ('get_all_stats', stats_module.get_all_stats),
+    ]
+
+
+def normalized(value):
+    """
+    Round floats to 6 places and put students with equal averages in name
+    order, so results differing only in the last bit of an average compare equal.
+    """
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [normalized(item) for item in value]
+        if items and all(isinstance(item, dict) and 'name' in item for item in items):
+            items.sort(key=lambda item: (-item.get('average', item.get('score', 0)), item['name']))
+        return items
+    return value
+
+
+def use_backend(backend, mirror_dir):
+    """Switch core.stats to a backend and drop everything cached, so the next query starts cold."""
+    stats_module.ANALYTICS_BACKEND, source = BACKENDS[backend]
+    if source:
+        analytics_duckdb.DUCKDB_SOURCE = source
+    analytics_duckdb.PARQUET_MIRROR_DIR = mirror_dir
+    stats_module.close_analytics()
+    exam_snapshot.current_snapshot = None
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def benchmark_database(path, backends, args, workdir):
+    use_database(path)
+    # Cached datasets may predate the current schema
+    student_model.init_db()
+    queries = build_queries()
+
+    results = {}
+    reference = expected = None
+    for backend in backends:
+        mirror_dir = os.path.join(workdir, 'mirror')
+        shutil.rmtree(mirror_dir, ignore_errors=True)
+        use_backend(backend, mirror_dir)
+
+        start = time.perf_counter()
+        try:
+            stats_module.get_class_average()
+        except Exception as e:
+            print(f"  ❌ {backend}: {type(e).__name__}: {e}")
+            continue
+        cold_ms = (time.perf_counter() - start) * 1000
+        # core.stats falls back to the snapshot backend when one fails to start (logged above)
+        if stats_module.get_analytics().name != stats_module.ANALYTICS_BACKEND:
+            print(f"  ⚠️  {backend}: skipped (backend failed to start)")
+            continue
+
+        outputs = {name: normalized(func()) for name, func in queries}
+        if expected is None:
+            reference, expected = backend, outputs
+        mismatches = [name for name in outputs if outputs[name] != expected[name]]
+
+        timings = {name: time_benchmark(func, args.repeat, args.max_seconds) for name, func in queries}
+        total_ms = sum(timing['median_ms'] for timing in timings.values())
+        results[backend] = {
+            'cold_ms': round(cold_ms, 3),
+            'total_median_ms': round(total_ms, 3),
+            'mismatches': mismatches,
+            'timings': timings
+        }
+        if backend == 'duckdb-parquet' and os.path.isdir(mirror_dir):
+            results[backend]['mirror_bytes'] = directory_size(mirror_dir)
+
+        print(f"\n  🔧 {backend}: cold {cold_ms:,.1f} ms, warm total {total_ms:,.2f} ms")
+        for name, timing in timings.items():
+            print(f"    {name:<36} {timing['median_ms']:>10.2f} ms  (x{timing['runs']})")
+        if 'mirror_bytes' in results[backend]:
+            print(f"    Parquet mirror: {results[backend]['mirror_bytes'] / 1e6:,.1f} MB")
+        if mismatches:
+            print(f"    ❌ Results differ from {reference}: {', '.join(mismatches)}")
+        elif backend != reference:
+            print(f"    ✅ Same results as {reference}")
+
+    stats_module.close_analytics()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the analytics backends of core/stats.py')
+    parser.add_argument('--scales', default='small,medium', help=f"Comma separated: {', '.join(SCALES)}")
+    parser.add_argument('--database', help='Benchmark this database file instead of generated datasets')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help=f"Comma separated: {', '.join(BACKENDS)}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='Stop repeating a query after this long')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help='Keep generated datasets here between runs')
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        print(f"❌ Unknown backend(s): {', '.join(unknown)} (choose from {', '.join(BACKENDS)})")
+        sys.exit(2)
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    if not args.database and any(scale not in SCALES for scale in scales):
+        print(f"❌ Unknown scale(s) (choose from {', '.join(SCALES)})")
+        sys.exit(2)
+
+    print("⏱️  ScoreSense Analytics Backend Benchmark")
+    print("=" * 60)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'repeat': args.repeat
+        },
+        'results': {}
+    }
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='scoresense_bench_data_')
+    os.makedirs(data_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='scoresense_analytics_')
+    try:
+        if args.database:
+            datasets = [(os.path.basename(args.database), args.database)]
+        else:
+            datasets = [(scale, dataset_path(data_dir, scale, args.seed)) for scale in scales]
+        for label, path in datasets:
+            print(f"\n📦 {label}")
+            results['results'][label] = benchmark_database(path, backends, args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Excel Parse Benchmark for ScoreSense
+Compares the old row-by-row parser with the vectorized parse_excel_frame
+on a large synthetic workbook.
+
+Usage:
+    python scripts/benchmark_excel_parse.py [--rows 100000] [--subjects 24] [--xlsx path]
+
+With --xlsx the synthetic data is written to (and read back from) a real
+workbook, so pd.read_excel time is included. This takes a while at 100k rows.
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from core.excel_import import parse_excel_frame
+
+
+def parse_rowwise(df):
+    """The original iterrows parser, kept as the benchmark reference."""
+    name_col = df.columns[0]
+    exam_col = df.columns[1]
+    subject_cols = df.columns[2:]
+
+    records = []
+    for _, row in df.iterrows():
+        student_name = str(row[name_col]).strip()
+        if not student_name or student_name.lower() in ['nan', 'none', '']:
+            continue
+
+        exam_name = str(row[exam_col]).strip()
+        if not exam_name or exam_name.lower() in ['nan', 'none', '']:
+            exam_name = 'Imported Exam'
+
+        scores = {}
+        for col in subject_cols:
+            try:
+                score = float(row[col])
+                if 0 <= score <= 100:
+                    scores[str(col).strip()] = score
+            except (TypeError, ValueError):
+                continue
+
+        if scores:
+            records.append({
+                'student_name': student_name,
+                'exam_name': exam_name,
+                'scores': scores
+            })
+
+    return records
+
+
+def build_synthetic_frame(rows, subjects, seed=42):
+    """Build a workbook-shaped DataFrame with some blank, invalid and out-of-range cells."""
+    rng = np.random.default_rng(seed)
+
+    data = {
+        'Student Name': [f'Student {i:06d}' for i in rng.integers(0, rows // 4 + 1, rows)],
+        'Exam': rng.choice(['Midterm', 'Final', 'Unit Test 1', 'Unit Test 2', ''], rows),
+    }
+    for s in range(subjects):
+        scores = np.clip(rng.normal(70, 15, rows), -5, 105).round(1).astype(object)
+        scores[rng.random(rows) < 0.10] = None      # blank cells
+        scores[rng.random(rows) < 0.01] = 'absent'  # text in a score column
+        data[f'Subject {s + 1}'] = scores
+
+    return pd.DataFrame(data)
+
+
+def time_call(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.2f}s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Excel parsing')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--subjects', type=int, default=24)
+    parser.add_argument('--xlsx', help='Write and read a real workbook at this path')
+    parser.add_argument('--skip-rowwise', action='store_true', help='Only time the vectorized parser')
+    args = parser.parse_args()
+
+    print("📊 ScoreSense Excel Parse Benchmark")
+    print("=" * 50)
+    print(f"Rows: {args.rows:,}  Subjects: {args.subjects}")
+    print()
+
+    df = build_synthetic_frame(args.rows, args.subjects)
+
+    if args.xlsx:
+        _, _ = time_call('write workbook', df.to_excel, args.xlsx, False)
+        df, _ = time_call('pd.read_excel', pd.read_excel, args.xlsx)
+
+    (records, rejected), vectorized = time_call('vectorized parse', parse_excel_frame, df)
+
+    if not args.skip_rowwise:
+        legacy_records, rowwise = time_call('row-wise parse (iterrows)', parse_rowwise, df)
+        print()
+        print(f"Same records: {'✅' if legacy_records == records else '❌'}")
+        print(f"Speedup: {rowwise / vectorized:.1f}x")
+
+    print()
+    print(f"Records: {len(records):,}")
+    print(f"Rejected: {rejected['non_numeric_cells']:,} non-numeric, "
+          f"{rejected['out_of_range_cells']:,} out of range, "
+          f"{rejected['rows_without_name']:,} rows without name")
+
+
+if __name__ == '__main__':
+    main()
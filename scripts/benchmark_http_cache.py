@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+HTTP Caching Benchmark for ScoreSense
+Replays a request log against the app twice - once as a plain client, once as
+a client that sends Accept-Encoding and revalidates with If-None-Match - and
+reports the bytes sent and CPU time spent for each.
+
+Usage:
+    python scripts/benchmark_http_cache.py [--students 300] [--requests 2000] [--write-every 50]
+    python scripts/benchmark_http_cache.py --log requests.log
+
+A log has one request per line: a GET path such as "/api/stats" (an optional
+leading "GET " is ignored), or "WRITE" to record an exam score between polls.
+Both passes run on identical copies of a temporary database.
+"""
+
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'English', 'History']
+EXAMS = ['Midterm', 'Final', 'Quiz 1', 'Quiz 2']
+
+
+def use_database(path):
+    """Point the app's models at a database file."""
+    student_model.DB_PATH = path
+
+
+def seed_database(students, seed=42):
+    """Fill the current database with synthetic students and exams."""
+    rng = random.Random(seed)
+    conn = student_model.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    cursor.executemany('''
+        INSERT INTO students (name, marks, grade, section, gender)
+        VALUES (?, '{}', ?, ?, ?)
+    ''', [(f'Student {i:05d}', rng.choice(['9', '10', '11', '12']), rng.choice('ABC'), rng.choice(['Male', 'Female']))
+          for i in range(students)])
+    cursor.executemany('''
+        INSERT INTO exams (student_id, exam_name, subject, score)
+        VALUES (?, ?, ?, ?)
+    ''', [(student_id, exam, subject, rng.randint(35, 100))
+          for student_id in range(1, students + 1) for exam in EXAMS for subject in SUBJECTS])
+    cursor.execute('COMMIT')
+    conn.close()
+
+
+def synthetic_log(requests, write_every, students, seed=7):
+    """A dashboard polling the JSON APIs, with an occasional write."""
+    rng = random.Random(seed)
+    polls = ['/api/stats', '/api/students', '/api/students?limit=200', '/api/students?fields=name,average']
+    log = []
+    for i in range(1, requests + 1):
+        if write_every and i % write_every == 0:
+            log.append('WRITE')
+        elif rng.random() < 0.3:
+            log.append(f'/student/{rng.randint(1, min(students, 20))}/exams')
+        else:
+            log.append(rng.choice(polls))
+    return log
+
+
+def read_log(path):
+    entries = []
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.upper().startswith('GET '):
+                line = line[4:].strip()
+            entries.append(line)
+    return entries
+
+
+def replay(client, log, students, conditional):
+    """
+    Replay a log through the Flask test client.
+
+    Returns:
+        dict with request, response, byte and CPU counts
+    """
+    rng = random.Random(11)
+    etags = {}
+    result = {'requests': 0, 'not_modified': 0, 'bytes': 0}
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for entry in log:
+        if entry == 'WRITE':
+            student_model.add_exam_score(rng.randint(1, students), rng.choice(SUBJECTS), rng.randint(35, 100), 'Replay')
+            continue
+
+        headers = {}
+        if conditional:
+            headers['Accept-Encoding'] = 'br, gzip'
+            if entry in etags:
+                headers['If-None-Match'] = etags[entry]
+
+        response = client.get(entry, headers=headers)
+        result['requests'] += 1
+        result['bytes'] += len(response.data)
+        if response.status_code == 304:
+            result['not_modified'] += 1
+        elif response.headers.get('ETag'):
+            etags[entry] = response.headers['ETag']
+
+    result['cpu_seconds'] = time.process_time() - cpu_start
+    result['wall_seconds'] = time.perf_counter() - wall_start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ETag revalidation and compression')
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--write-every', type=int, default=50, help='Insert a write every N log entries (0: never)')
+    parser.add_argument('--log', help='Replay this request log instead of a synthetic one')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='scoresense_http_bench_')
+    try:
+        baseline_db = os.path.join(workdir, 'baseline.db')
+        cached_db = os.path.join(workdir, 'cached.db')
+
+        use_database(baseline_db)
+        student_model.init_db()
+        seed_database(args.students)
+        shutil.copyfile(baseline_db, cached_db)
+
+        # Importing the app runs init_db on the database configured above
+        from app import app
+        client = app.test_client()
+
+        log = read_log(args.log) if args.log else synthetic_log(args.requests, args.write_every, args.students)
+
+        print("🌐 ScoreSense HTTP Caching Benchmark")
+        print("=" * 50)
+        print(f"Students: {args.students:,}  Log entries: {len(log):,}  Writes: {log.count('WRITE'):,}")
+        print()
+
+        use_database(baseline_db)
+        baseline = replay(client, log, args.students, conditional=False)
+        use_database(cached_db)
+        cached = replay(client, log, args.students, conditional=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"  {'':<24} {'plain':>14} {'etag+compress':>14}")
+    print(f"  {'bytes sent':<24} {baseline['bytes']:>14,} {cached['bytes']:>14,}")
+    print(f"  {'304 responses':<24} {baseline['not_modified']:>14,} {cached['not_modified']:>14,}")
+    print(f"  {'CPU seconds':<24} {baseline['cpu_seconds']:>14.2f} {cached['cpu_seconds']:>14.2f}")
+    print(f"  {'wall seconds':<24} {baseline['wall_seconds']:>14.2f} {cached['wall_seconds']:>14.2f}")
+    print()
+    if baseline['bytes'] and baseline['cpu_seconds']:
+        print(f"Bandwidth saved: {100 * (1 - cached['bytes'] / baseline['bytes']):.1f}%")
+        print(f"CPU saved: {100 * (1 - cached['cpu_seconds'] / baseline['cpu_seconds']):.1f}%")
+    print("(CPU time includes the in-process test client, so real server savings are somewhat higher)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for ScoreSense
+Times the hot paths - model reads, every core/stats.py function, predictions,
+chart generation, Excel import and the main Flask routes - against generated
+datasets at several scales, and saves the results as JSON. A second command
+compares two result files and flags regressions.
+
+Usage:
+    python scripts/benchmark_suite.py run [--scales small,medium] [--repeat 5] [--output bench.json]
+    python scripts/benchmark_suite.py compare baseline.json bench.json [--threshold 0.2]
+
+Datasets are cached in --data-dir (default: a temp directory) so repeated
+runs skip generation.
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import platform
+import statistics
+import subprocess
+import tempfile
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+from scripts.generate_dataset import generate_dataset, SUBJECTS
+from scripts.benchmark_excel_parse import build_synthetic_frame
+
+# Scale name -> number of students (6 exam sessions x 6 subjects each)
+SCALES = {
+    'small': 1000,
+    'medium': 10000,
+    'large': 100000,
+}
+
+DATASET_SESSIONS = 6
+DATASET_SUBJECTS = 6
+
+# Rows in the workbook used for the import benchmark
+IMPORT_ROWS = 2000
+
+ROUTES = ['/', '/students', '/stats', '/api/stats', '/api/students', '/student/1/stats',
+          '/student/1/exams', '/graph/subject_average', '/graph/distribution']
+
+
+def use_database(path):
+    """Point the app's models at a database file."""
+    student_model.DB_PATH = path
+
+
+def dataset_path(data_dir, scale, seed):
+    path = os.path.join(data_dir, f'bench_{scale}_{SCALES[scale]}_{seed}.db')
+    if not os.path.exists(path):
+        print(f"  generating {scale} dataset ({SCALES[scale]:,} students)...")
+        generate_dataset(path, SCALES[scale], DATASET_SESSIONS, DATASET_SUBJECTS, seed=seed)
+    return path
+
+
+def build_benchmarks(client, workdir):
+    """
+    Get the benchmarks as (group, name, callable) tuples.
+
+    Student 1 and the first subject are used wherever an argument is needed.
+    """
+    from core import stats, predict, graphs
+    from core.excel_import import import_file
+
+    student = student_model.get_student_by_id(1)
+    name = student['name']
+    subject = SUBJECTS[0]
+
+    workbook = os.path.join(workdir, 'import.xlsx')
+    build_synthetic_frame(IMPORT_ROWS, DATASET_SUBJECTS).to_excel(workbook, index=False)
+
+    def import_workbook():
+        # Import into a scratch copy so the dataset itself never changes
+        scratch = os.path.join(workdir, 'import_scratch.db')
+        shutil.copyfile(os.path.join(workdir, 'empty.db'), scratch)
+        previous = student_model.DB_PATH
+        use_database(scratch)
+        try:
+            import_file(workbook, 'import.xlsx', use_ledger=False)
+        finally:
+            use_database(previous)
+
+    benchmarks = [
+        ('model', 'get_all_students', student_model.get_all_students),
+        ('model', 'get_student_detailed_stats', lambda: student_model.get_student_detailed_stats(1)),
+        ('model', 'get_all_subjects', student_model.get_all_subjects),
+        ('model', 'get_students_page', lambda: student_model.get_students_page(limit=50)),
+        ('stats', 'get_class_average', stats.get_class_average),
+        ('stats', 'get_subject_averages', stats.get_subject_averages),
+        ('stats', 'get_class_topper', stats.get_class_topper),
+        ('stats', 'get_class_topper(subject)', lambda: stats.get_class_topper(subject)),
+        ('stats', 'get_lowest_scorer', stats.get_lowest_scorer),
+        ('stats', 'get_subject_difficulty', stats.get_subject_difficulty),
+        ('stats', 'get_ranked_averages', stats.get_ranked_averages),
+        ('stats', 'get_student_rank', lambda: stats.get_student_rank(name)),
+        ('stats', 'get_score_distribution', stats.get_score_distribution),
+        ('stats', 'get_all_stats', stats.get_all_stats),
+        ('stats', 'compare_subject_scores', lambda: stats.compare_subject_scores(subject)),
+        ('predict', 'predict_score', lambda: predict.predict_score(name, subject)),
+        ('predict', 'batch_predict', lambda: predict.batch_predict(subject)),
+        ('graphs', 'generate_student_bar', lambda: graphs.generate_student_bar(name)),
+        ('graphs', 'generate_subject_average_bar', graphs.generate_subject_average_bar),
+        ('graphs', 'generate_distribution_histogram', graphs.generate_distribution_histogram),
+        ('graphs', 'generate_comparison_chart', lambda: graphs.generate_comparison_chart(subject)),
+        ('graphs', 'generate_student_comparison', graphs.generate_student_comparison),
+        ('graphs', 'generate_trend_chart', lambda: graphs.generate_trend_chart(name, subject)),
+        ('graphs', 'generate_student_pie', lambda: graphs.generate_student_pie(name)),
+        ('graphs', 'generate_student_line', lambda: graphs.generate_student_line(name)),
+        ('graphs', 'generate_student_radar', lambda: graphs.generate_student_radar(name)),
+        ('import', f'import_file ({IMPORT_ROWS} rows)', import_workbook),
+    ]
+    for route in ROUTES:
+        benchmarks.append(('routes', f'GET {route}', lambda route=route: client.get(route).data))
+    return benchmarks
+
+
+def time_benchmark(func, repeat, max_seconds):
+    """Run func once to warm up, then up to repeat times (stopping early after max_seconds)."""
+    func()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if time.perf_counter() - started > max_seconds:
+            break
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'runs': len(timings)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        print(f"❌ Unknown scale(s): {', '.join(unknown)} (choose from {', '.join(SCALES)})")
+        sys.exit(2)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='scoresense_bench_data_')
+    os.makedirs(data_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='scoresense_bench_')
+
+    print("⏱️  ScoreSense Benchmark Suite")
+    print("=" * 60)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': {}
+    }
+
+    try:
+        empty = os.path.join(workdir, 'empty.db')
+        use_database(empty)
+        student_model.init_db()
+
+        # Importing the app runs init_db on the database configured above
+        from app import app
+        client = app.test_client()
+
+        for scale in scales:
+            path = dataset_path(data_dir, scale, args.seed)
+            use_database(path)
+            # Cached datasets may predate the current schema
+            student_model.init_db()
+            print(f"\n📦 {scale} ({SCALES[scale]:,} students)")
+
+            scale_results = {}
+            for group, name, func in build_benchmarks(client, workdir):
+                if args.filter and args.filter not in f'{group}.{name}':
+                    continue
+                timing = time_benchmark(func, args.repeat, args.max_seconds)
+                scale_results[f'{group}.{name}'] = timing
+                print(f"  {group + '.' + name:<52} {timing['median_ms']:>10.2f} ms  (x{timing['runs']})")
+            results['results'][scale] = scale_results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)['results']
+    with open(args.current) as handle:
+        current = json.load(handle)['results']
+
+    print("📊 Benchmark Comparison")
+    print("=" * 60)
+    print(f"Regression threshold: +{args.threshold:.0%} median (and at least {args.min_ms} ms)")
+
+    regressions = 0
+    for scale, benchmarks in current.items():
+        if scale not in baseline:
+            continue
+        print(f"\n📦 {scale}")
+        for name, timing in benchmarks.items():
+            before = baseline[scale].get(name)
+            if not before:
+                print(f"  {name:<52} {'new':>10}")
+                continue
+            old, new = before['median_ms'], timing['median_ms']
+            change = (new - old) / old if old else 0.0
+            regressed = change > args.threshold and new - old >= args.min_ms
+            improved = change < -args.threshold
+            marker = '❌' if regressed else ('🚀' if improved else '  ')
+            print(f"{marker}{name:<52} {old:>10.2f} -> {new:>10.2f} ms  {change:+.0%}")
+            regressions += regressed
+
+    print()
+    if regressions:
+        print(f"❌ {regressions} regression(s)")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ScoreSense benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--scales', default='small,medium', help=f"Comma separated: {', '.join(SCALES)}")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--max-seconds', type=float, default=10.0, help='Stop repeating a benchmark after this long')
+    run_parser.add_argument('--filter', help='Only run benchmarks whose name contains this')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--data-dir', help='Keep generated datasets here between runs')
+    run_parser.add_argument('--output', default='bench.json')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative slowdown')
+    compare_parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore slowdowns smaller than this')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
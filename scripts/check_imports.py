@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Import Check for ScoreSense
+Imports small files into a temporary database and fails if the statistics an
+import returns (students and exams added, rows changed, ...) disagree with
+what it actually wrote.
+
+Usage:
+    python scripts/check_imports.py
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+from core.excel_import import import_file
+
+
+def write_csv(workdir, filename, rows):
+    path = os.path.join(workdir, filename)
+    with open(path, 'w') as f:
+        f.write('Student Name,Exam,math,science\n')
+        for row in rows:
+            f.write(','.join(str(value) for value in row) + '\n')
+    return path
+
+
+def write_xlsx(workdir, filename, rows):
+    path = os.path.join(workdir, filename)
+    pd.DataFrame(rows, columns=['Student Name', 'Exam', 'math']).to_excel(path, index=False)
+    return path
+
+
+def math_score(name):
+    conn = student_model.get_read_connection()
+    try:
+        row = conn.execute('''
+            SELECT e.score FROM exams e JOIN students s ON s.id = e.student_id
+            WHERE s.name = ? AND e.subject = 'math'
+        ''', (name,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def count_exams():
+    conn = student_model.get_read_connection()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM exam_scores').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def expect(stats, **expected):
+    """Get the differences between an import's statistics and the expected values."""
+    if 'error' in stats:
+        return [stats['error']]
+    return [f'{key} is {stats.get(key)}, expected {value}' for key, value in expected.items()
+            if stats.get(key) != value]
+
+
+def csv_counts(workdir, streaming):
+    before = count_exams()
+    path = write_csv(workdir, f'counts_{streaming}.csv', [('Ann', 'Midterm', 50, 60), ('Bob', 'Midterm', 70, 80)])
+    stats = import_file(path, os.path.basename(path), streaming=streaming)
+    problems = expect(stats, students_added=2, exams_added=4)
+    if count_exams() - before != 4:
+        problems.append(f'{count_exams() - before} exams written, expected 4')
+    return problems
+
+
+def csv_counts_in_one_transaction(workdir):
+    return csv_counts(workdir, streaming=False)
+
+
+def csv_counts_streaming(workdir):
+    return csv_counts(workdir, streaming=True)
+
+
+def reimport_original(workdir):
+    """Import f, then an edited g, then f again to undo the edit."""
+    original = write_xlsx(workdir, 'f.xlsx', [('Ann', 'Midterm', 50)])
+    edited = write_xlsx(workdir, 'g.xlsx', [('Ann', 'Midterm', 99)])
+    problems = []
+    for path, changed, score in ((original, 0, 50), (edited, 1, 99), (original, 1, 50)):
+        stats = import_file(path, os.path.basename(path))
+        problems += [f'{os.path.basename(path)}: {problem}' for problem in expect(stats, rows_changed=changed)]
+        if math_score('Ann') != score:
+            problems.append(f'after {os.path.basename(path)} the score is {math_score("Ann")}, expected {score}')
+    return problems
+
+
+# Each scenario runs on a fresh database
+SCENARIOS = [
+    ('csv counts, one transaction', csv_counts_in_one_transaction),
+    ('csv counts, streaming', csv_counts_streaming),
+    ('re-import after an edit', reimport_original),
+]
+
+
+def main():
+    print("🔍 ScoreSense Import Check")
+    print("=" * 50)
+    failures = 0
+    for name, scenario in SCENARIOS:
+        workdir = tempfile.mkdtemp(prefix='scoresense_imports_')
+        try:
+            student_model.DB_PATH = os.path.join(workdir, 'students.db')
+            student_model.init_db()
+            problems = scenario(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if problems:
+            failures += 1
+            print(f"  ❌ {name:<30} {'; '.join(problems)}")
+        else:
+            print(f"  ✅ {name}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Query Budget Check for ScoreSense
+Requests the main routes against a small temporary database and fails if
+any of them runs more SQL statements than its budget - a regression here
+usually means a new N+1 pattern.
+
+Usage:
+    python scripts/check_query_counts.py [--students 50]
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+from models.sql_trace import assert_max_queries
+
+# Maximum statements per route; must not grow with the number of students
+ROUTE_QUERY_BUDGETS = {
+    '/': 8,
+    '/students': 5,
+    '/stats': 8,
+    '/api/stats': 8,
+    '/api/students': 2,
+    '/student/1/exams': 2,
+    '/student/1/stats': 2,
+    '/edit/1': 2,
+    '/graph/subject_average': 1,
+    '/graph/distribution': 1,
+    '/graph/student_comparison': 3,
+    '/predict/Student 1/math': 2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check per-route SQL query budgets')
+    parser.add_argument('--students', type=int, default=50)
+    args = parser.parse_args()
+
+    # A directory, so the WAL and shared-memory files next to the database are removed too
+    workdir = tempfile.mkdtemp(prefix='scoresense_budget_')
+    failures = 0
+    try:
+        student_model.DB_PATH = os.path.join(workdir, 'students.db')
+        student_model.init_db()
+
+        for i in range(1, args.students + 1):
+            student_id = student_model.add_student(f'Student {i}', grade='10', section='A')
+            student_model.add_complete_exam(student_id, 'Midterm', {'math': 50 + i % 50, 'science': 60 + i % 40})
+            student_model.add_complete_exam(student_id, 'Final', {'math': 55 + i % 45, 'science': 65 + i % 35})
+
+        # Importing the app runs init_db on the database configured above
+        from app import app
+        from models.exam_snapshot import get_exam_snapshot
+        client = app.test_client()
+        
+        # The exam snapshot is loaded once per process; budgets are for the steady state
+        get_exam_snapshot()
+
+        print("🔍 ScoreSense Query Budget Check")
+        print("=" * 50)
+        for route, budget in ROUTE_QUERY_BUDGETS.items():
+            try:
+                with assert_max_queries(budget) as queries:
+                    client.get(route)
+                print(f"  ✅ {route:<30} {len(queries):>3} / {budget}")
+            except AssertionError as e:
+                failures += 1
+                print(f"  ❌ {route:<30} {e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Exam Snapshot Check for ScoreSense
+Applies sequences of writes to a small temporary database, refreshing the
+exam snapshot in between, and fails if a patched snapshot differs from one
+rebuilt from scratch (or its class average from SQL's).
+
+Usage:
+    python scripts/check_snapshot.py
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+import models.exam_snapshot as exam_snapshot
+
+
+def update_score(exam_id, score):
+    student_model.run_write(lambda cursor: cursor.execute('UPDATE exam_scores SET score = ? WHERE id = ?', (score, exam_id)))
+
+
+def delete_exam(exam_id):
+    student_model.run_write(lambda cursor: cursor.execute('DELETE FROM exam_scores WHERE id = ?', (exam_id,)))
+
+
+def last_exam_id():
+    conn = student_model.get_read_connection()
+    try:
+        return conn.execute('SELECT MAX(id) FROM exam_scores').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def insert_then_update(student_id):
+    student_model.add_exam_score(student_id, 'math', 60, 'Retest')
+    update_score(last_exam_id(), 65)
+
+
+def insert_then_delete(student_id):
+    student_model.add_exam_score(student_id, 'math', 70, 'Retest')
+    delete_exam(last_exam_id())
+
+
+def update_existing(student_id):
+    update_score(1, 90)
+
+
+def delete_existing(student_id):
+    delete_exam(2)
+
+
+def rename_new_student(student_id):
+    new_id = student_model.add_student('Late Joiner', grade='10', section='A')
+    student_model.add_exam_score(new_id, 'science', 75, 'Midterm')
+    student_model.update_student(new_id, name='Late Joiner Renamed')
+
+
+# Each scenario runs between two snapshot refreshes
+SCENARIOS = [
+    ('insert then update', insert_then_update),
+    ('insert then delete', insert_then_delete),
+    ('update existing row', update_existing),
+    ('delete existing row', delete_existing),
+    ('new student renamed', rename_new_student),
+]
+
+
+def compare(patched, rebuilt):
+    """Get the differences between two snapshots as a list of messages."""
+    problems = []
+    for column in ('ids', 'student_ids', 'subject_codes', 'exam_codes', 'scores'):
+        if not np.array_equal(getattr(patched, column), getattr(rebuilt, column)):
+            problems.append(f'{column} differ ({len(patched)} rows patched, {len(rebuilt)} rebuilt)')
+    if patched.names != rebuilt.names:
+        problems.append('student names differ')
+
+    conn = student_model.get_read_connection()
+    try:
+        average = conn.execute('SELECT AVG(score) FROM exam_scores').fetchone()[0]
+    finally:
+        conn.close()
+    if len(patched) and not np.isclose(patched.scores.mean(), average):
+        problems.append(f'class average {patched.scores.mean():.2f}, SQL says {average:.2f}')
+    return problems
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='scoresense_snapshot_')
+    student_model.DB_PATH = os.path.join(workdir, 'students.db')
+    student_model.init_db()
+
+    for i in range(1, 21):
+        student_id = student_model.add_student(f'Student {i}', grade='10', section='A')
+        student_model.add_exam_score(student_id, 'math', 50, 'Midterm')
+
+    print("🔍 ScoreSense Exam Snapshot Check")
+    print("=" * 50)
+    failures = 0
+    try:
+        for name, scenario in SCENARIOS:
+            exam_snapshot.get_exam_snapshot()
+            scenario(1)
+            patched = exam_snapshot.get_exam_snapshot()
+
+            conn = student_model.get_read_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN')
+                rebuilt = exam_snapshot.build_snapshot(cursor, patched.path, patched.version, patched.seq)
+                cursor.execute('COMMIT')
+            finally:
+                conn.close()
+
+            problems = compare(patched, rebuilt)
+            if problems:
+                failures += 1
+                print(f"  ❌ {name:<30} {'; '.join(problems)}")
+            else:
+                print(f"  ✅ {name:<30} {len(patched):>3} rows")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
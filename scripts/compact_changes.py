@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Change Feed Compaction Script for ScoreSense
+Drops change log entries superseded by a newer entry for the same row, and
+optionally truncates the log to its newest entries (consumers further behind
+have to re-read the tables). Meant to run periodically, e.g. from cron.
+
+Usage:
+    python scripts/compact_changes.py
+    python scripts/compact_changes.py --keep 100000
+    python scripts/compact_changes.py --db db/students.db --keep 0
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+from models.change_feed import compact_changes, get_latest_seq
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact the change feed')
+    parser.add_argument('--keep', type=int, help='Also truncate the log to this many newest entries')
+    parser.add_argument('--db', help='Database file (defaults to the app database)')
+    args = parser.parse_args()
+
+    if args.db:
+        student_model.DB_PATH = args.db
+    student_model.init_db()
+
+    start = time.perf_counter()
+    try:
+        result = compact_changes(args.keep)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"🧹 Removed {result['superseded']:,} superseded and {result['truncated']:,} truncated entries in {elapsed:.2f}s")
+    print(f"✅ Log now covers changes after seq {result['truncated_seq']:,} (latest {get_latest_seq():,})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Bulk Export Script for ScoreSense
+Streams the students or exams table to a CSV, XLSX or Parquet file without
+loading the whole table into memory.
+
+Usage:
+    python scripts/export_data.py exams exams.parquet
+    python scripts/export_data.py students students.csv
+    python scripts/export_data.py exams - --format csv > exams.csv
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from core.export import export_to_file, EXPORT_TABLES, EXPORT_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export students or exams')
+    parser.add_argument('table', choices=list(EXPORT_TABLES))
+    parser.add_argument('output', help="Output file, or - for stdout")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS),
+                        help='Defaults to the output file extension')
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in EXPORT_FORMATS:
+        parser.error('Pass --format or use a .csv, .xlsx or .parquet output file')
+
+    start = time.perf_counter()
+    try:
+        if args.output == '-':
+            written = export_to_file(args.table, fmt, sys.stdout.buffer)
+        else:
+            written = export_to_file(args.table, fmt, args.output)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Exported {args.table} as {fmt}: {written:,} bytes in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator for ScoreSense
+Builds large, realistic databases for benchmarking and load testing:
+students spread over grades and sections, a skewed ability distribution,
+per-subject strengths and a per-student trend across exam sessions.
+Everything is generated with NumPy in student blocks and written with bulk
+inserts, so 100k students / ~10M exams takes a few minutes.
+
+The output is fully determined by the arguments and --seed.
+
+Usage:
+    python scripts/generate_dataset.py --output db/bench.db [--students 100000] [--sessions 12] [--subjects 8]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History',
+            'Geography', 'Computer Science', 'Economics', 'Art', 'Music', 'Physical Education']
+EXAM_CYCLE = ['Quiz 1', 'Unit Test 1', 'Midterm', 'Quiz 2', 'Unit Test 2', 'Final']
+SECTIONS = list('ABCDEFGH')
+GENDERS = np.array(['Male', 'Female'])
+
+FIRST_NAMES = np.array([
+    'Aarav', 'Arjun', 'Rahul', 'Rohan', 'Karan', 'Aditya', 'Aryan', 'Vivaan', 'Dhruv', 'Ishaan',
+    'Kabir', 'Arnav', 'Vedant', 'Liam', 'Noah', 'Ethan', 'Lucas', 'Mateo', 'Omar', 'Yusuf',
+    'Aadhya', 'Ananya', 'Diya', 'Ishita', 'Kavya', 'Meera', 'Navya', 'Priya', 'Riya', 'Sara',
+    'Tara', 'Zara', 'Anika', 'Kiara', 'Emma', 'Olivia', 'Sofia', 'Amara', 'Leila', 'Mei'
+])
+LAST_NAMES = np.array([
+    'Sharma', 'Patel', 'Kumar', 'Singh', 'Gupta', 'Reddy', 'Agarwal', 'Joshi', 'Verma', 'Mehta',
+    'Desai', 'Kapoor', 'Nair', 'Rao', 'Iyer', 'Malhotra', 'Khanna', 'Bose', 'Das', 'Sinha',
+    'Smith', 'Garcia', 'Chen', 'Nguyen', 'Khan', 'Okafor', 'Silva', 'Kim', 'Novak', 'Haddad'
+])
+CITIES = np.array(['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata', 'Pune', 'Ahmedabad'])
+
+# Students generated (and exams inserted) per block, to bound memory
+BLOCK_STUDENTS = 20000
+
+# First exam session; sessions are spread evenly over the school years that follow
+FIRST_SESSION_DATE = np.datetime64('2023-06-15')
+SESSIONS_PER_YEAR = len(EXAM_CYCLE)
+
+
+def unique_names(rng, count):
+    """Draw first/last name pairs, numbering repeats ('Priya Sharma 2') to keep them unique."""
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), count)]
+    last = LAST_NAMES[rng.integers(0, len(LAST_NAMES), count)]
+    names = pd.Series(np.char.add(np.char.add(first, ' '), last))
+    repeat = names.groupby(names).cumcount().to_numpy()
+    suffix = np.where(repeat > 0, np.char.add(' ', (repeat + 1).astype(str)), '')
+    return np.char.add(names.to_numpy().astype(str), suffix)
+
+
+def generate_students(rng, names, grades):
+    """
+    Generate student profiles for the given names plus the latent traits
+    that drive their scores.
+
+    Returns:
+        (rows for the students table, ability, trend) - ability is a 0-100
+        baseline drawn from a left-skewed beta distribution, trend is the
+        average change in score per exam session
+    """
+    count = len(names)
+    grade = rng.integers(grades[0], grades[1] + 1, count)
+    section = np.array(SECTIONS)[rng.integers(0, len(SECTIONS), count)]
+    gender = GENDERS[rng.integers(0, 2, count)]
+    age = grade + 5 + rng.integers(0, 2, count)
+    email = np.char.add(np.char.replace(np.char.lower(names), ' ', '.'), '@student.edu')
+    phone = rng.integers(7_000_000_000, 9_999_999_999, count, dtype=np.int64).astype(str)
+    address = np.char.add(np.char.add(rng.integers(1, 999, count).astype(str), ', Sector '),
+                          np.char.add(np.char.add(rng.integers(1, 60, count).astype(str), ', '),
+                                      CITIES[rng.integers(0, len(CITIES), count)]))
+
+    rows = list(zip(names.tolist(), grade.astype(str).tolist(), section.tolist(), age.tolist(),
+                    gender.tolist(), email.tolist(), phone.tolist(), address.tolist()))
+
+    ability = rng.beta(5.0, 2.5, count) * 100
+    trend = rng.normal(0.4, 0.8, count)
+    return rows, ability, trend
+
+
+def session_names(sessions):
+    """Exam names of the first sessions, cycling through EXAM_CYCLE once per year."""
+    return [f'{EXAM_CYCLE[s % SESSIONS_PER_YEAR]} {2023 + s // SESSIONS_PER_YEAR}' for s in range(sessions)]
+
+
+def generate_exams(rng, student_ids, ability, trend, session_ids, subject_ids, coverage):
+    """
+    Generate exam_scores rows (student_id, subject_id, score, exam_session_id,
+    exam_date) for a block of students.
+
+    Each student sits every session, with each subject present with
+    probability coverage. Score = ability + subject strength + trend * session
+    + noise, clipped to 0-100.
+    """
+    count = len(student_ids)
+    sessions = len(session_ids)
+    subject_count = len(subject_ids)
+
+    strength = rng.normal(0, 8, (count, subject_count))
+    session_index = np.arange(sessions)
+    noise = rng.normal(0, 6, (count, sessions, subject_count))
+    scores = (ability[:, None, None] + strength[:, None, :]
+              + trend[:, None, None] * session_index[None, :, None] + noise)
+    scores = np.clip(np.round(scores, 1), 0, 100)
+
+    taken = rng.random((count, sessions, subject_count)) < coverage
+    student_index, session_of, subject_of = np.nonzero(taken)
+
+    days = (session_index * (365 // SESSIONS_PER_YEAR)).astype('timedelta64[D]')
+    jitter = rng.integers(-3, 4, count).astype('timedelta64[D]')
+    dates = (FIRST_SESSION_DATE + days[session_of] + jitter[student_index]).astype(str)
+
+    return zip(
+        student_ids[student_index].tolist(),
+        np.array(subject_ids)[subject_of].tolist(),
+        scores[student_index, session_of, subject_of].tolist(),
+        np.array(session_ids)[session_of].tolist(),
+        dates.tolist()
+    )
+
+
+def latest_marks(exam_rows, subject_names):
+    """
+    Build the students.marks JSON of a block: each student's latest score per
+    subject, as update_current_marks keeps it for exams added in the app.
+    Rows are in session order per student, so later rows win.
+
+    Returns:
+        (marks JSON, student_id) rows for students with at least one exam
+    """
+    marks = {}
+    for student_id, subject_id, score, _, _ in exam_rows:
+        marks.setdefault(student_id, {})[subject_names[subject_id]] = score
+    return [(json.dumps(student_marks), student_id) for student_id, student_marks in marks.items()]
+
+
+def generate_dataset(output, students=100000, sessions=12, subjects=8, grades=(1, 12),
+                     coverage=0.95, seed=42, progress=None):
+    """
+    Create a fresh database at output and fill it with synthetic data.
+
+    Args:
+        output: Path of the new database file (must not exist)
+        students: Number of students
+        sessions: Exam sessions per student (six per school year)
+        subjects: Number of subjects (taken from SUBJECTS)
+        grades: (lowest, highest) grade
+        coverage: Probability a student has a score for a subject in a session
+        seed: Random seed; the same arguments always produce the same data
+        progress: Optional callback(students_done, exams_done)
+
+    Returns:
+        dict with 'students' and 'exams' counts
+    """
+    if os.path.exists(output):
+        raise ValueError(f'{output} already exists')
+    if not 1 <= subjects <= len(SUBJECTS):
+        raise ValueError(f'subjects must be between 1 and {len(SUBJECTS)}')
+
+    output_dir = os.path.dirname(os.path.abspath(output))
+    os.makedirs(output_dir, exist_ok=True)
+
+    previous_path = student_model.DB_PATH
+    student_model.DB_PATH = output
+    try:
+        student_model.init_db()
+    finally:
+        student_model.DB_PATH = previous_path
+
+    rng = np.random.default_rng(seed)
+    subject_names = SUBJECTS[:subjects]
+    names = unique_names(rng, students)
+    exams_added = 0
+
+    conn = student_model.connect(output)
+    cursor = conn.cursor()
+    # A fresh file can be rebuilt if interrupted, so skip the journal and fsyncs
+    cursor.execute('PRAGMA journal_mode = OFF')
+    cursor.execute('PRAGMA synchronous = OFF')
+    # Building the exams index once at the end is much faster than maintaining it per row
+    cursor.execute('DROP INDEX IF EXISTS idx_exams_student_subject_score')
+    # Nothing follows the change feed of a new file yet, so skip logging every generated row
+    for table in student_model.CHANGE_FEED_TABLES:
+        cursor.execute(f'DROP TRIGGER IF EXISTS log_{table}_insert')
+
+    cursor.execute('BEGIN')
+    subject_ids = student_model.lookup_ids(cursor, 'subjects', subject_names)
+    session_ids = student_model.lookup_ids(cursor, 'exam_sessions', session_names(sessions))
+    cursor.execute('COMMIT')
+    subject_names_by_id = {subject_id: name for name, subject_id in subject_ids.items()}
+
+    try:
+        for start in range(0, students, BLOCK_STUDENTS):
+            count = min(BLOCK_STUDENTS, students - start)
+            block = slice(start, start + count)
+            rows, ability, trend = generate_students(rng, names[block], grades)
+
+            cursor.execute('BEGIN')
+            cursor.executemany('''
+                INSERT INTO students (name, marks, grade, section, age, gender, email, phone, address)
+                VALUES (?, '{}', ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            cursor.execute('SELECT MAX(id) FROM students')
+            last_id = cursor.fetchone()[0]
+            student_ids = np.arange(last_id - count + 1, last_id + 1)
+
+            exam_rows = list(generate_exams(rng, student_ids, ability, trend, list(session_ids.values()),
+                                            list(subject_ids.values()), coverage))
+            cursor.executemany('''
+                INSERT INTO exam_scores (student_id, subject_id, score, exam_session_id, exam_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', exam_rows)
+            exams_added += cursor.rowcount
+            # get_all_subjects (and so batch predictions) reads the subjects from students.marks
+            cursor.executemany('UPDATE students SET marks = ? WHERE id = ?', latest_marks(exam_rows, subject_names_by_id))
+            cursor.execute('COMMIT')
+
+            if progress:
+                progress(start + count, exams_added)
+
+        student_model.create_change_triggers(cursor)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_exams_student_subject_score ON exam_scores (student_id, subject_id, score)')
+        cursor.execute('ANALYZE')
+    finally:
+        conn.close()
+
+    return {'students': students, 'exams': exams_added}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic ScoreSense database')
+    parser.add_argument('--output', required=True, help='New database file to create')
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--sessions', type=int, default=12, help='Exam sessions per student (6 per school year)')
+    parser.add_argument('--subjects', type=int, default=8, help=f'Subjects per session (max {len(SUBJECTS)})')
+    parser.add_argument('--grades', default='1-12', help='Grade range, e.g. 9-12')
+    parser.add_argument('--coverage', type=float, default=0.95, help='Chance a subject is taken in a session')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='Replace the output file if it exists')
+    args = parser.parse_args()
+
+    low, high = (int(part) for part in args.grades.split('-'))
+    if args.force and os.path.exists(args.output):
+        os.remove(args.output)
+
+    print("🏗️  ScoreSense Synthetic Dataset Generator")
+    print("=" * 50)
+    print(f"Students: {args.students:,}  Sessions: {args.sessions}  Subjects: {args.subjects}  Seed: {args.seed}")
+    print(f"Expected exams: ~{int(args.students * args.sessions * args.subjects * args.coverage):,}")
+    print()
+
+    start = time.perf_counter()
+
+    def progress(students_done, exams_done):
+        elapsed = time.perf_counter() - start
+        print(f"  {students_done:>9,} students  {exams_done:>11,} exams  {elapsed:7.1f}s")
+
+    try:
+        counts = generate_dataset(args.output, args.students, args.sessions, args.subjects,
+                                  (low, high), args.coverage, args.seed, progress)
+    except ValueError as e:
+        print(f"❌ {e} (use --force to replace it)" if 'exists' in str(e) else f"❌ {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print()
+    print(f"✅ Wrote {counts['students']:,} students and {counts['exams']:,} exams to {args.output}")
+    print(f"   {elapsed:.1f}s, {size_mb:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
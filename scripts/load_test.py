@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Test for ScoreSense
+Starts the app on a local port, replays a weighted mix of realistic routes
+from a pool of concurrent clients for a fixed time, and reports throughput,
+latency percentiles and error rates per route. /command is served by a mock
+LLM running inside this script, so no API key or network is needed.
+
+Usage:
+    python scripts/load_test.py run [--students 10000] [--concurrency 8] [--duration 30] [--output load.json]
+    python scripts/load_test.py run --server processes --workers 4 --output processes.json
+    python scripts/load_test.py compare load.json processes.json [--threshold 0.1]
+
+Server configurations:
+    --server threads      one process, a thread per request (the default)
+    --server processes    a forked process per request, at most --workers at once
+    --http-cache          clients revalidate with If-None-Match and accept compressed
+                          responses, as browsers do; without it every request is a full fetch
+
+'compare' exits non-zero if throughput drops, p95 latency grows by more than
+--threshold, or the error rate rises by more than --max-error-increase.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import socket
+import platform
+import threading
+import subprocess
+import tempfile
+import shutil
+import argparse
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlencode
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import models.student_model as student_model
+
+# (weight, method, path) - {name}, {id} and {subject} are filled in per request
+ROUTE_MIX = [
+    (15, 'GET', '/'),
+    (15, 'GET', '/students'),
+    (10, 'GET', '/stats'),
+    (10, 'GET', '/api/stats'),
+    (10, 'GET', '/api/students?grade={grade}'),
+    (10, 'GET', '/student/{id}/stats'),
+    (8, 'GET', '/student/{id}/exams'),
+    (5, 'GET', '/graph/subject_average'),
+    (5, 'GET', '/graph/distribution'),
+    (4, 'GET', '/graph/student_bar?student={name}'),
+    (3, 'GET', '/predict/{name}/{subject}'),
+    (5, 'POST', '/command'),
+]
+
+# Natural language commands sent to /command; the mock LLM understands all of them
+COMMANDS = ['show stats', 'who is the topper', 'show {name}', 'rank of {name}']
+
+# Students sampled from the database to fill in the route templates
+SAMPLE_STUDENTS = 200
+
+# Seconds to wait for the server to start answering
+STARTUP_TIMEOUT = 60
+
+
+def use_database(path):
+    """Point the app's models at a database file."""
+    student_model.DB_PATH = path
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers /chat/completions like the real API, turning the quoted command
+    into a read-only intent after an optional delay (MockLLMHandler.latency).
+    """
+
+    latency = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        message = body.get('messages', [{}])[-1].get('content', '')
+        text = message.split('"')[1] if message.count('"') >= 2 else message
+
+        if 'topper' in text:
+            parsed = {'intent': 'SHOW_TOPPER'}
+        elif text.startswith('rank of '):
+            parsed = {'intent': 'GET_RANK', 'name': text[len('rank of '):]}
+        elif text.startswith('show ') and text != 'show stats':
+            parsed = {'intent': 'SHOW_STUDENT', 'name': text[len('show '):]}
+        else:
+            parsed = {'intent': 'SHOW_STATS'}
+
+        if self.latency:
+            time.sleep(self.latency)
+        payload = json.dumps({'choices': [{'message': {'content': json.dumps(parsed)}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_llm(latency_ms):
+    MockLLMHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockLLMHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(args):
+    """Run the app (used by 'run' in a child process)."""
+    from werkzeug.serving import run_simple
+
+    use_database(args.database)
+    # Importing the app runs init_db on the database configured above
+    from app import app
+
+    if args.server == 'processes':
+        run_simple('127.0.0.1', args.port, app, threaded=False, processes=args.workers)
+    else:
+        run_simple('127.0.0.1', args.port, app, threaded=True)
+
+
+def start_server(args, database, port, llm_url):
+    env = dict(os.environ, HACKCLUB_AI_BASE_URL=llm_url, HACKCLUB_AI_API_KEY='load-test')
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--database', database,
+               '--port', str(port), '--server', args.server, '--workers', str(args.workers)]
+    server = subprocess.Popen(command, env=env, cwd=project_root,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited during startup:\n{server.stderr.read()}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/students?limit=1')
+            conn.getresponse().read()
+            conn.close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'Server did not start within {STARTUP_TIMEOUT}s')
+
+
+def sample_targets(database):
+    """Pick real student ids, names, grades and subjects to fill in the route templates."""
+    conn = student_model.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, grade FROM students ORDER BY RANDOM() LIMIT ?', (SAMPLE_STUDENTS,))
+        students = cursor.fetchall()
+        cursor.execute('SELECT DISTINCT subject FROM exams LIMIT 20')
+        subjects = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    if not students or not subjects:
+        raise RuntimeError('The database needs students with exams')
+    return students, subjects
+
+
+def build_request(rng, students, subjects):
+    """Draw one (label, method, path, body) from ROUTE_MIX."""
+    _, method, template = rng.choices(ROUTE_MIX, weights=[route[0] for route in ROUTE_MIX])[0]
+    student_id, name, grade = rng.choice(students)
+    values = {'id': student_id, 'name': quote(name), 'grade': quote(str(grade)), 'subject': quote(rng.choice(subjects))}
+
+    body = None
+    if template == '/command':
+        body = urlencode({'command': rng.choice(COMMANDS).format(name=name)})
+    return f'{method} {template}', method, template.format(**values), body
+
+
+def client_worker(port, seed, students, subjects, http_cache, start_at, stop_at, results):
+    """
+    Send requests back to back on one keep-alive connection until stop_at.
+
+    Appends (label, seconds, status) to results for requests started after start_at;
+    status is None when the request failed at the connection level.
+    """
+    rng = random.Random(seed)
+    etags = {}
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while time.time() < stop_at:
+        label, method, path, body = build_request(rng, students, subjects)
+        headers = {}
+        if http_cache:
+            headers['Accept-Encoding'] = 'br, gzip'
+            if path in etags:
+                headers['If-None-Match'] = etags[path]
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        started = time.time()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if http_cache and response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = None
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        if started >= start_at:
+            results.append((label, time.time() - started, status))
+    conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, seconds):
+    """Throughput, error rate and latency percentiles (ms) for a list of (seconds, status)."""
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+    errors = sum(1 for _, status in samples if status is None or status >= 400)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status or 'failed')] = statuses.get(str(status or 'failed'), 0) + 1
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2),
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p90_ms': round(percentile(latencies, 0.90), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        'statuses': statuses
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='scoresense_load_')
+    database = args.database
+    if not database:
+        from scripts.generate_dataset import generate_dataset
+        database = os.path.join(workdir, 'load.db')
+        print(f"🏗️  Generating {args.students:,} students...")
+        generate_dataset(database, args.students, sessions=6, subjects=6, seed=args.seed)
+    elif not os.path.exists(database):
+        print(f"❌ {database} does not exist")
+        sys.exit(1)
+
+    config = {
+        'server': args.server,
+        'workers': args.workers if args.server == 'processes' else None,
+        'http_cache': args.http_cache,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'llm_latency_ms': args.llm_latency_ms,
+        'database': os.path.abspath(database),
+        'students': None
+    }
+
+    print("🔥 ScoreSense Load Test")
+    print("=" * 70)
+    print(f"Server: {args.server}" + (f" x{args.workers}" if args.server == 'processes' else '')
+          + f"  Clients: {args.concurrency}  Duration: {args.duration}s (+{args.warmup}s warmup)"
+          + f"  HTTP cache: {'on' if args.http_cache else 'off'}")
+
+    llm = start_mock_llm(args.llm_latency_ms)
+    port = free_port()
+    server = None
+    try:
+        students, subjects = sample_targets(database)
+        conn = student_model.connect(database)
+        config['students'] = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+        conn.close()
+
+        server = start_server(args, database, port, f'http://127.0.0.1:{llm.server_address[1]}')
+        results = []
+        start_at = time.time() + args.warmup
+        stop_at = start_at + args.duration
+        clients = [threading.Thread(target=client_worker,
+                                    args=(port, args.seed + i, students, subjects, args.http_cache,
+                                          start_at, stop_at, results))
+                   for i in range(args.concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        llm.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    routes = {}
+    for label, elapsed, status in results:
+        routes.setdefault(label, []).append((elapsed, status))
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'config': config
+        },
+        'overall': summarize([(elapsed, status) for _, elapsed, status in results], args.duration),
+        'routes': {label: summarize(samples, args.duration) for label, samples in sorted(routes.items())}
+    }
+
+    print()
+    print(f"{'Route':<44} {'req/s':>8} {'err':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for label, summary in list(report['routes'].items()) + [('TOTAL', report['overall'])]:
+        print(f"{label:<44} {summary['throughput_rps']:>8.1f} {summary['error_rate']:>6.1%} "
+              f"{summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}")
+
+    with open(args.output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.current) as handle:
+        current = json.load(handle)
+
+    print("📊 Load Test Comparison")
+    print("=" * 70)
+    for name, report in (('baseline', baseline), ('current', current)):
+        config = report['meta']['config']
+        print(f"{name:<9} server={config['server']} workers={config['workers']} "
+              f"http_cache={config['http_cache']} clients={config['concurrency']} students={config['students']}")
+    print()
+
+    failures = []
+    rows = [('TOTAL', baseline['overall'], current['overall'])]
+    rows += [(label, baseline['routes'][label], summary)
+             for label, summary in current['routes'].items() if label in baseline['routes']]
+
+    print(f"{'Route':<44} {'req/s':>17} {'p95 ms':>19} {'errors':>15}")
+    for label, before, after in rows:
+        throughput_change = (after['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] if before['throughput_rps'] else 0.0
+        p95_change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        error_change = after['error_rate'] - before['error_rate']
+
+        problems = []
+        # Percentiles of a handful of requests are noise, so thinly sampled routes are only shown
+        if min(before['requests'], after['requests']) < args.min_requests:
+            print(f"  {label:<42} {'(too few requests to compare)':>40}")
+            continue
+        # Per-route throughput follows the mix, so only the total is gated on it
+        if label == 'TOTAL' and throughput_change < -args.threshold:
+            problems.append(f'throughput {throughput_change:+.0%}')
+        if p95_change > args.threshold and after['p95_ms'] - before['p95_ms'] >= args.min_ms:
+            problems.append(f'p95 {p95_change:+.0%}')
+        if error_change > args.max_error_increase:
+            problems.append(f'error rate {error_change:+.1%}')
+        if problems:
+            failures.append(f"{label}: {', '.join(problems)}")
+
+        marker = '❌' if problems else '  '
+        print(f"{marker}{label:<42} {before['throughput_rps']:>7.1f} -> {after['throughput_rps']:<7.1f} "
+              f"{before['p95_ms']:>8.1f} -> {after['p95_ms']:<8.1f} "
+              f"{before['error_rate']:>5.1%} -> {after['error_rate']:<5.1%}")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ScoreSense HTTP load test')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Start the app and put it under load')
+    run_parser.add_argument('--database', help='Existing database to serve (default: generate one)')
+    run_parser.add_argument('--students', type=int, default=10000, help='Students to generate without --database')
+    run_parser.add_argument('--server', choices=['threads', 'processes'], default='threads')
+    run_parser.add_argument('--workers', type=int, default=4, help='Maximum processes with --server processes')
+    run_parser.add_argument('--http-cache', action='store_true', help='Clients revalidate with ETags and accept compression')
+    run_parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    run_parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before the measurement')
+    run_parser.add_argument('--llm-latency-ms', type=float, default=300, help='Delay of the mock LLM')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', default='load.json')
+
+    serve_parser = commands.add_parser('serve', help=argparse.SUPPRESS)
+    serve_parser.add_argument('--database', required=True)
+    serve_parser.add_argument('--port', type=int, required=True)
+    serve_parser.add_argument('--server', choices=['threads', 'processes'], default='threads')
+    serve_parser.add_argument('--workers', type=int, default=4)
+
+    compare_parser = commands.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Allowed throughput drop / p95 growth')
+    compare_parser.add_argument('--min-ms', type=float, default=5.0, help='Ignore p95 growth smaller than this')
+    compare_parser.add_argument('--min-requests', type=int, default=30, help='Skip routes with fewer requests than this')
+    compare_parser.add_argument('--max-error-increase', type=float, default=0.01, help='Allowed error rate increase')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'serve':
+        serve(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()